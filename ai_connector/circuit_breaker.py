@@ -0,0 +1,89 @@
+# ai_connector/circuit_breaker.py
+import os, json, time, pathlib
+
+# 외부 API(Gemini) 호출용 서킷 브레이커. 상태를 파일에 저장하므로 매시간 새로 뜨는 프로세스 사이에서도 유지됩니다.
+# - closed: 정상 호출. 연속 실패가 failure_threshold회에 이르면 open
+# - open: 호출하지 않고 바로 폴백. cooldown_seconds가 지나면 half_open
+# - half_open: 한 번만 시험 호출(probe). 성공하면 closed, 실패하면 다시 open
+#   시험 호출이 cooldown_seconds 안에 결과를 남기지 못하면(단계 시간 제한으로 종료 등) 실패로 보고 다시 open
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+BREAKER_DIR = pathlib.Path(os.environ.get("ADVISOR_BREAKER_DIR", PROJECT_ROOT / "data"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.path = BREAKER_DIR / f"circuit_{name}.json"
+        self.state = self._load()
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: circuit state for {self.name} unreadable ({e}); starting closed.")
+        return {"state": CLOSED, "failures": 0, "opened_at": None, "probe_started_at": None, "last_error": None}
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Warning: could not save circuit state for {self.name}: {e}")
+
+    def allow(self) -> bool:
+        """
+        지금 호출해도 되는지 반환합니다. (다른 실행이 바꾼 상태를 파일에서 다시 읽음)
+        open 상태에서 대기 시간이 지났으면 half_open으로 바꾸고 시험 호출 1회를 허용하며,
+        다른 실행의 시험 호출이 진행 중인 동안에는 호출하지 않습니다.
+        """
+        self.state = self._load()
+        now = time.time()
+        if self.state["state"] == HALF_OPEN:
+            probe_started_at = self.state.get("probe_started_at") or 0
+            if now - probe_started_at < self.cooldown_seconds:
+                return False
+            # 시험 호출이 결과를 남기지 못하고 종료됨 -> 시작 시각에 실패한 것으로 open 처리
+            # (대기 시간이 이미 지났으므로 아래에서 이번 실행이 새 시험 호출을 맡음)
+            self.state["state"] = OPEN
+            self.state["opened_at"] = probe_started_at
+            self.state["failures"] += 1
+            self.state["last_error"] = "probe did not complete (process killed or timed out)"
+        if self.state["state"] == OPEN:
+            if now - (self.state["opened_at"] or 0) < self.cooldown_seconds:
+                return False
+            self.state["state"] = HALF_OPEN
+            self.state["probe_started_at"] = now
+            self._save()
+        return True
+
+    def retry_in(self) -> float:
+        """ 다음 시험 호출까지 남은 시간(초) (open 대기 중이거나 다른 실행의 시험 호출이 진행 중일 때) """
+        if self.state["state"] == OPEN:
+            started = self.state["opened_at"]
+        elif self.state["state"] == HALF_OPEN:
+            started = self.state.get("probe_started_at")
+        else:
+            return 0.0
+        return max(0.0, (started or 0) + self.cooldown_seconds - time.time())
+
+    def record_success(self):
+        if self.state["state"] != CLOSED or self.state["failures"]:
+            self.state = {"state": CLOSED, "failures": 0, "opened_at": None, "probe_started_at": None, "last_error": None}
+            self._save()
+
+    def record_failure(self, error: str):
+        self.state["failures"] += 1
+        self.state["last_error"] = error[:300]
+        if self.state["state"] == HALF_OPEN or self.state["failures"] >= self.failure_threshold:
+            self.state["state"] = OPEN
+            self.state["opened_at"] = time.time()
+        self._save()
@@ -1,6 +1,9 @@
 # ai_connector/data_io.py
 import os, json, pathlib, datetime
 
+# 로그 꼬리 읽기 (의존성 없는 공용 모듈, 파일 끝에서부터 필요한 줄만 읽음)
+from common.log_tail import SYSTEM_LOG_FILES, read_system_log_lines
+
 # PROJECT_ROOT는 ai_connector 폴더의 상위 폴더인 EternaLegacy를 가리킵니다.
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 LOGS_DIR = PROJECT_ROOT / "logs"
@@ -13,18 +16,7 @@ def read_system_logs(n_lines=2000):
     """
     여러 로그 파일에서 최근 n줄의 로그를 읽어 병합합니다.
     """
-    merged_logs = []
-    log_files = [
-        "runtime.log", "update_audit.log", "recovery.log",
-        "hourly_task.log", "daily_task.log", "notify.log"
-    ]
-    for name in log_files:
-        p = LOGS_DIR / name
-        if p.exists():
-            try:
-                merged_logs += p.read_text(encoding="utf-8", errors="ignore").splitlines()[-n_lines:]
-            except Exception as e:
-                print(f"Error reading log file {p}: {e}")
+    merged_logs = read_system_log_lines(n_lines)
     return "\n".join(merged_logs) if merged_logs else "(no logs yet)"
 
 def write_request_payload(payload):
@@ -0,0 +1,168 @@
+# ai_connector/log_cursor.py
+import os, glob, json, pathlib, hashlib, datetime
+
+# 로그 파일별로 마지막으로 읽은 위치(바이트 오프셋)를 저장해 두고, 다음 실행에서는 그 뒤에 추가된 줄만 읽습니다.
+# - 파일 식별: (st_dev, st_ino) + 앞부분 해시 -> 로그 회전(새 파일)과 copytruncate(같은 inode)를 모두 감지
+# - 회전된 경우 같은 (st_dev, st_ino)의 형제 파일(예: app.log.1)에서 저장된 위치 이후의 나머지를 먼저 읽음
+# - 파일이 오프셋보다 작아지면 잘린(truncate) 것으로 보고 처음부터 읽음
+# - 이전 실행들의 내용은 실행별 줄 수/오류 수와 최근 오류 줄만 남긴 요약으로 유지
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+CURSOR_PATH = pathlib.Path(os.environ.get("ADVISOR_LOG_CURSOR_PATH", PROJECT_ROOT / "data" / "advisor_log_cursor.json"))
+CURSOR_MAX_NEW_LINES = int(os.environ.get("ADVISOR_MAX_NEW_LINES", 2000))             # 파일당 한 번에 넘길 최대 줄 수 (최신 줄 우선)
+CURSOR_MAX_READ_BYTES = int(os.environ.get("ADVISOR_MAX_READ_BYTES", 4 * 1024 * 1024)) # 파일당 한 번에 읽을 최대 바이트
+SUMMARY_RUNS = int(os.environ.get("ADVISOR_SUMMARY_RUNS", 24))                       # 요약에 남길 최근 실행 수
+SUMMARY_NOTABLE_LINES = 5                                                            # 파일당 남길 최근 오류 줄 수
+HEAD_BYTES = 256
+NOTABLE_MARKERS = ("ERROR", "CRITICAL", "Traceback", "failed", "FAILED")
+
+
+def _head_hash(f, length: int) -> str:
+    f.seek(0)
+    return hashlib.sha1(f.read(length)).hexdigest()
+
+def _is_notable(line: str) -> bool:
+    return any(m in line for m in NOTABLE_MARKERS)
+
+
+class LogCursor:
+    """
+    로그 파일별 읽기 위치와 이전 내용 요약을 저장합니다.
+    read_new()로 새 줄을 읽고, 처리가 끝난 뒤 commit()해야 위치가 저장됩니다. (도중에 실패하면 다음 실행에서 다시 읽음)
+    """
+
+    def __init__(self, logs_dir: pathlib.Path, path: pathlib.Path = CURSOR_PATH):
+        self.logs_dir = logs_dir
+        self.path = path
+        self.state = self._load()
+        self._pending = {} # name -> 새 커서 (commit 전)
+        self.new_lines = {} # name -> 이번에 읽은 줄
+        self.skipped = {}   # name -> 최대치를 넘어 건너뛴 바이트/줄 정보
+
+    def _load(self) -> dict:
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+            if state.get("version") == 1:
+                return state
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: log cursor state unreadable ({e}); reading logs from the start.")
+        return {"version": 1, "files": {}, "summary": {}}
+
+    # -- 읽기 --
+    def _rotated_tail(self, p: pathlib.Path, prev: dict) -> bytes:
+        """ 회전되어 이름이 바뀐 이전 파일에서 저장된 위치 이후의 나머지를 읽습니다. (못 찾으면 빈 값) """
+        for sibling in p.parent.glob(glob.escape(p.name) + "*"):
+            if sibling == p:
+                continue
+            try:
+                st = sibling.stat()
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) != (prev["dev"], prev["ino"]) or st.st_size < prev["offset"]:
+                continue
+            with open(sibling, "rb") as f:
+                if prev["head_len"] and _head_hash(f, prev["head_len"]) != prev["head"]:
+                    return b""
+                start = max(prev["offset"], st.st_size - CURSOR_MAX_READ_BYTES)
+                f.seek(start)
+                data = f.read(st.st_size - start)
+            if start > prev["offset"]:
+                # 읽기 상한으로 잘린 첫 줄은 버림
+                cut = data.find(b"\n") + 1
+                self.skipped[p.name] = start + cut - prev["offset"]
+                data = data[cut:]
+            # 회전된 파일은 더 이상 쓰이지 않으므로 줄바꿈 없는 마지막 줄도 포함
+            return data if not data or data.endswith(b"\n") else data + b"\n"
+        return b""
+
+    def _read_file(self, name: str) -> list[str]:
+        p = self.logs_dir / name
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            return []
+        prev = self.state["files"].get(name)
+        rotated = b""
+        if prev and (prev["dev"], prev["ino"]) != (st.st_dev, st.st_ino):
+            rotated = self._rotated_tail(p, prev)
+        with open(p, "rb") as f:
+            offset = 0
+            if prev and prev["dev"] == st.st_dev and prev["ino"] == st.st_ino and prev["offset"] <= st.st_size:
+                # 같은 파일이 이어서 커진 경우에만 이전 위치부터 (앞부분이 바뀌었으면 copytruncate 후 다시 쓴 것)
+                if prev["head_len"] == 0 or _head_hash(f, prev["head_len"]) == prev["head"]:
+                    offset = prev["offset"]
+            start = max(offset, st.st_size - CURSOR_MAX_READ_BYTES)
+            f.seek(start)
+            data = f.read(st.st_size - start)
+            if start > offset:
+                # 읽기 상한으로 잘린 첫 줄은 버림
+                cut = data.find(b"\n") + 1
+                self.skipped[name] = self.skipped.get(name, 0) + start + cut - offset
+                data = data[cut:]
+            # 아직 끝나지 않은(줄바꿈 없는) 마지막 줄은 다음 실행에서 읽음
+            end = data.rfind(b"\n") + 1
+            new_offset = st.st_size - len(data) + end
+            head_len = min(HEAD_BYTES, new_offset)
+            self._pending[name] = {
+                "dev": st.st_dev, "ino": st.st_ino, "offset": new_offset,
+                "head_len": head_len, "head": _head_hash(f, head_len),
+            }
+        lines = (rotated + data[:end]).decode("utf-8", errors="ignore").splitlines()
+        if len(lines) > CURSOR_MAX_NEW_LINES:
+            self.skipped[name] = self.skipped.get(name, 0) + sum(len(l) + 1 for l in lines[:-CURSOR_MAX_NEW_LINES])
+            lines = lines[-CURSOR_MAX_NEW_LINES:]
+        return lines
+
+    def read_new(self, names: list[str]) -> dict:
+        """ 각 파일에서 지난 commit 이후 추가된 완성된 줄을 읽습니다. {name: [lines]} """
+        for name in names:
+            try:
+                lines = self._read_file(name)
+            except Exception as e:
+                print(f"Error reading log file {self.logs_dir / name}: {e}")
+                continue
+            if lines:
+                self.new_lines[name] = lines
+        return self.new_lines
+
+    def has_new(self) -> bool:
+        return any(self.new_lines.values())
+
+    # -- 출력 --
+    def excerpt(self) -> str:
+        """ 새 줄을 파일별 머리말과 함께 이어 붙입니다. """
+        parts = []
+        for name, lines in self.new_lines.items():
+            skipped = f", {self.skipped[name]} older bytes skipped" if name in self.skipped else ""
+            parts.append(f"--- {name} (+{len(lines)} new lines{skipped}) ---")
+            parts += lines
+        return "\n".join(parts)
+
+    def summary(self) -> str:
+        """ 이전 실행들에서 본 로그의 요약 (새 줄은 포함하지 않음) """
+        parts = []
+        for name, s in self.state["summary"].items():
+            runs = s.get("runs", [])
+            if not runs:
+                continue
+            lines = sum(r[1] for r in runs); errors = sum(r[2] for r in runs)
+            parts.append(f"- {name}: {lines} lines / {errors} error lines over the last {len(runs)} runs (since {runs[0][0]})")
+            parts += [f"    last error: {l}" for l in s.get("notable", [])]
+        return "\n".join(parts)
+
+    # -- 저장 --
+    def commit(self):
+        """ 이번에 읽은 위치와 요약을 저장합니다. (임시 파일에 쓴 뒤 교체) """
+        ts = datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z"
+        self.state["files"].update(self._pending)
+        for name, lines in self.new_lines.items():
+            s = self.state["summary"].setdefault(name, {"runs": [], "notable": []})
+            notable = [l[:300] for l in lines if _is_notable(l)]
+            s["runs"] = (s["runs"] + [[ts, len(lines), len(notable)]])[-SUMMARY_RUNS:]
+            s["notable"] = (s["notable"] + notable)[-SUMMARY_NOTABLE_LINES:]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._pending = {}
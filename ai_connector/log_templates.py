@@ -0,0 +1,124 @@
+# ai_connector/log_templates.py
+import os, re
+
+# Drain 방식의 로그 템플릿 추출기
+# - 같은 형태의 로그 줄(예: "[telegram] error: <*>")을 하나의 템플릿으로 묶고 개수, 처음/마지막 시각, 변수 예시만 남김
+# - 고정 깊이 파싱 트리: 토큰 수 -> 앞쪽 토큰 -> 후보 템플릿 목록 (줄마다 후보 몇 개만 비교하므로 한 번에 스트리밍 처리)
+TEMPLATE_SIM_THRESHOLD = float(os.environ.get("ADVISOR_TEMPLATE_SIM", 0.5))  # 같은 템플릿으로 볼 최소 토큰 일치율
+TEMPLATE_TREE_DEPTH = 4                                                     # 토큰 수 노드 + 앞쪽 토큰 (DEPTH - 2)개
+TEMPLATE_MAX_CHILDREN = 100                                                 # 노드당 자식 수 (초과분은 <*> 노드로)
+TEMPLATE_DIGEST_MAX = int(os.environ.get("ADVISOR_TEMPLATE_DIGEST_MAX", 50)) # 파일당 프롬프트에 넣을 템플릿 수
+SAMPLE_PARAMS = 3
+WILDCARD = "<*>"
+
+_TIMESTAMP = re.compile(r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?Z?)\]?\s*(?:-\s*)?")
+# 템플릿 비교 전에 변수로 바꿀 토큰 (토큰 전체가 일치할 때)
+_VARIABLE = re.compile(
+    r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"  # uuid
+    r"|[^@\s]+@[^@\s]+\.[a-zA-Z]{2,}"                                             # email
+    r"|(?:0x)?[0-9a-fA-F]{12,}"                                                   # hex
+    r"|[-+]?\d+(?:[.:,]\d+)*[a-zA-Z%]{0,3})[,.;:)]?$"                             # 숫자/시각/크기
+)
+_NOTABLE = ("ERROR", "CRITICAL", "Traceback", "failed", "FAILED", "error")
+
+
+class Cluster:
+    __slots__ = ("template", "count", "first_at", "last_at", "samples")
+
+    def __init__(self, tokens):
+        self.template = tokens
+        self.count = 0
+        self.first_at = self.last_at = None
+        self.samples = []
+
+    def text(self) -> str:
+        return " ".join(self.template)
+
+    def notable(self) -> bool:
+        t = self.text()
+        return any(m in t for m in _NOTABLE)
+
+
+class TemplateMiner:
+    """ 한 로그 파일의 줄을 순서대로 받아 템플릿으로 묶습니다. """
+
+    def __init__(self, sim_threshold: float = TEMPLATE_SIM_THRESHOLD):
+        self.sim_threshold = sim_threshold
+        self.root = {}
+        self.clusters = []
+        self.lines = 0
+
+    @staticmethod
+    def _has_digit(token: str) -> bool:
+        return any(ch.isdigit() for ch in token)
+
+    def _leaf(self, tokens) -> list:
+        """ 토큰 수와 앞쪽 토큰으로 후보 템플릿 목록(트리의 잎)을 찾거나 만듭니다. """
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:TEMPLATE_TREE_DEPTH - 2]:
+            key = WILDCARD if token == WILDCARD or self._has_digit(token) else token
+            if key not in node:
+                key = key if len(node) < TEMPLATE_MAX_CHILDREN else WILDCARD
+            node = node.setdefault(key, {})
+        return node.setdefault(None, [])
+
+    def _similarity(self, template, tokens) -> float:
+        same = sum(1 for a, b in zip(template, tokens) if a == b and a != WILDCARD)
+        return same / len(tokens)
+
+    def add(self, line: str) -> Cluster:
+        m = _TIMESTAMP.match(line)
+        ts = m.group(1) if m else None
+        raw = line[m.end():].split() if m else line.split()
+        if not raw:
+            return None
+        self.lines += 1
+        tokens = [WILDCARD if _VARIABLE.match(t) else t for t in raw]
+
+        candidates = self._leaf(tokens)
+        best, best_sim = None, -1.0
+        for cluster in candidates:
+            sim = self._similarity(cluster.template, tokens)
+            if sim > best_sim:
+                best, best_sim = cluster, sim
+        if best is None or best_sim < self.sim_threshold:
+            best = Cluster(tokens)
+            candidates.append(best)
+            self.clusters.append(best)
+        else:
+            best.template = [a if a == b else WILDCARD for a, b in zip(best.template, tokens)]
+
+        best.count += 1
+        if ts:
+            best.first_at = best.first_at or ts
+            best.last_at = ts
+        if len(best.samples) < SAMPLE_PARAMS:
+            params = tuple(r for t, r in zip(best.template, raw) if t == WILDCARD)
+            if params and params not in best.samples:
+                best.samples.append(params)
+        return best
+
+    def top(self, limit: int = TEMPLATE_DIGEST_MAX) -> list:
+        """ 오류성 템플릿을 먼저, 그 다음 많이 나온 순서로 반환합니다. """
+        return sorted(self.clusters, key=lambda c: (not c.notable(), -c.count))[:limit]
+
+
+def digest(new_lines: dict, limit: int = TEMPLATE_DIGEST_MAX) -> str:
+    """
+    {파일 이름: [줄]}을 파일별 템플릿 요약 텍스트로 만듭니다.
+    한 줄 형식: <개수>x [처음 ~ 마지막] 템플릿 | 변수 예시
+    """
+    parts = []
+    for name, lines in new_lines.items():
+        miner = TemplateMiner()
+        for line in lines:
+            miner.add(line)
+        top = miner.top(limit)
+        omitted = len(miner.clusters) - len(top)
+        parts.append(f"--- {name}: {miner.lines} lines -> {len(miner.clusters)} templates"
+                     + (f" ({omitted} rare templates omitted)" if omitted > 0 else "") + " ---")
+        for c in top:
+            when = f" [{c.first_at} ~ {c.last_at}]" if c.first_at else ""
+            samples = "; ".join(", ".join(p[:80] for p in s) for s in c.samples)
+            parts.append(f"{c.count}x{when} {c.text()}" + (f" | e.g. {samples}" if samples else ""))
+    return "\n".join(parts)
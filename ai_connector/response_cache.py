@@ -0,0 +1,112 @@
+# ai_connector/response_cache.py
+import os, re, json, time, sqlite3, hashlib, pathlib
+
+# Gemini 업그레이드 제안 응답 캐시 (로컬 SQLite)
+# - 키: 정규화한 프롬프트(숫자/시각/ID 제거) + 프롬프트 버전 + 모델의 해시 -> 같은 종류의 로그면 다시 호출하지 않음
+# - 저장 후 ADVISOR_CACHE_TTL_SECONDS가 지나면 만료, ADVISOR_CACHE_MAX_ENTRIES를 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+CACHE_PATH = pathlib.Path(os.environ.get("ADVISOR_CACHE_PATH", PROJECT_ROOT / "data" / "advisor_cache.db"))
+ADVISOR_CACHE_TTL_SECONDS = float(os.environ.get("ADVISOR_CACHE_TTL_SECONDS", 6 * 3600))
+ADVISOR_CACHE_MAX_ENTRIES = int(os.environ.get("ADVISOR_CACHE_MAX_ENTRIES", 256))
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used_at)",
+    "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+# 실행마다 달라지지만 진단 결과에는 영향이 없는 값 (순서대로 치환)
+_VOLATILE = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\b(?:0x)?[0-9a-fA-F]{12,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<n>"),
+    (re.compile(r"[ \t]+"), " "),
+]
+
+
+def normalize(text: str) -> str:
+    """ 시각/UUID/긴 16진수/숫자를 자리표시자로 바꾸고 공백을 정리합니다. """
+    for pattern, repl in _VOLATILE:
+        text = pattern.sub(repl, text)
+    return text.strip()
+
+def fingerprint(prompt: str, prompt_version: str, model: str) -> str:
+    h = hashlib.sha256()
+    for part in (prompt_version, model, normalize(prompt)):
+        h.update(part.encode("utf-8")); h.update(b"\x00")
+    return h.hexdigest()
+
+
+_conn = None
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(CACHE_PATH), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for sql in _SCHEMA:
+            conn.execute(sql)
+        _conn = conn
+    return _conn
+
+def _bump(conn, name: str):
+    conn.execute("INSERT INTO stats (name, value) VALUES (?, 1) "
+                 "ON CONFLICT (name) DO UPDATE SET value = value + 1", (name,))
+
+
+def get(key: str):
+    """ 만료되지 않은 응답(dict)을 반환합니다. 없으면 None. (적중/실패 횟수 기록) """
+    try:
+        conn = _connect()
+        now = time.time()
+        row = conn.execute("SELECT payload, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and now - row[1] > ADVISOR_CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            _bump(conn, "misses")
+            return None
+        conn.execute("UPDATE responses SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        _bump(conn, "hits")
+        return json.loads(row[0])
+    except Exception as e:
+        print(f"Warning: advisor cache read failed: {e}")
+        return None
+
+def put(key: str, model: str, payload: dict):
+    """ 응답을 저장하고, 만료되었거나 개수 상한을 넘은 항목을 정리합니다. """
+    try:
+        conn = _connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO responses (key, model, payload, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                         (key, model, json.dumps(payload, ensure_ascii=False), now, now))
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - ADVISOR_CACHE_TTL_SECONDS,))
+            conn.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                         (ADVISOR_CACHE_MAX_ENTRIES,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK"); raise
+    except Exception as e:
+        print(f"Warning: advisor cache write failed: {e}")
+
+def get_stats() -> dict:
+    conn = _connect()
+    stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    return {
+        "entries": conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+    }
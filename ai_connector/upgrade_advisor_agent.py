@@ -1,6 +1,6 @@
 # ai_connector/upgrade_advisor_agent.py
 
-import os, json, pathlib, datetime, sys
+import os, json, pathlib, datetime, sys, hashlib, threading
 from dotenv import load_dotenv
 
 # --- (SDK 및 내부 모듈 임포트) ---
@@ -9,6 +9,11 @@ from google.genai import types
 
 # I/O 로직 임포트 (내부 모듈)
 from ai_connector import data_io
+from ai_connector.log_cursor import LogCursor # 지난 실행 이후 추가된 로그만 읽기
+from ai_connector import response_cache # 같은 종류의 로그에 대한 응답 재사용
+from ai_connector import log_templates # 로그 줄 -> 템플릿 요약
+from common.log_rules import load_rules # 로그 진단 규칙 (한 번의 순회로 평가)
+from ai_connector.circuit_breaker import CircuitBreaker # 실행 간 유지되는 Gemini 장애 차단
 
 # --- (1. 초기 설정 및 환경 로드) ---
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
@@ -34,12 +39,53 @@ SYSTEM_PROMPT = (
 "Return a compact JSON object only: {need_upgrade:bool, reasons:list, new_features:list, priority:'low|normal|high', questions?:list}. "
 "If you detect missing configuration (API keys, notify, policy), add a 'questions' array in Korean with concise actionable items."
 )
-
-def _heuristic_check():
-    """ Gemini API 호출 실패 시 사용되는 휴리스틱 분석 로직. """
-    logs = data_io.read_system_logs() # data_io 모듈 사용
-
-    need = bool(logs and (("ERROR" in logs) or ("failed" in logs.lower())))
+# 프롬프트/생성 설정이 바뀌면 캐시된 응답을 쓰지 않도록 캐시 키에 포함
+GENERATION_SETTINGS = {"temperature": 0.1, "max_output_tokens": 700}
+PROMPT_VERSION = hashlib.sha1(json.dumps([SYSTEM_PROMPT, GENERATION_SETTINGS]).encode("utf-8")).hexdigest()[:12]
+
+RULES = load_rules()
+
+# Gemini 호출 제한: 호출 1회의 최대 시간, 연속 실패 시 호출을 멈추는 서킷 브레이커
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", 20))
+GEMINI_BREAKER_FAILURES = int(os.environ.get("GEMINI_BREAKER_FAILURES", 3))                   # 이 횟수만큼 연속 실패하면 open
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("GEMINI_BREAKER_COOLDOWN_SECONDS", 3600)) # open 후 시험 호출까지 대기
+BREAKER = CircuitBreaker("gemini", GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_COOLDOWN_SECONDS)
+
+_client = None
+
+def _get_client():
+    """ Gemini 클라이언트를 한 번만 만들어 재사용합니다. """
+    global _client
+    if _client is None:
+        _client = genai.Client(http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT_SECONDS * 1000)))
+    return _client
+
+def _generate(client, **kwargs):
+    """
+    generate_content를 GEMINI_TIMEOUT_SECONDS 안에 끝냅니다. (초과하면 TimeoutError)
+    SDK의 HTTP 타임아웃과 별도로, 재시도 등으로 길어져도 데몬 스레드에 남겨두고 바로 반환합니다.
+    """
+    result = {}
+    def call():
+        try:
+            result["response"] = client.models.generate_content(**kwargs)
+        except Exception as e:
+            result["error"] = e
+    worker = threading.Thread(target=call, name="gemini-call", daemon=True)
+    worker.start()
+    worker.join(GEMINI_TIMEOUT_SECONDS)
+    if worker.is_alive():
+        raise TimeoutError(f"Gemini call exceeded the {GEMINI_TIMEOUT_SECONDS:g}s deadline")
+    if "error" in result:
+        raise result["error"]
+    return result["response"]
+
+def _heuristic_check(rules=None):
+    """ Gemini API 호출 실패 시 사용되는 휴리스틱 분석 로직. (rules: 이미 평가한 규칙 결과, 없으면 최근 로그를 읽어 평가) """
+    if rules is None:
+        rules = RULES.evaluate(data_io.read_system_log_lines()) # data_io 모듈 사용
+
+    need = rules.need_upgrade
     questions = []
 
     # .env에서 GEMINI API 키 확인
@@ -54,57 +100,105 @@ def _heuristic_check():
 
     return {
         "need_upgrade": bool(need),
-        "reasons": ["local heuristic trigger" if need else "no critical error"],
+        "reasons": rules.reasons() if need else ["no critical error"],
         "new_features": [],
-        "priority": "normal" if need else "low",
+        "priority": rules.priority,
         "questions": questions,
         "source": "local-heuristic",
         "generated_at": datetime.datetime.utcnow().isoformat()+"Z"
     }
 
 def get_upgrade_suggestion():
-    """ 시스템 로그를 분석하고 Gemini API를 호출하여 업그레이드 제안을 받습니다. """
+    """
+    지난 실행 이후 추가된 로그를 분석하고 Gemini API를 호출하여 업그레이드 제안을 받습니다.
+    새 로그가 없으면 API를 호출하지 않습니다. 분석이 끝난 뒤에만 로그 읽기 위치를 저장합니다.
+    """
+    cursor = LogCursor(data_io.LOGS_DIR)
+    cursor.read_new(data_io.SYSTEM_LOG_FILES)
+    if cursor.has_new():
+        payload = _suggest(cursor)
+    else:
+        print("No new log lines since the last run. Skipping analysis.")
+        payload = _heuristic_check(RULES.evaluate([]))
+        payload["reasons"] = ["no new log lines since last run"]
+        payload["source"] = "log-cursor-idle"
+    cursor.commit()
+    return payload
+
+def _suggest(cursor):
+    """ 새 로그(와 이전 로그 요약)로 업그레이드 제안을 만듭니다. """
+    # 원문 대신 템플릿 요약(개수/시각/변수 예시)을 사용
+    logs_excerpt = log_templates.digest(cursor.new_lines)
+    # 규칙 평가는 한 번만 하고 프롬프트와 휴리스틱 폴백이 함께 사용
+    rules = RULES.evaluate(line for lines in cursor.new_lines.values() for line in lines)
 
     api_key = os.environ.get("GEMINI_API_KEY", "").strip()
     model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
 
     if not api_key:
         print("GEMINI_API_KEY not found in .env. Falling back to heuristic mode.")
-        return _heuristic_check()
+        return _heuristic_check(rules)
+
+    # 새 로그 + 이전 실행들의 요약 (같은 로그를 매번 다시 보내지 않음)
+    prompt = ("Log digest of lines new since last run "
+              "(format: <count>x [first ~ last] template | e.g. sample params; <*> = variable):\n"
+              f"```\n{logs_excerpt}\n```\n{rules.describe()}")
+    summary = cursor.summary()
+    if summary:
+        prompt += f"\nEarlier context (summary of previous runs):\n{summary}"
+
+    # 같은 종류의 로그(숫자/시각만 다른 경우)에 대한 이전 응답이 있으면 API를 호출하지 않음
+    cache_key = response_cache.fingerprint(prompt, PROMPT_VERSION, model)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print("Using cached Gemini payload for an equivalent log excerpt.")
+        cached["source"] = "google-gemini-cache"
+        return cached
+
+    # 최근 연속 실패로 서킷이 열려 있으면 호출하지 않고 바로 휴리스틱 사용
+    if not BREAKER.allow():
+        print(f"Gemini circuit is open (next probe in {BREAKER.retry_in():.0f}s). Falling back to heuristic mode.")
+        payload = _heuristic_check(rules)
+        payload["reasons"].append(f"gemini circuit open: {BREAKER.state['last_error']}")
+        payload["source"] = "gemini-circuit-open"
+        return payload
 
     try:
-        client = genai.Client()
+        client = _get_client()
     except Exception as e:
+        BREAKER.record_failure(f"client error: {e}")
         print(f"Gemini Client initialization failed: {e}. Falling back to heuristic mode.")
-        payload = _heuristic_check()
+        payload = _heuristic_check(rules)
         payload["reasons"] = [f"gemini client error: {e}"]
         payload["source"] = "gemini-error"
         return payload
 
-    # I/O 모듈을 통해 로그를 읽어옵니다.
-    logs_excerpt = data_io.read_system_logs()
-
     contents = [
         types.Content(
             role="user",
-            parts=[types.Part.from_text(f"Logs excerpt:\n```\n{logs_excerpt}\n```")]
+            parts=[types.Part.from_text(prompt)]
         )
     ]
 
     config = types.GenerateContentConfig(
         system_instruction=SYSTEM_PROMPT,
-        temperature=0.1,
-        max_output_tokens=700,
-        response_mime_type="application/json"
+        response_mime_type="application/json",
+        **GENERATION_SETTINGS
     )
 
     try:
         print(f"Calling Gemini API (model: {model})...")
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=config,
-        )
+        try:
+            response = _generate(
+                client,
+                model=model,
+                contents=contents,
+                config=config,
+            )
+        except Exception as e:
+            BREAKER.record_failure(str(e) or type(e).__name__)
+            raise
+        BREAKER.record_success()
 
         txt = response.text.strip()
 
@@ -112,9 +206,10 @@ def get_upgrade_suggestion():
             payload = json.loads(txt)
             payload["source"] = "google-gemini"
             print("Successfully received payload from Gemini.")
+            response_cache.put(cache_key, model, payload)
         except Exception:
             print("Model returned non-JSON. Falling back to heuristic mode.")
-            payload = _heuristic_check()
+            payload = _heuristic_check(rules)
             payload["reasons"] = [f"model returned non-JSON; fallback heuristic", txt[:400]]
             payload["source"] = "gemini-fallback"
 
@@ -122,20 +217,21 @@ def get_upgrade_suggestion():
 
     except Exception as e:
         print(f"Gemini call failed: {e}. Falling back to heuristic mode.")
-        payload = _heuristic_check()
+        payload = _heuristic_check(rules)
         payload["reasons"] = [f"gemini error: {e}"]
         payload["source"] = "gemini-error"
         return payload
 
 # --- (3. 메인 실행 함수) ---
-if __name__ == "__main__":
-
+def main():
+    """ 업그레이드 제안을 만들어 outbox에 저장하고 필요한 알림을 보냅니다. (run/runner_util의 프로세스 내 실행 진입점) """
     print("Running EternaLegacy AI Upgrade Advisor Agent...")
 
     req = get_upgrade_suggestion()
     path = data_io.write_request_payload(req) # data_io 모듈 사용
 
     print(f"Request payload written to: {path}")
+    print(f"Advisor cache stats: {response_cache.get_stats()}")
 
     # 설정 필요 알림
     if req.get("questions"):
@@ -149,3 +245,7 @@ if __name__ == "__main__":
         notify("🔄 EternaLegacy 업그레이드 제안", json.dumps(req, ensure_ascii=False)[:3500], level="update")
 
     print("AI Connector finished.")
+
+
+if __name__ == "__main__":
+    main()
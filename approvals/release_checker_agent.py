@@ -1,7 +1,10 @@
 # approvals/release_checker_agent.py
 import datetime
 import json
+import time
+import logging
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import os
 import pathlib
 from dotenv import load_dotenv
@@ -15,7 +18,10 @@ try:
     from notify.notify_agent import notify
     # (✨ 추가) backend 모듈 임포트
     from backend.database_agent import get_db
-    from backend.dependencies import Will # Will Pydantic 모델 사용
+    from backend import queries # 방언별 SQL 문장
+    from backend.policy import evaluate_release, policy_columns, load_policy, dump_policy # 릴리스 판단
+    from backend.db import rollback as db_rollback
+    from backend.dependencies import Will, ReleasePolicy # Pydantic 모델 사용
 except ImportError:
     print("Error: notify_agent/backend modules not found. Faking functions.")
     def notify(title, body, level="error"): print(f"[FAKE NOTIFY - {level.upper()}] {title}: {body}")
@@ -27,16 +33,149 @@ except ImportError:
     class DummyWill: pass
     Will = DummyWill
 
+# 로그 경로 설정 (배치 처리량 통계 기록)
+LOGS_DIR = PROJECT_ROOT / "logs"
+LOG_FILE = LOGS_DIR / "release_checker.log"
+LOGS_DIR.mkdir(parents=True, exist_ok=True)
+logger = logging.getLogger("release_checker")
 
-def check_and_release_wills():
+def _setup_logging():
     """
-    모든 유언장을 순회하며 릴리스 정책이 충족되었는지 확인합니다.
+    에이전트 전용 로그 파일 핸들러를 붙입니다. (명령행 진입점에서 호출, 여러 번 호출해도 한 번만)
+    루트 로거(basicConfig)를 쓰지 않으므로 run/runner_util의 프로세스 내 실행에서도 이 파일에 기록됩니다.
     """
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False # 실행기(hourly/daily_task.log)에 중복 기록하지 않음
+
+# .env에서 배치 크기 / 샤드 설정 읽기
+RELEASE_BATCH_SIZE = int(os.environ.get("RELEASE_BATCH_SIZE", 200))
+RELEASE_SHARDS = int(os.environ.get("RELEASE_SHARDS", 1))                   # 1이면 샤드 모드 사용 안 함
+RELEASE_WORKERS = int(os.environ.get("RELEASE_WORKERS", os.cpu_count() or 1)) # 노드당 동시 처리 프로세스 수
+RELEASE_SHARD_LOCK_NAMESPACE = 0x454C                                       # advisory lock 첫 번째 키 ('EL')
+# 릴리스 직후 바로 수신자 전달에 쓸 최대 시간(초). 남은 전달은 시간별 작업의 delivery 단계가 이어서 처리
+RELEASE_INLINE_DELIVERY_SECONDS = float(os.environ.get("RELEASE_INLINE_DELIVERY_SECONDS", 30))
+
+
+def _release_message(will_id, owner_email, reason):
+    return (f"🔥 EternaLegacy 유언장 릴리스",
+            f"유언장 ID: {will_id}\n소유자: {owner_email}\n자동 릴리스 조건 충족: **{reason}**")
+
+def _fetch_due_batch(cur, now_epoch, batch_size, shard):
+    """ 예정 시각이 지난 유언장 한 배치를 조회합니다. (PostgreSQL은 행 잠금, SQLite는 쓰기 잠금 선점) """
+    if queries.dialect() == "sqlite":
+        # SELECT와 UPDATE 사이에 다른 프로세스가 끼어들지 못하도록 배치 트랜잭션의 쓰기 잠금을 먼저 획득
+        if not cur.connection.in_transaction:
+            cur.execute("BEGIN IMMEDIATE")
+    if shard is None:
+        queries.execute(cur, "wills_release_due", (int(now_epoch), batch_size))
+    else:
+        index, count = shard
+        queries.execute(cur, "wills_release_due_shard", (int(now_epoch), count, index, batch_size))
+    return cur.fetchall()
+
+def _shard_lock_key(shard):
+    index, count = shard
+    return (RELEASE_SHARD_LOCK_NAMESPACE, count * 65536 + index)
+
+def _try_claim_shard(conn, cur, shard) -> bool:
+    """ (PostgreSQL) 샤드를 세션 advisory lock으로 점유합니다. 다른 노드가 처리 중이면 False. """
+    if shard is None or queries.dialect() != "postgres":
+        return True
+    queries.execute(cur, "release_shard_try_lock", _shard_lock_key(shard))
+    claimed = bool(cur.fetchone()[0])
+    conn.commit()
+    return claimed
+
+def _release_shard_claim(conn, cur, shard):
+    """ 풀로 반납되기 전에 세션 advisory lock을 해제합니다. 실패하면 연결을 닫아 잠금을 해제합니다. """
+    try:
+        db_rollback(conn)
+        queries.execute(cur, "release_shard_unlock", _shard_lock_key(shard))
+        conn.commit()
+    except Exception as e:
+        logger.warning(f"Failed to unlock shard {shard}, closing connection: {e}")
+        conn.close()
+
+def _process_batch(conn, cur, rows, now_epoch, current_time_str):
+    """
+    한 배치를 평가하고 하나의 트랜잭션으로 반영합니다.
+    커밋된 릴리스 목록 [(will_id, owner_email, reason), ...]을 반환합니다.
+    """
+    releases, reschedules, released = [], [], []
+    for w_row in rows:
+        will_id = w_row["id"]
+        # 정책 JSON을 파싱하지 않고 타입 컬럼만으로 판단 (타입 컬럼 백필 전의 행만 정책에서 계산)
+        cols = w_row if w_row["policy_type"] is not None else policy_columns(w_row["policy"])
+        result = evaluate_release(cols, now_epoch)
+        if not result["release"]:
+            # 예정 시각 컬럼이 타입 컬럼과 어긋난 경우: 다시 계산한 예정 시각으로 보정
+            reschedules.append((result["next_release_check_at"], will_id))
+            continue
+
+        # 정책 타입을 "released"로 변경하여 릴리스됨을 표시 (더 이상 검사 대상이 아님 -> NULL)
+        pol = load_policy(w_row["policy"]) or ReleasePolicy()
+        pol.type = "released"
+        pol.release_reason = result["reason"]
+        if w_row["last_heartbeat_at"] is not None:
+            # heartbeat API로 갱신된 마지막 heartbeat를 정책 기록에도 남김
+            pol.last_heartbeat_utc = datetime.datetime.fromtimestamp(w_row["last_heartbeat_at"], tz=datetime.timezone.utc)
+        # heartbeat 주기도 NULL로 지워 이후의 heartbeat가 예정 시각을 되살리지 않도록 함
+        releases.append((dump_policy(pol), "released", cols["release_after_at"], None, None, current_time_str, will_id))
+        released.append((will_id, w_row["owner_email"], result["reason"]))
+
+    # 배치 전체를 한 트랜잭션으로 일괄 업데이트
+    # 수신자 전달 대기열(will_deliveries)도 같은 트랜잭션에 기록 -> 릴리스 후 중단되어도 전달이 누락되지 않음
+    queries.executemany(cur, "will_update_policy", releases)
+    queries.executemany(cur, "will_reschedule_release_check", reschedules)
+    queries.executemany(cur, "will_deliveries_enqueue",
+                        [(int(now_epoch), current_time_str, current_time_str, will_id) for will_id, _, _ in released])
+    conn.commit()
+    return released
+
+def _count_invalid_policies(cur) -> int:
+    """ 정책 검증에 실패해 릴리스 검사 대상에서 빠진 유언장 수 (실패해도 릴리스 검사는 계속) """
+    try:
+        queries.execute(cur, "wills_invalid_policy_count")
+        return cur.fetchone()[0]
+    except Exception as e:
+        logger.warning(f"Could not count invalid policies: {e}")
+        db_rollback(cur.connection)
+        return 0
+
+def _deliver_released():
+    """ 릴리스된 유언장의 수신자에게 바로 전달합니다. (RELEASE_INLINE_DELIVERY_SECONDS 이내, 나머지는 delivery 단계에서) """
+    try:
+        from notify.delivery_engine import run_deliveries, _setup_logging as setup_delivery_logging
+        setup_delivery_logging()
+        print(f"Beneficiary deliveries: {run_deliveries(max_seconds=RELEASE_INLINE_DELIVERY_SECONDS)}")
+    except Exception as e:
+        logger.error(f"Beneficiary delivery run failed (will retry on next run): {e}")
+
+def check_and_release_wills(batch_size: int = None, shard: tuple = None, deliver: bool = True):
+    """
+    릴리스 예정 시각(next_release_check_at)이 지난 유언장만 배치 단위로 조회하여
+    릴리스 정책이 충족되었는지 확인합니다.
+    - 배치마다 일괄 UPDATE 후 한 번 커밋
+    - 알림은 DB 연결을 반납한 뒤에 전송 (느린 SMTP가 트랜잭션/연결을 붙잡지 않도록)
+    - shard=(번호, 샤드 수)이면 해당 샤드의 유언장만 처리 (PostgreSQL은 advisory lock으로 점유)
+    - deliver=False이면 수신자 전달은 대기열에만 기록하고 전송하지 않음 (샤드 워커)
+    """
+    batch_size = batch_size or RELEASE_BATCH_SIZE
     current_time_str = datetime.datetime.utcnow().isoformat() + "Z"
-    current_time_dt = datetime.datetime.fromisoformat(current_time_str.replace("Z", "+00:00"))
-    release_count = 0
+    now_epoch = time.time()
+    released = []
+    processed = 0
+    invalid_policies = 0
+    batch_latencies = []
+    label = f"shard {shard[0]}/{shard[1]}" if shard else "all"
 
-    print(f"Starting EternaLegacy release check at {current_time_str}...")
+    print(f"Starting EternaLegacy release check at {current_time_str} ({label}, batch_size={batch_size})...")
+    started = time.perf_counter()
 
     try:
         with get_db() as (conn, cur):
@@ -44,72 +183,131 @@ def check_and_release_wills():
                 notify("❌ 릴리스 체크 실패", "데이터베이스 연결에 실패했습니다.", level="error")
                 return 0
 
-            # 1. 'manual'이 아닌 유언장만 조회
-            placeholder = "%s" if os.environ.get("DB_MODE") == "production" else "?"
-            # 정책(policy) 필드를 조회합니다.
-            cur.execute(f"SELECT id, owner_email, policy FROM wills WHERE policy NOT LIKE {placeholder}",
-                        ('%"type": "manual"%'))
-            wills_to_check = cur.fetchall()
-
-            for w_row in wills_to_check:
-                will_id = w_row["id"]
-                owner_email = w_row["owner_email"]
-                pol = json.loads(w_row["policy"])
-                t = pol.get("type", "manual")
-
-                can_release_result = {"release": False, "reason": "none"}
-
-                if t == "time_lock":
-                    ts = pol.get("release_after_utc")
-                    if ts:
-                        release_time_dt = datetime.datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                        if current_time_dt >= release_time_dt:
-                            can_release_result = {"release": True, "reason": "time_lock_expired"}
-
-                elif t == "deadman":
-                    hb = pol.get("last_heartbeat_utc"); days_str = pol.get("heartbeat_interval_days", 30)
-                    try: days = int(days_str)
-                    except (ValueError, TypeError): days = 30
-                    if hb:
-                        last_hb_dt = datetime.datetime.fromisoformat(hb.replace("Z", "+00:00"))
-                        timeout_delta = datetime.timedelta(days=days)
-                        if current_time_dt - last_hb_dt > timeout_delta:
-                            can_release_result = {"release": True, "reason": "deadman_heartbeat_timeout"}
-
-                # 2. 릴리스 조건이 충족되면 정책 업데이트
-                if can_release_result["release"]:
-                    print(f"Will {will_id} condition met: {can_release_result['reason']}")
-
-                    # 정책을 "released" 상태로 변경 (또는 별도 필드를 사용)
-                    # 여기서는 정책 타입에 "released"를 추가하여 릴리스됨을 표시
-                    pol["type"] = "released"
-                    pol["release_reason"] = can_release_result["reason"]
-                    new_policy_json = json.dumps(pol)
-
-                    # DB 업데이트: policy 필드 변경
-                    cur.execute(
-                        f"UPDATE wills SET policy = {placeholder}, updated_at = {placeholder} WHERE id = {placeholder}",
-                        (new_policy_json, current_time_str, will_id)
-                    )
-                    conn.commit()
-                    release_count += 1
-
-                    # 3. 알림 전송
-                    notify(f"🔥 EternaLegacy 유언장 릴리스",
-                           f"유언장 ID: {will_id}\n소유자: {owner_email}\n자동 릴리스 조건 충족: **{can_release_result['reason']}**",
-                           level="warn") # 'warn' 레벨로 긴급 알림
-
-            print(f"Completed check. {release_count} wills released.")
-            return release_count
+            if not _try_claim_shard(conn, cur, shard):
+                print(f"Release check {label} is being processed by another node. Skipping.")
+                logger.info(f"Release check {label} skipped: shard lock held elsewhere")
+                return 0
+
+            # 잘못된 정책은 예정 시각이 없어 조회되지 않으므로 따로 집계 (샤드 모드에서는 0번 샤드만)
+            if shard is None or shard[0] == 0:
+                invalid_policies = _count_invalid_policies(cur)
+
+            try:
+                seen = set()
+                while True:
+                    batch_started = time.perf_counter()
+                    # 예정 시각이 지난 유언장만 조회 (인덱스 사용, manual/released 정책은 NULL이라 제외됨)
+                    rows = [r for r in _fetch_due_batch(cur, now_epoch, batch_size, shard) if r["id"] not in seen]
+                    if not rows:
+                        conn.commit()
+                        break
+                    seen.update(r["id"] for r in rows)
+
+                    released += _process_batch(conn, cur, rows, now_epoch, current_time_str)
+                    processed += len(rows)
+                    batch_latencies.append(time.perf_counter() - batch_started)
+
+                    if len(rows) < batch_size:
+                        break
+            finally:
+                if shard is not None and queries.dialect() == "postgres":
+                    _release_shard_claim(conn, cur, shard)
 
     except Exception as e:
-        print(f"Critical error during release check: {e}")
-        notify("❌ 릴리스 체크 실패", f"유언장 릴리스 에이전트 실행 중 오류: {e}", level="error")
-        return 0
+        print(f"Critical error during release check ({label}): {e}")
+        logger.exception(f"Release check {label} failed after {processed} wills: {e}")
+        notify("❌ 릴리스 체크 실패", f"유언장 릴리스 에이전트 실행 중 오류 ({label}): {e}", level="error")
+        # 이미 커밋된 배치의 알림은 아래에서 계속 전송
 
+    db_elapsed = time.perf_counter() - started
 
-if __name__ == "__main__":
-    check_and_release_wills()
+    if invalid_policies:
+        logger.warning(f"{invalid_policies} wills have invalid release policies and are never released "
+                       f"(wills.policy_type = 'invalid')")
+        notify("⚠️ 릴리스 정책 오류",
+               f"정책 검증에 실패한 유언장 {invalid_policies}건은 릴리스 검사 대상에서 제외됩니다. "
+               f"(wills.policy_type = 'invalid'인 행의 정책을 수정하세요)", level="warn")
+
+    # 커밋이 끝난 릴리스에 대해서만 알림 전송
+    for will_id, owner_email, reason in released:
+        print(f"Will {will_id} condition met: {reason}")
+        title, body = _release_message(will_id, owner_email, reason)
+        notify(title, body, level="warn") # 'warn' 레벨로 긴급 알림
+
+    # 릴리스된 유언장의 수신자에게 바로 전달 (시간 제한 초과분/실패분은 시간별 작업의 delivery 단계에서 처리)
+    if released and deliver:
+        _deliver_released()
+
+    # 처리량 통계 (run log)
+    total_elapsed = time.perf_counter() - started
+    stats = {
+        "scope": label,
+        "due_processed": processed,
+        "released": len(released),
+        "batches": len(batch_latencies),
+        "db_seconds": round(db_elapsed, 3),
+        "total_seconds": round(total_elapsed, 3),
+        "wills_per_sec": round(processed / db_elapsed, 1) if db_elapsed > 0 else 0.0,
+        "batch_latency_avg_ms": round(1000 * sum(batch_latencies) / len(batch_latencies), 1) if batch_latencies else 0.0,
+        "batch_latency_max_ms": round(1000 * max(batch_latencies), 1) if batch_latencies else 0.0,
+    }
+    logger.info(f"Release check stats: {json.dumps(stats)}")
+    print(f"Completed check. {len(released)} wills released ({processed} due). stats={stats}")
+    return len(released)
+
+
+def _check_shard(args):
+    """ (프로세스 풀 작업) 샤드 하나를 처리합니다. """
+    index, count, batch_size = args
+    return check_and_release_wills(batch_size=batch_size, shard=(index, count), deliver=False)
+
+def run_sharded(shards: int = None, workers: int = None, batch_size: int = None) -> int:
+    """
+    유언장을 해시 샤드로 나누어 프로세스 풀에서 병렬로 검사합니다.
+    여러 노드에서 동시에 실행해도 샤드 잠금과 행 잠금으로 한 유언장은 한 번만 릴리스됩니다.
+    """
+    shards = shards or RELEASE_SHARDS
+    workers = min(workers or RELEASE_WORKERS, shards)
+    started = time.perf_counter()
+    print(f"Starting sharded release check: {shards} shards on {workers} workers...")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_check_shard, [(i, shards, batch_size) for i in range(shards)]))
+
+    total = sum(results)
+    # 샤드 워커마다 전달 엔진을 돌리지 않고, 모든 샤드가 끝난 뒤 한 번만 전달
+    if total:
+        _deliver_released()
+    logger.info(f"Sharded release check finished: {total} released across {shards} shards "
+                 f"in {time.perf_counter() - started:.3f}s")
+    print(f"Sharded release check finished: {total} wills released.")
+    return total
+
+
+def run_cli(argv=None) -> int:
+    """ 명령행 인자로 실행하고 종료 코드를 반환합니다. (run/runner_util의 프로세스 내 실행 진입점) """
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--daemon", action="store_true",
+                    help="Run as a long-lived scheduler that releases wills at their exact due time")
+    ap.add_argument("--shards", type=int, default=RELEASE_SHARDS,
+                    help="Hash-partition wills into N shards checked in parallel (default: RELEASE_SHARDS)")
+    ap.add_argument("--workers", type=int, default=RELEASE_WORKERS,
+                    help="Worker processes for sharded mode (default: RELEASE_WORKERS)")
+    args = ap.parse_args(argv)
+    _setup_logging()
+
+    if args.daemon:
+        from approvals.release_scheduler import run_scheduler
+        run_scheduler()
+    elif args.shards > 1:
+        run_sharded(args.shards, args.workers)
+    else:
+        check_and_release_wills()
 
     # run_hourly_task.py에서 호출되도록, 실행 후에는 정상 종료 코드 반환
-    sys.exit(0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,229 @@
+# approvals/release_scheduler.py
+import heapq
+import os
+import pathlib
+import select
+import signal
+import sys
+import time
+from dotenv import load_dotenv
+
+# --- (1. 설정 및 모듈 임포트) ---
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+load_dotenv(PROJECT_ROOT / ".env")
+
+sys.path.append(str(PROJECT_ROOT))
+from backend.db import get_db, get_postgresql_connection
+from backend import queries
+from approvals.release_checker_agent import check_and_release_wills, logger # release_checker.log에 함께 기록
+
+DB_MODE = os.environ.get("DB_MODE", "development")
+# 메모리에 올릴 예정 시각의 범위(초)와 최대 개수. 범위 밖의 유언장은 주기적 재적재 때 들어옵니다.
+RELEASE_SCHEDULER_HORIZON_SECONDS = int(os.environ.get("RELEASE_SCHEDULER_HORIZON_SECONDS", 3600))
+RELEASE_SCHEDULER_MAX_ENTRIES = int(os.environ.get("RELEASE_SCHEDULER_MAX_ENTRIES", 100000))
+# SQLite(LISTEN 없음) 폴링 주기 / PostgreSQL에서도 놓친 NOTIFY를 보정하기 위한 전체 재적재 주기
+RELEASE_SCHEDULER_POLL_SECONDS = float(os.environ.get("RELEASE_SCHEDULER_POLL_SECONDS", 30))
+RELEASE_SCHEDULER_RELOAD_SECONDS = float(os.environ.get("RELEASE_SCHEDULER_RELOAD_SECONDS", 900))
+NOTIFY_CHANNEL = "will_release_schedule" # database/migrations.py (0003) 트리거 채널
+
+
+# --- (2. 예정 시각 큐) ---
+
+class ReleaseQueue:
+    """
+    (예정 시각, will_id) 최소 힙. 같은 유언장의 예정 시각이 바뀌면 새 항목을 넣고,
+    이전 항목은 꺼낼 때 _due와 비교해 버립니다. (lazy deletion)
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {} # will_id -> 현재 유효한 예정 시각
+
+    def __len__(self):
+        return len(self._due)
+
+    def set(self, will_id: str, due):
+        if due is None:
+            self._due.pop(will_id, None)
+            return
+        due = int(due)
+        if self._due.get(will_id) == due:
+            return
+        self._due[will_id] = due
+        heapq.heappush(self._heap, (due, will_id))
+
+    def replace_all(self, items):
+        self._due = {will_id: int(due) for will_id, due in items}
+        self._heap = [(due, will_id) for will_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def next_due(self):
+        while self._heap:
+            due, will_id = self._heap[0]
+            if self._due.get(will_id) == due:
+                return due
+            heapq.heappop(self._heap) # 오래된 항목
+        return None
+
+    def pop_due(self, now: float) -> list:
+        fired = []
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return fired
+            _, will_id = heapq.heappop(self._heap)
+            del self._due[will_id]
+            fired.append(will_id)
+
+
+# --- (3. 스케줄러) ---
+
+class ReleaseScheduler:
+    """ 예정 시각에 맞춰 릴리스 검사를 실행하는 상주 프로세스 """
+
+    def __init__(self):
+        self.queue = ReleaseQueue()
+        self.horizon_until = 0.0
+        self.next_reload_at = 0.0
+        self.last_reload = 0.0
+        self.listen_conn = None
+        self.stopping = False
+        # stop()이 대기 중인 select를 바로 깨우기 위한 self-pipe (시그널 후 select/sleep은 자동 재시작되므로)
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+
+    # -- 적재 --
+    def reload(self):
+        """ 범위 안의 예정 시각을 DB에서 다시 읽어 큐를 교체합니다. """
+        now = time.time()
+        horizon_until = now + RELEASE_SCHEDULER_HORIZON_SECONDS
+        with get_db() as (conn, cur):
+            if conn is None:
+                raise RuntimeError("DB connection unavailable")
+            queries.execute(cur, "wills_release_upcoming", (int(horizon_until), RELEASE_SCHEDULER_MAX_ENTRIES))
+            rows = cur.fetchall()
+        self.queue.replace_all((r["id"], r["next_release_check_at"]) for r in rows)
+        if len(rows) >= RELEASE_SCHEDULER_MAX_ENTRIES:
+            # 최대 개수로 잘린 경우, 마지막 항목 이후는 그 시각에 다시 읽음
+            # (범위 절반 전에 재적재하면 잘린 범위가 짧을 때 매 루프 재적재하게 됨)
+            horizon_until = rows[-1]["next_release_check_at"]
+            self.next_reload_at = max(horizon_until, now + RELEASE_SCHEDULER_POLL_SECONDS)
+        else:
+            self.next_reload_at = horizon_until - RELEASE_SCHEDULER_HORIZON_SECONDS / 2
+        self.horizon_until = horizon_until
+        self.last_reload = now
+        logger.info(f"Scheduler reloaded: {len(self.queue)} wills due before {int(horizon_until)}")
+
+    def on_schedule_change(self, payload: str):
+        """ NOTIFY payload('<will_id>:<epoch|빈값>')를 큐에 반영합니다. """
+        will_id, _, due = payload.rpartition(":")
+        if not will_id:
+            return
+        due = int(due) if due else None
+        if due is not None and due > self.horizon_until:
+            due = None # 범위 밖: 재적재 때 다시 들어옴
+        self.queue.set(will_id, due)
+
+    # -- LISTEN (PostgreSQL) --
+    def _listen(self):
+        if self.listen_conn is not None and not self.listen_conn.closed:
+            return self.listen_conn
+        conn = get_postgresql_connection()
+        if conn is None:
+            return None
+        conn.autocommit = True
+        with conn.cursor() as c:
+            c.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        self.listen_conn = conn
+        # 연결이 끊긴 동안 놓친 변경을 반영하기 위해 재적재
+        self.last_reload = 0.0
+        return conn
+
+    def _sleep(self, timeout: float, conn=None) -> bool:
+        """
+        timeout 동안 대기합니다. stop()이 호출되면 바로 깨어납니다.
+        conn(LISTEN 연결)이 주어지면 NOTIFY가 도착했을 때 True를 반환합니다.
+        """
+        watch = [self._wake_r] if conn is None else [self._wake_r, conn]
+        ready, _, _ = select.select(watch, [], [], max(0.0, timeout))
+        if self._wake_r in ready:
+            try:
+                while os.read(self._wake_r, 64):
+                    pass
+            except BlockingIOError:
+                pass
+        return conn is not None and conn in ready
+
+    def _wait(self, timeout: float):
+        """ 다음 예정 시각까지 대기합니다. PostgreSQL은 NOTIFY가 오면 즉시 깨어납니다. """
+        timeout = max(0.0, timeout)
+        if DB_MODE != "production":
+            self._sleep(min(timeout, RELEASE_SCHEDULER_POLL_SECONDS))
+            if time.time() - self.last_reload >= RELEASE_SCHEDULER_POLL_SECONDS:
+                self.last_reload = 0.0 # 폴링 주기마다 재적재
+            return
+        try:
+            conn = self._listen()
+            if conn is None:
+                self._sleep(min(timeout, RELEASE_SCHEDULER_POLL_SECONDS))
+                return
+            if not self._sleep(timeout, conn):
+                return
+            conn.poll()
+            while conn.notifies:
+                self.on_schedule_change(conn.notifies.pop(0).payload)
+        except Exception as e:
+            logger.warning(f"LISTEN connection lost: {e}")
+            try: self.listen_conn.close()
+            except Exception: pass
+            self.listen_conn = None
+            self._sleep(1)
+
+    # -- 실행 --
+    def fire(self, will_ids: list):
+        """ 예정 시각이 된 유언장을 기존 배치 릴리스 검사로 처리합니다. """
+        logger.info(f"Firing release check for {len(will_ids)} due wills")
+        check_and_release_wills()
+
+    def run(self):
+        logger.info("Release scheduler started.")
+        print(f"Release scheduler started (mode={DB_MODE}, horizon={RELEASE_SCHEDULER_HORIZON_SECONDS}s).")
+        while not self.stopping:
+            try:
+                now = time.time()
+                if now - self.last_reload >= RELEASE_SCHEDULER_RELOAD_SECONDS or now >= self.next_reload_at:
+                    self.reload()
+
+                fired = self.queue.pop_due(time.time())
+                if fired:
+                    self.fire(fired)
+                    continue
+
+                next_due = self.queue.next_due()
+                next_reload = min(self.last_reload + RELEASE_SCHEDULER_RELOAD_SECONDS, self.next_reload_at)
+                wake_at = next_reload if next_due is None else min(next_due, next_reload)
+                self._wait(wake_at - time.time())
+            except Exception as e:
+                logger.exception(f"Release scheduler error: {e}")
+                self._sleep(5)
+        logger.info("Release scheduler stopped.")
+
+    def stop(self, *_):
+        self.stopping = True
+        try:
+            os.write(self._wake_w, b"x")
+        except (BlockingIOError, OSError):
+            pass # 이미 깨우기 신호가 쌓여 있음
+
+
+def run_scheduler():
+    """ 릴리스 스케줄러 데몬을 실행합니다. (SIGTERM/SIGINT로 종료) """
+    scheduler = ReleaseScheduler()
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run()
+
+
+if __name__ == "__main__":
+    run_scheduler()
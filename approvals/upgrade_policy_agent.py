@@ -66,14 +66,18 @@ def main(auto=False):
 
     return 0
 
-if __name__ == "__main__":
+def run_cli(argv=None) -> int:
+    """ 명령행 인자로 실행하고 종료 코드를 반환합니다. (run/runner_util의 프로세스 내 실행 진입점) """
     ap = argparse.ArgumentParser()
     ap.add_argument("--auto", action="store_true", help="Run in automated mode (used by hourly scheduler)")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     try:
-        sys.exit(main(auto=args.auto))
+        return main(auto=args.auto)
     except Exception as e:
         print(f"Approver failed with unexpected error: {e}")
         notify("❌ EternaLegacy Approver 실패", f"Approver 에이전트 실행 중 치명적 오류 발생: {e}", level="error")
-        sys.exit(1)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -10,6 +10,8 @@
 from .dependencies import User, Token, Will
 from .db import get_db
 from .database_agent import get_current_user_dependency
+# 사용자 정보 변경/삭제 시 호출해야 하는 인증 캐시 무효화 훅
+from .principal_cache import invalidate_user as invalidate_cached_principal
 
 # (참고) 아래 임포트는 business_service.py에 해당 함수가 정의되어 있어야 합니다.
 # from .business_service import check_will_ownership_dependency, check_will_read_access_dependency
@@ -1,25 +1,38 @@
 # backend/business_service.py
 from typing import Dict, Any, List
-import base64, os, datetime, json
+import base64, os, datetime, json, uuid
 from fastapi import HTTPException
 from .config import DB_MODE, SECRET_KEY
 from .db import get_db
+from . import queries
+from .policy import policy_columns, dump_policy, release_shard
 # 순수 로직 모듈 임포트
 from .crypto import aes_encrypt_gcm, aes_decrypt_gcm
 from .versioning import sign_version, verify_signature
 from .blockchain import notarize_hash
 from .audit import audit
-from .dependencies import WillVersionRequest, User
+from .dependencies import WillVersionRequest, User, ReleasePolicy
 
 
 # NOTE: 이 파일에는 DB 트랜잭션과 순수 로직의 조합이 들어갑니다.
 
-def create_new_will(user: User, policy: Dict[str, Any]) -> str:
-    """ 새 유언장을 생성하고 DB에 저장합니다. """
-    # (로직 생략: DB 트랜잭션, UUID 생성 등)
-    audit(f"CREATE_WILL: {user.email}")
-    # ...
-    return "will-uuid-1234"
+def create_new_will(user: User, policy: ReleasePolicy) -> str:
+    """ 새 유언장을 생성하고 DB에 저장합니다. (policy는 라우터에서 검증된 ReleasePolicy) """
+    will_id = str(uuid.uuid4())
+    columns = policy_columns(policy)
+    now = datetime.datetime.utcnow().isoformat() + "Z"
+    with get_db() as (conn, cur):
+        if conn is None:
+            raise HTTPException(status_code=503, detail="DB service unavailable")
+        # 릴리스 검사기가 사용하는 타입 컬럼과 예정 시각을 정책과 함께 저장
+        queries.execute(cur, "will_insert", (
+            will_id, user.email, dump_policy(policy),
+            columns["policy_type"], columns["release_after_at"], columns["last_heartbeat_at"],
+            columns["heartbeat_interval_seconds"], columns["next_release_check_at"],
+            release_shard(will_id), now, now,
+        ))
+    audit(f"CREATE_WILL: {user.email} -> {will_id}")
+    return will_id
 
 def notarize_current_version(will_id: str, user: User, version_data: Dict[str, Any]):
     """ 현재 유언장 버전을 블록체인에 공증합니다. """
@@ -44,4 +57,26 @@ def notarize_current_version(will_id: str, user: User, version_data: Dict[str, A
         audit(f"NOTARIZE_FAIL: {will_id} by {user.email} -> {e}")
         raise HTTPException(status_code=500, detail=f"Blockchain notarization failed: {e}")
 
+NOTIFICATION_PAGE_MAX = 200
+_NO_CURSOR = 2 ** 63 - 1 # before_id가 없을 때 (첫 페이지)
+
+def get_notification_page(limit: int = 50, before_id: int = None, level: str = None) -> Dict[str, Any]:
+    """ 알림 이력을 최신순으로 한 페이지 조회합니다. (id keyset 페이지네이션) """
+    limit = max(1, min(limit, NOTIFICATION_PAGE_MAX))
+    cursor = before_id if before_id is not None else _NO_CURSOR
+    with get_db() as (conn, cur):
+        if conn is None:
+            raise HTTPException(status_code=503, detail="DB service unavailable")
+        if level:
+            queries.execute(cur, "notifications_page_by_level", (level, cursor, limit))
+        else:
+            queries.execute(cur, "notifications_page", (cursor, limit))
+        rows = cur.fetchall()
+    items = [{
+        "id": r["id"],
+        "timestamp": r["timestamp"].isoformat() if isinstance(r["timestamp"], datetime.datetime) else str(r["timestamp"]),
+        "level": r["level"], "title": r["title"], "body": r["body"], "status": r["status"],
+    } for r in rows]
+    return {"items": items, "next_before_id": items[-1]["id"] if len(items) == limit else None}
+
 # ... 기타 비즈니스 로직 (버전 조회, 권한 부여 등) ...
@@ -26,3 +26,40 @@ STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
 ETHEREUM_NODE_URL = os.environ.get("ETHEREUM_NODE_URL")
 ETHEREUM_PRIVATE_KEY = os.environ.get("ETHEREUM_PRIVATE_KEY")
 CONTRACT_ADDRESS = os.environ.get("CONTRACT_ADDRESS")
+
+# --- (5) DB 커넥션 풀 설정 (PostgreSQL, 워커 프로세스당) ---
+# gunicorn 워커마다 별도의 풀이 생성되므로, 총 연결 수는 워커 수 × DB_POOL_MAX_SIZE 입니다.
+DB_POOL_ENABLED = os.environ.get("DB_POOL_ENABLED", "true").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5)) # 커넥션 대여 대기 시간(초)
+DB_POOL_HEALTHCHECK_IDLE_SECONDS = float(os.environ.get("DB_POOL_HEALTHCHECK_IDLE_SECONDS", 30)) # 이 시간 이상 유휴 상태였던 연결은 재사용 전 검사
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.environ.get("DB_POOL_MAX_LIFETIME_SECONDS", 1800)) # 오래된 연결은 폐기 후 재생성
+DB_POOL_MAX_IDLE_SECONDS = float(os.environ.get("DB_POOL_MAX_IDLE_SECONDS", 600)) # (비동기 풀) 이 시간 이상 쓰이지 않은 여분 연결은 닫음
+
+# --- (6) 비밀번호 해싱 워커 풀 설정 ---
+# bcrypt는 CPU를 많이 쓰므로 이벤트 루프 밖의 전용 스레드 풀에서 실행합니다. (워커 프로세스당)
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 32)) # 대기열 한도 초과 시 즉시 503
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+# --- (7) 인증 주체(principal) 캐시 설정 (워커 프로세스당) ---
+# 다른 워커의 캐시는 무효화 훅이 닿지 않으므로, TTL이 워커 간 최대 지연 시간이 됩니다.
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+
+# --- (8) 쿼리 계층 설정 ---
+# PgBouncer(transaction 모드)처럼 세션 상태를 유지하지 않는 프록시 뒤에서는 false로 설정하세요.
+DB_PREPARED_STATEMENTS = os.environ.get("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("SQLITE_CACHED_STATEMENTS", 256))
+
+# --- (9) heartbeat 수집 설정 (워커 프로세스당) ---
+# heartbeat는 메모리에서 유언장별 최신 값만 남기고 주기적으로 일괄 반영합니다.
+# 프로세스가 비정상 종료되면 최대 HEARTBEAT_FLUSH_INTERVAL_SECONDS 동안의 heartbeat가 유실될 수 있습니다.
+HEARTBEAT_FLUSH_INTERVAL_SECONDS = float(os.environ.get("HEARTBEAT_FLUSH_INTERVAL_SECONDS", 2))
+HEARTBEAT_FLUSH_BATCH_SIZE = int(os.environ.get("HEARTBEAT_FLUSH_BATCH_SIZE", 1000))   # UPDATE 한 문장(트랜잭션)당 행 수
+HEARTBEAT_BUFFER_MAX_WILLS = int(os.environ.get("HEARTBEAT_BUFFER_MAX_WILLS", 50000)) # 초과 시 주기를 기다리지 않고 즉시 반영
+
+# --- (10) 운영자 설정 ---
+# 시스템 전체 알림 이력(/api/v1/notifications) 등 운영자 전용 API에 접근할 수 있는 이메일 (쉼표로 구분)
+OPERATOR_EMAILS = frozenset(e.strip().lower() for e in os.environ.get("OPERATOR_EMAILS", "").split(",") if e.strip())
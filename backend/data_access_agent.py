@@ -4,6 +4,9 @@ import pathlib
 import datetime
 import json
 
+# 로그 꼬리 읽기 (AI 진단 에이전트와 공용)
+from common.log_tail import SYSTEM_LOG_FILES, read_system_log_lines
+
 # EternaLegacy는 파일 시스템 경로에 영향을 주지 않으므로, 이 파일에는 이름 변경이 필요하지 않습니다.
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
@@ -17,18 +20,7 @@ def read_system_logs(n_lines=2000):
     """
     여러 로그 파일에서 최근 n줄의 로그를 읽어 병합합니다.
     """
-    merged_logs = []
-    log_files = [
-        "runtime.log", "update_audit.log", "recovery.log",
-        "hourly_task.log", "daily_task.log", "notify.log"
-    ]
-    for name in log_files:
-        p = LOGS_DIR / name
-        if p.exists():
-            try:
-                merged_logs += p.read_text(encoding="utf-8", errors="ignore").splitlines()[-n_lines:]
-            except Exception as e:
-                print(f"Error reading log file {p}: {e}")
+    merged_logs = read_system_log_lines(n_lines)
     return "\n".join(merged_logs) if merged_logs else "(no logs yet)"
 
 def write_request_payload(payload):
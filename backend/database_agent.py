@@ -5,35 +5,60 @@ from jose import jwt
 import bcrypt, datetime, os
 
 # 내부 모듈 통합
-from .config import SECRET_KEY, ALGORITHM, DB_MODE
+from .config import SECRET_KEY, ALGORITHM, OPERATOR_EMAILS
 from .db import get_db
+from . import queries # 방언별 SQL 문장 관리
 from .auth import verify_access_token
 # (✨ 수정) 'dependencies.py'에서 'oauth2_scheme'를 임포트합니다.
 from .dependencies import User, TokenData, Will, oauth2_scheme
 from .audit import audit # 감사 로깅 모듈
+from . import principal_cache # 검증된 토큰 -> User 캐시
 
 # --- (1. 인증 관련 DB 헬퍼) ---
+# SQL 문장은 queries.py에서 방언별로 컴파일/준비된 것을 사용합니다.
+
+def _row_to_user(row) -> User:
+    return User.model_validate({k: row[k] for k in ("email", "full_name", "created_at")})
 
 def get_user_from_db(conn, cur, email: str) -> Optional[User]:
     """ 이메일을 사용하여 DB에서 User 객체를 가져옵니다. """
-    placeholder = "%s" if DB_MODE == "production" else "?"
     # conn.row_factory 설정에 따라 dict 또는 Row 객체를 반환한다고 가정
-    cur.execute(f"SELECT email, full_name, created_at FROM users WHERE email = {placeholder}", (email,))
+    queries.execute(cur, "user_by_email", (email,))
     user_row = cur.fetchone()
     if user_row:
-        return User.model_validate(dict(user_row))
+        return _row_to_user(user_row)
     return None
 
+def get_user_with_password(conn, cur, email: str) -> tuple[Optional[User], Optional[str]]:
+    """ 사용자 정보와 해시된 비밀번호를 한 번의 쿼리로 가져옵니다. (로그인용) """
+    queries.execute(cur, "user_auth_by_email", (email,))
+    row = cur.fetchone()
+    if row:
+        return _row_to_user(row), row["hashed_password"]
+    return None, None
+
 def get_hashed_password(conn, cur, email: str) -> Optional[str]:
     """ 이메일을 사용하여 DB에서 해시된 비밀번호를 가져옵니다. """
-    placeholder = "%s" if DB_MODE == "production" else "?"
-    cur.execute(f"SELECT hashed_password FROM users WHERE email = {placeholder}", (email,))
-    password_row = cur.fetchone()
-    if password_row:
-        # SQLite는 튜플, PostgreSQL은 DictRow를 반환할 수 있음
-        return password_row["hashed_password"] if isinstance(password_row, dict) else password_row[0]
+    return get_user_with_password(conn, cur, email)[1]
+
+# --- (1-1. 인증 관련 비동기 DB 헬퍼: get_async_db의 커서와 함께 사용) ---
+
+async def get_user_from_db_async(conn, cur, email: str) -> Optional[User]:
+    """ get_user_from_db의 비동기 버전. """
+    await queries.execute_async(cur, "user_by_email", (email,))
+    user_row = await cur.fetchone()
+    if user_row:
+        return _row_to_user(user_row)
     return None
 
+async def get_user_with_password_async(conn, cur, email: str) -> tuple[Optional[User], Optional[str]]:
+    """ get_user_with_password의 비동기 버전. """
+    await queries.execute_async(cur, "user_auth_by_email", (email,))
+    row = await cur.fetchone()
+    if row:
+        return _row_to_user(row), row["hashed_password"]
+    return None, None
+
 # --- (2. FastAPI 의존성) ---
 
 def get_current_user_dependency(token: str = Depends(oauth2_scheme)) -> User:
@@ -41,6 +66,14 @@ def get_current_user_dependency(token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"},
     )
+
+    # 캐시 적중 시 JWT 서명 검증과 DB 조회를 모두 생략 (항목은 토큰 exp 이전에 만료됨)
+    cache_key = principal_cache.token_digest(token)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        audit(f"USER_ACCESS: {user.email}")
+        return user
+
     try:
         # auth.py의 로직 사용
         payload = verify_access_token(token, default_key=SECRET_KEY)
@@ -53,16 +86,24 @@ def get_current_user_dependency(token: str = Depends(oauth2_scheme)) -> User:
     # DB 연결 및 사용자 조회 (db.py의 get_db 사용)
     try:
         with get_db() as (conn, cur):
-            # PostgreSQL은 cursor_factory를 사용해 DictRow를 반환하도록 설정되었다고 가정
-            cur = conn.cursor()
+            # get_db가 제공하는 커서 사용 (PostgreSQL은 DictCursor, SQLite는 Row)
+            if conn is None: raise RuntimeError("DB connection unavailable")
             user = get_user_from_db(conn, cur, email=token_data.email)
-            cur.close()
     except Exception as e:
         audit(f"DB_ERROR: get_current_user: {e}")
         raise HTTPException(status_code=503, detail="DB service unavailable")
 
     if user is None: raise credentials_exception
 
+    principal_cache.put(cache_key, user, payload.get("exp"))
+
     # 감사 로깅
     audit(f"USER_ACCESS: {user.email}")
     return user
+
+def get_operator_user_dependency(current_user: User = Depends(get_current_user_dependency)) -> User:
+    """ 운영자(OPERATOR_EMAILS)만 허용하는 FastAPI 의존성 함수. 일반 사용자는 403. """
+    if current_user.email.lower() not in OPERATOR_EMAILS:
+        audit(f"OPERATOR_ACCESS_DENIED: {current_user.email}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operator access required")
+    return current_user
@@ -1,45 +1,289 @@
 # backend/db.py
 import os
+import time
 import sqlite3
+import asyncio
+import threading
+import collections
 import psycopg2
 import contextlib
+import aiosqlite
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 from psycopg2.extras import DictCursor
-from typing import ContextManager
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from typing import AsyncContextManager, ContextManager, Optional
 
 # config에서 DB 모드 임포트
-from .config import DB_MODE, PROJECT_ROOT
+from .config import (
+    DB_MODE, PROJECT_ROOT,
+    DB_POOL_ENABLED, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_HEALTHCHECK_IDLE_SECONDS, DB_POOL_MAX_LIFETIME_SECONDS, DB_POOL_MAX_IDLE_SECONDS,
+    SQLITE_CACHED_STATEMENTS,
+)
 
 # --- (1) DB 연결 설정 ---
 
+# DB 파일 경로를 프로젝트 루트의 'data' 폴더로 지정
+SQLITE_DB_PATH = PROJECT_ROOT / "data" / "eterna_legacy.db"
+
+def _postgresql_params() -> dict:
+    """ .env의 PostgreSQL 접속 정보 (동기/비동기 드라이버 공용) """
+    return dict(
+        dbname=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        host=os.environ.get("DB_HOST"),
+        port=os.environ.get("DB_PORT", 5432)
+    )
+
 def get_sqlite_connection():
     """ SQLite DB 연결을 반환합니다. (개발용) """
-    # DB 파일 경로를 프로젝트 루트의 'data' 폴더로 지정
-    db_path = PROJECT_ROOT / "data" / "eterna_legacy.db"
+    db_path = SQLITE_DB_PATH
     db_path.parent.mkdir(parents=True, exist_ok=True) # data 폴더 생성
     try:
-        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=SQLITE_CACHED_STATEMENTS)
         conn.row_factory = sqlite3.Row # 결과를 dict처럼 접근
         return conn
     except Exception as e:
         print(f"[FATAL] SQLite connection failed: {e}")
         return None
 
+class PreparingConnection(psycopg2.extensions.connection):
+    """ 이 연결에 PREPARE된 문장 이름을 기억하는 psycopg2 연결 (backend/queries.py에서 사용) """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+def rollback(conn):
+    """
+    트랜잭션을 롤백합니다. 준비된 문장이 있던 연결은 'DEALLOCATE ALL'로 서버와
+    클라이언트의 prepared statement 상태를 함께 초기화합니다.
+    """
+    conn.rollback()
+    prepared = getattr(conn, "prepared_statements", None)
+    if prepared:
+        with conn.cursor() as c:
+            c.execute("DEALLOCATE ALL")
+        conn.commit()
+        prepared.clear()
+
 def get_postgresql_connection():
     """ PostgreSQL DB 연결을 반환합니다. (프로덕션용) """
     try:
-        conn = psycopg2.connect(
-            dbname=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"),
-            password=os.environ.get("DB_PASSWORD"),
-            host=os.environ.get("DB_HOST"),
-            port=os.environ.get("DB_PORT", 5432)
-        )
+        conn = psycopg2.connect(**_postgresql_params(), connection_factory=PreparingConnection)
         return conn
     except Exception as e:
         print(f"[FATAL] PostgreSQL connection failed: {e}")
         return None
 
-# --- (2) DB 컨텍스트 매니저 (get_db) ---
+# --- (2) PostgreSQL 커넥션 풀 ---
+
+class PoolTimeoutError(Exception):
+    """ DB_POOL_TIMEOUT 안에 커넥션을 대여하지 못했을 때 발생합니다. """
+
+
+class PostgresConnectionPool:
+    """
+    워커 프로세스별 PostgreSQL 커넥션 풀.
+    - 최소/최대 크기, 대여 타임아웃
+    - 오래 유휴 상태였던 연결은 'SELECT 1'로 검사하고, 수명이 지난 연결은 재생성
+    """
+
+    def __init__(self, min_size: int, max_size: int, timeout: float,
+                 healthcheck_idle: float, max_lifetime: float):
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.max_lifetime = max_lifetime
+
+        self._cond = threading.Condition()
+        self._idle = collections.deque() # (conn, created_at, last_used_at)
+        self._created_at = {}            # id(conn) -> 생성 시각
+        self._size = 0                   # 현재 열려 있는 연결 수 (유휴 + 대여 중)
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0, "timeouts": 0, "connections_created": 0,
+            "connections_discarded": 0, "healthcheck_failures": 0,
+            "wait_time_total_ms": 0.0, "wait_time_max_ms": 0.0,
+        }
+
+        # 최소 크기만큼 미리 연결 (실패해도 대여 시 재시도)
+        for _ in range(self.min_size):
+            self._size += 1
+            conn = self._open()
+            if conn is None:
+                break
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+
+    def _open(self):
+        """ 미리 예약된 슬롯(_size)에 새 연결을 엽니다. 실패하면 슬롯을 반환합니다. """
+        conn = get_postgresql_connection()
+        with self._cond:
+            if conn is None:
+                self._size -= 1
+                self._cond.notify()
+            else:
+                self._created_at[id(conn)] = time.monotonic()
+                self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._created_at.pop(id(conn), None)
+            self._stats["connections_discarded"] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, created_at: float, last_used_at: float) -> bool:
+        """ 재사용 전 연결 상태를 확인합니다. """
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if now - last_used_at < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as c:
+                c.execute("SELECT 1")
+            conn.commit()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["healthcheck_failures"] += 1
+            return False
+
+    def getconn(self):
+        """ 풀에서 연결을 대여합니다. 연결 생성에 실패하면 None을 반환합니다. """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("connection pool is closed")
+                item = None
+                must_open = False
+                while item is None and not must_open:
+                    if self._idle:
+                        item = self._idle.pop() # LIFO: 최근 사용한 연결을 우선 재사용
+                    elif self._size < self.max_size:
+                        self._size += 1 # 락 안에서 슬롯을 먼저 예약
+                        must_open = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeoutError(
+                                f"no connection available within {self.timeout}s (max_size={self.max_size})")
+                        self._waiting += 1
+                        self._cond.wait(remaining)
+                        self._waiting -= 1
+
+            if must_open:
+                conn = self._open()
+            else:
+                conn, created_at, last_used_at = item
+                if not self._is_healthy(conn, created_at, last_used_at):
+                    self._discard(conn)
+                    continue
+
+            waited_ms = (time.monotonic() - started) * 1000
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total_ms"] += waited_ms
+                self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], waited_ms)
+            return conn
+
+    def putconn(self, conn):
+        """ 대여한 연결을 풀에 반납합니다. 깨진 연결은 폐기합니다. """
+        if conn.closed or self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                rollback(conn)
+        except Exception:
+            self._discard(conn)
+            return
+        with self._cond:
+            created_at = self._created_at.get(id(conn), time.monotonic())
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                "mode": "pooled",
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                **self._stats,
+                "wait_time_avg_ms": round(self._stats["wait_time_total_ms"] / checkouts, 3) if checkouts else 0.0,
+            }
+
+
+_pool: Optional[PostgresConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> Optional[PostgresConnectionPool]:
+    """ 현재 프로세스의 커넥션 풀을 반환합니다. (fork 이후에는 새로 생성) """
+    global _pool, _pool_pid
+    if DB_MODE != "production" or not DB_POOL_ENABLED:
+        return None
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            # 부모 프로세스에서 상속한 소켓은 공유하면 안 되므로 닫지 않고 버립니다.
+            _pool = PostgresConnectionPool(
+                DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+                DB_POOL_HEALTHCHECK_IDLE_SECONDS, DB_POOL_MAX_LIFETIME_SECONDS,
+            )
+            _pool_pid = pid
+    return _pool
+
+def get_pool_stats() -> dict:
+    """ 커넥션 풀 통계를 반환합니다. (/health 등에서 사용) """
+    if DB_MODE != "production":
+        return {"mode": "sqlite"}
+    if not DB_POOL_ENABLED:
+        return {"mode": "disabled"}
+    return get_pool().stats()
+
+def close_pool():
+    """ 현재 프로세스의 커넥션 풀을 닫습니다. (앱 종료 시) """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
+
+# --- (3) DB 컨텍스트 매니저 (get_db) ---
 
 @contextlib.contextmanager
 def get_db() -> ContextManager[tuple[sqlite3.Connection | psycopg2.extensions.connection,
@@ -47,12 +291,15 @@ def get_db() -> ContextManager[tuple[sqlite3.Connection | psycopg2.extensions.co
     """
     FastAPI 의존성 및 스크립트에서 사용할 DB 연결 컨텍스트 매니저.
     DB_MODE에 따라 다른 DB에 연결합니다.
+    프로덕션에서 DB_POOL_ENABLED이면 풀에서 연결을 대여하고, 종료 시 닫지 않고 반납합니다.
     """
     conn = None
     cur = None
+    pool = None
     try:
         if DB_MODE == "production":
-            conn = get_postgresql_connection()
+            pool = get_pool()
+            conn = pool.getconn() if pool else get_postgresql_connection()
             if conn:
                 cur = conn.cursor(cursor_factory=DictCursor) # 결과를 dict처럼 접근
         else:
@@ -74,9 +321,115 @@ def get_db() -> ContextManager[tuple[sqlite3.Connection | psycopg2.extensions.co
 
     except Exception as e:
         print(f"DB transaction error: {e}")
-        if conn: conn.rollback()
+        if conn:
+            try: rollback(conn)
+            except Exception: conn.close() # 상태를 알 수 없는 연결은 풀에 반납하지 않음
         # 예외를 다시 발생시켜 호출자에게 알림
         raise e
     finally:
-        if cur: cur.close()
-        if conn: conn.close()
+        if cur:
+            try: cur.close()
+            except Exception: pass
+        if conn:
+            if pool: pool.putconn(conn)
+            else: conn.close()
+
+# --- (4) 비동기 DB 컨텍스트 매니저 (get_async_db) ---
+# async 엔드포인트에서 이벤트 루프를 막지 않도록 psycopg3(async) / aiosqlite를 사용합니다.
+# 커넥션 풀은 워커 프로세스(이벤트 루프)마다 하나씩 생성됩니다.
+
+_async_pool: Optional[AsyncConnectionPool] = None
+_async_pool_lock = asyncio.Lock()
+
+async def get_async_pool() -> Optional[AsyncConnectionPool]:
+    """ 현재 워커의 비동기 PostgreSQL 커넥션 풀을 반환합니다. """
+    global _async_pool
+    if DB_MODE != "production" or not DB_POOL_ENABLED:
+        return None
+    if _async_pool is not None:
+        return _async_pool
+    async with _async_pool_lock:
+        if _async_pool is None:
+            pool = AsyncConnectionPool(
+                conninfo=psycopg.conninfo.make_conninfo(**_postgresql_params()),
+                min_size=min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+                max_size=DB_POOL_MAX_SIZE,
+                timeout=DB_POOL_TIMEOUT,
+                max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+                check=AsyncConnectionPool.check_connection, # 대여 전 연결 상태 확인
+                kwargs={"row_factory": dict_row},           # 결과를 dict처럼 접근
+                open=False,
+            )
+            await pool.open()
+            _async_pool = pool
+    return _async_pool
+
+def get_async_pool_stats() -> dict:
+    """ 비동기 커넥션 풀 통계를 반환합니다. """
+    if _async_pool is None:
+        return {"mode": "not_initialized" if DB_MODE == "production" else "sqlite"}
+    return {"mode": "pooled", **_async_pool.get_stats()}
+
+async def close_async_pool():
+    """ 비동기 커넥션 풀을 닫습니다. (앱 종료 시) """
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+@contextlib.asynccontextmanager
+async def get_async_db() -> AsyncContextManager[tuple[aiosqlite.Connection | psycopg.AsyncConnection,
+                                                      aiosqlite.Cursor | psycopg.AsyncCursor]]:
+    """
+    get_db의 비동기 버전. DB_MODE에 따라 psycopg3(async) 또는 aiosqlite에 연결합니다.
+    (conn, cur) 계약과 커밋/롤백 동작은 get_db와 같으며, 쿼리는 'await cur.execute(...)'로 실행합니다.
+    풀에서 DB_POOL_TIMEOUT 안에 연결을 받지 못하면 get_db와 같이 PoolTimeoutError가 발생합니다.
+    """
+    conn = None
+    cur = None
+    pool = None
+    try:
+        try:
+            if DB_MODE == "production":
+                pool = await get_async_pool()
+                if pool:
+                    try:
+                        conn = await pool.getconn()
+                    except PoolTimeout as e:
+                        # 동기 풀(get_db)과 같이 PoolTimeoutError로 알림 (API는 503)
+                        raise PoolTimeoutError(
+                            f"no connection available within {DB_POOL_TIMEOUT}s (max_size={DB_POOL_MAX_SIZE})") from e
+                else:
+                    conn = await psycopg.AsyncConnection.connect(**_postgresql_params(), row_factory=dict_row)
+            else:
+                SQLITE_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+                conn = await aiosqlite.connect(SQLITE_DB_PATH)
+                conn.row_factory = aiosqlite.Row # 결과를 dict처럼 접근
+            cur = await conn.cursor() if DB_MODE != "production" else conn.cursor()
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            print(f"[FATAL] Async DB connection failed: {e}")
+
+        if conn is None or cur is None:
+            print("Warning: Could not establish async DB connection. Returning (None, None).")
+            yield (None, None)
+        else:
+            yield (conn, cur)
+
+            await conn.commit() # 트랜잭션 완료
+
+    except Exception as e:
+        print(f"Async DB transaction error: {e}")
+        if conn:
+            try: await conn.rollback()
+            except Exception: pass
+        raise e
+    finally:
+        if cur:
+            try: await cur.close()
+            except Exception: pass
+        if conn:
+            if pool: await pool.putconn(conn)
+            else: await conn.close()
@@ -1,6 +1,6 @@
 # backend/dependencies.py
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from typing import List, Optional, Dict, Any, Literal
 from fastapi.security import OAuth2PasswordBearer
 import datetime
 
@@ -51,6 +51,45 @@ class Grant(BaseModel):
     role: str # 'viewer', 'approver'
     created_at: str
 
+class ReleasePolicy(BaseModel):
+    """
+    유언장 릴리스 정책 (wills.policy JSON의 검증된 형태).
+    알 수 없는 키는 그대로 보존하며, 주요 필드는 wills의 타입 컬럼으로도 저장됩니다. (backend/policy.py)
+    """
+    model_config = ConfigDict(extra="allow")
+
+    type: Literal["manual", "time_lock", "deadman", "released"] = "manual"
+    release_after_utc: Optional[datetime.datetime] = None   # time_lock
+    last_heartbeat_utc: Optional[datetime.datetime] = None  # deadman
+    heartbeat_interval_days: int = Field(default=30, ge=1)  # deadman
+    release_reason: Optional[str] = None                    # released
+
+    @field_validator("release_after_utc", "last_heartbeat_utc")
+    @classmethod
+    def _assume_utc(cls, v: Optional[datetime.datetime]):
+        # 시간대가 없는 시각은 UTC로 간주
+        if v is not None and v.tzinfo is None:
+            v = v.replace(tzinfo=datetime.timezone.utc)
+        return v
+
+    @model_validator(mode="after")
+    def _check_required(self):
+        if self.type == "time_lock" and self.release_after_utc is None:
+            raise ValueError("time_lock policy requires release_after_utc")
+        return self
+
+class NotificationRecord(BaseModel):
+    id: int
+    timestamp: str
+    level: str
+    title: str
+    body: Optional[str] = None
+    status: Optional[str] = None
+
+class NotificationPage(BaseModel):
+    items: List[NotificationRecord]
+    next_before_id: Optional[int] = None # 다음 페이지 요청 시 before_id로 전달 (없으면 마지막 페이지)
+
 class HeartbeatRequest(BaseModel):
     last_heartbeat_utc: str
 
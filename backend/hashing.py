@@ -0,0 +1,92 @@
+# backend/hashing.py
+import time
+import asyncio
+import threading
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+
+from .config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, BCRYPT_ROUNDS
+
+# NOTE: bcrypt(pyca)는 해시 계산 중 GIL을 해제하므로, 프로세스 풀 없이 스레드 풀로도
+#       여러 코어에서 병렬 실행되며 이벤트 루프를 막지 않습니다.
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_pending = 0 # 실행 중 + 대기 중인 작업 수
+_stats = {
+    "submitted": 0, "rejected": 0,
+    "queue_wait_total_ms": 0.0, "queue_wait_max_ms": 0.0,
+    "hash_time_total_ms": 0.0, "hash_time_max_ms": 0.0,
+}
+
+def _reserve_slot():
+    """ 대기열에 자리가 없으면 503으로 즉시 실패합니다. """
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+        _stats["submitted"] += 1
+
+def _release_slot():
+    global _pending
+    with _lock:
+        _pending -= 1
+
+def _record(wait_ms: float, hash_ms: float):
+    with _lock:
+        _stats["queue_wait_total_ms"] += wait_ms
+        _stats["queue_wait_max_ms"] = max(_stats["queue_wait_max_ms"], wait_ms)
+        _stats["hash_time_total_ms"] += hash_ms
+        _stats["hash_time_max_ms"] = max(_stats["hash_time_max_ms"], hash_ms)
+
+async def _run(fn, *args):
+    """ 해싱 작업을 전용 풀에서 실행하고 대기/실행 시간을 기록합니다. """
+    _reserve_slot()
+    enqueued = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            _record((started - enqueued) * 1000, (finished - started) * 1000)
+
+    try:
+        future = _executor.submit(job)
+    except Exception:
+        _release_slot(); raise
+    # 요청이 취소(클라이언트 연결 끊김)되어도 bcrypt 작업은 계속 실행되므로,
+    # 자리는 await가 아니라 작업이 실제로 끝나거나 시작 전에 취소될 때 반환
+    future.add_done_callback(lambda _: _release_slot())
+    return await asyncio.wrap_future(future)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """ 평문 비밀번호가 bcrypt 해시와 일치하는지 워커 풀에서 검증합니다. """
+    return await _run(bcrypt.checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+async def hash_password(plain_password: str) -> str:
+    """ 평문 비밀번호를 워커 풀에서 bcrypt로 해싱합니다. """
+    hashed = await _run(lambda pw: bcrypt.hashpw(pw, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)),
+                        plain_password.encode('utf-8'))
+    return hashed.decode('utf-8')
+
+def get_hash_pool_stats() -> dict:
+    """ 해싱 워커 풀 통계 (대기열 깊이, 대기/해싱 시간) """
+    with _lock:
+        completed = _stats["submitted"] - _pending
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "pending": _pending,
+            **_stats,
+            "queue_wait_avg_ms": round(_stats["queue_wait_total_ms"] / completed, 3) if completed else 0.0,
+            "hash_time_avg_ms": round(_stats["hash_time_total_ms"] / completed, 3) if completed else 0.0,
+        }
@@ -0,0 +1,118 @@
+# backend/heartbeat_buffer.py
+import time
+import threading
+from psycopg2.extras import execute_values
+
+from .config import HEARTBEAT_FLUSH_INTERVAL_SECONDS, HEARTBEAT_FLUSH_BATCH_SIZE, HEARTBEAT_BUFFER_MAX_WILLS
+from .db import get_db
+from . import queries
+
+# 데드맨 heartbeat를 워커 메모리에 모았다가 일괄 반영합니다. (write coalescing)
+# - (유언장, 요청자)별로 가장 최신 heartbeat 하나만 보관하므로, 같은 유언장의 반복 ping은 DB 쓰기 1회로 합쳐집니다.
+# - 반영 시 소유자 확인과 예정 시각(next_release_check_at) 재계산을 UPDATE 한 문장에서 처리합니다.
+# - 실패한 배치는 버퍼로 되돌려 다음 주기에 다시 시도합니다.
+
+_lock = threading.Lock()
+_pending: dict[tuple[str, str], int] = {} # (will_id, 요청자 email) -> heartbeat epoch
+_wakeup = threading.Event()
+_stop = threading.Event()
+_thread = None
+_stats = {"received": 0, "coalesced": 0, "flushes": 0, "rows_written": 0, "errors": 0,
+          "last_flush_ms": 0.0, "max_flush_ms": 0.0}
+
+def record(will_id: str, owner_email: str, heartbeat_at: float):
+    """ heartbeat 하나를 버퍼에 기록합니다. (DB 접근 없음) """
+    heartbeat_at = int(heartbeat_at)
+    with _lock:
+        _stats["received"] += 1
+        key = (will_id, owner_email)
+        current = _pending.get(key)
+        if current is not None:
+            _stats["coalesced"] += 1
+            if current >= heartbeat_at:
+                return
+        _pending[key] = heartbeat_at
+        full = len(_pending) >= HEARTBEAT_BUFFER_MAX_WILLS
+    if full:
+        _wakeup.set()
+
+def _requeue(items):
+    """ 반영에 실패한 항목을 (더 최신 값이 없을 때만) 버퍼로 되돌립니다. """
+    with _lock:
+        for key, heartbeat_at in items:
+            current = _pending.get(key)
+            if current is None or current < heartbeat_at:
+                _pending[key] = heartbeat_at
+
+def _apply(cur, items):
+    if queries.dialect() == "postgres":
+        rows = [(hb, will_id, owner_email) for (will_id, owner_email), hb in items]
+        execute_values(cur, queries.sql("will_heartbeat_apply"), rows,
+                       template="(%s::bigint, %s, %s)", page_size=len(rows))
+    else:
+        rows = [(hb, hb, will_id, owner_email, hb) for (will_id, owner_email), hb in items]
+        cur.executemany(queries.sql("will_heartbeat_apply"), rows)
+
+def flush() -> int:
+    """ 버퍼의 heartbeat를 배치 단위로 DB에 반영하고, 반영을 시도한 유언장 수를 반환합니다. """
+    with _lock:
+        if not _pending:
+            return 0
+        items = list(_pending.items())
+        _pending.clear()
+
+    started = time.perf_counter()
+    written = 0
+    for i in range(0, len(items), HEARTBEAT_FLUSH_BATCH_SIZE):
+        batch = items[i:i + HEARTBEAT_FLUSH_BATCH_SIZE]
+        try:
+            with get_db() as (conn, cur):
+                if conn is None:
+                    raise RuntimeError("DB connection unavailable")
+                _apply(cur, batch)
+            written += len(batch)
+        except Exception as e:
+            print(f"Heartbeat flush failed ({len(items) - i} pending): {e}")
+            _requeue(items[i:])
+            with _lock: _stats["errors"] += 1
+            break
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _lock:
+        _stats["flushes"] += 1
+        _stats["rows_written"] += written
+        _stats["last_flush_ms"] = round(elapsed_ms, 1)
+        _stats["max_flush_ms"] = round(max(_stats["max_flush_ms"], elapsed_ms), 1)
+    return written
+
+def _run():
+    while not _stop.is_set():
+        _wakeup.wait(HEARTBEAT_FLUSH_INTERVAL_SECONDS)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception as e:
+            print(f"Heartbeat flusher error: {e}")
+
+def start():
+    """ 백그라운드 반영 스레드를 시작합니다. (앱 시작 시 1회) """
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="heartbeat-flusher", daemon=True)
+    _thread.start()
+
+def stop():
+    """ 반영 스레드를 멈추고 남은 heartbeat를 마지막으로 반영합니다. (앱 종료 시) """
+    global _thread
+    _stop.set()
+    _wakeup.set()
+    if _thread is not None:
+        _thread.join(timeout=HEARTBEAT_FLUSH_INTERVAL_SECONDS + 5)
+        _thread = None
+    flush()
+
+def get_stats() -> dict:
+    with _lock:
+        return {**_stats, "pending": len(_pending), "flush_interval_seconds": HEARTBEAT_FLUSH_INTERVAL_SECONDS}
@@ -1,36 +1,50 @@
 # backend/main.py (최종 FastAPI 앱)
 
-from fastapi import FastAPI, Depends, HTTPException, status, Body, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Body, Request, Query
+from fastapi.responses import JSONResponse
 from typing import List, Optional, Dict, Any
-import json, os, stripe
+import json, os, time, stripe
 
 # 내부 모듈 임포트
 from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES # 설정
-from .db import get_db # DB 컨텍스트 매니저
-from .dependencies import User, LoginRequest, Token, Will, WillVersionRequest # 모델 및 의존성
-from .database_agent import get_current_user_dependency, get_hashed_password, get_user_from_db # DB/Auth 로직
-from .business_service import create_new_will, notarize_current_version # 비즈니스 로직
+from .db import get_db, get_async_db # DB 컨텍스트 매니저 (동기 / async 엔드포인트용)
+from .db import get_pool_stats, close_pool, get_async_pool_stats, close_async_pool, PoolTimeoutError # 커넥션 풀
+from .dependencies import User, LoginRequest, Token, Will, WillVersionRequest, HeartbeatRequest, ReleasePolicy, NotificationPage # 모델 및 의존성
+from .database_agent import get_current_user_dependency, get_operator_user_dependency, get_user_with_password_async # DB/Auth 로직
+from .business_service import create_new_will, notarize_current_version, get_notification_page # 비즈니스 로직
 from .auth import create_access_token # JWT 생성
+from .hashing import verify_password, get_hash_pool_stats # bcrypt 워커 풀
+from . import principal_cache # 인증 주체 캐시 (통계)
+from . import heartbeat_buffer # heartbeat 일괄 반영 버퍼
+from .policy import parse_utc
 from .audit import audit # 감사 로깅
 
 app = FastAPI(title="EternaLegacy API", version="v1.0.0")
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """ 동기/비동기 커넥션 풀이 모두 고갈되면 503으로 응답합니다. """
+    audit(f"DB_POOL_TIMEOUT: {request.url.path} - {exc}")
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={"detail": "Database service busy, please retry"}, headers={"Retry-After": "1"})
+
 # --- (1. 인증 라우터 - legacy.py 통합) ---
 
 @app.post("/api/v1/auth/token", response_model=Token)
 async def login_for_access_token(form_data: LoginRequest = Body(...)):
     """ 이메일/비밀번호로 로그인하여 JWT 토큰을 발급받습니다. """
     try:
-        with get_db() as conn:
-            cur = conn.cursor()
-            user = get_user_from_db(conn, cur, form_data.email)
-            hashed_password = get_hashed_password(conn, cur, form_data.email)
-            cur.close()
+        # async 엔드포인트이므로 이벤트 루프를 막지 않는 비동기 DB 경로 사용
+        async with get_async_db() as (conn, cur):
+            if conn is None: raise RuntimeError("DB connection unavailable")
+            # 사용자 정보와 비밀번호 해시를 한 번의 쿼리로 조회
+            user, hashed_password = await get_user_with_password_async(conn, cur, form_data.email)
     except Exception as e:
         audit(f"LOGIN_FAIL_DB: {form_data.email} - {e}")
         raise HTTPException(status_code=503, detail="Database service unavailable")
 
-    if user is None or not bcrypt.checkpw(form_data.password.encode('utf-8'), hashed_password.encode('utf-8')):
+    # bcrypt 검증은 전용 워커 풀에서 실행 (대기열이 가득 차면 503)
+    if user is None or hashed_password is None or not await verify_password(form_data.password, hashed_password):
         audit(f"LOGIN_FAIL_CREDENTIALS: {form_data.email}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
 
@@ -49,8 +63,8 @@ def list_my_wills(current_user: User = Depends(get_current_user_dependency)):
     return [] # 임시
 
 @app.post("/api/v1/wills", status_code=status.HTTP_201_CREATED)
-def create_will(policy: Dict[str, Any] = Body(...), current_user: User = Depends(get_current_user_dependency)):
-    """ 새 유언장 객체를 생성합니다. """
+def create_will(policy: ReleasePolicy = Body(...), current_user: User = Depends(get_current_user_dependency)):
+    """ 새 유언장 객체를 생성합니다. (정책은 ReleasePolicy로 검증, 실패 시 422) """
     will_id = create_new_will(current_user, policy) # business_service 호출
     return {"id": will_id}
 
@@ -70,6 +84,30 @@ def notarize_will(will_id: str, current_user: User = Depends(get_current_user_de
     audit(f"WILL_NOTARIZE_REQUEST: {will_id} by {current_user.email}")
     return result
 
+@app.post("/api/v1/wills/{will_id}/heartbeat", status_code=status.HTTP_202_ACCEPTED)
+async def record_heartbeat(will_id: str, heartbeat: HeartbeatRequest, current_user: User = Depends(get_current_user_dependency)):
+    """
+    데드맨 정책의 생존 신호(heartbeat)를 기록합니다.
+    버퍼에 모았다가 일괄 반영하므로 요청마다 DB에 쓰지 않습니다. (소유자가 아니거나 데드맨이 아닌 유언장은 반영 시 무시)
+    """
+    hb_dt = parse_utc(heartbeat.last_heartbeat_utc)
+    if hb_dt is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid last_heartbeat_utc")
+    # 미래 시각으로 데드맨 기한을 늘릴 수 없도록 서버 시각으로 제한
+    heartbeat_buffer.record(will_id, current_user.email, min(hb_dt.timestamp(), time.time()))
+    return {"status": "accepted"}
+
+# --- (2-1. 알림 이력) ---
+
+@app.get("/api/v1/notifications", response_model=NotificationPage)
+def list_notifications(limit: int = Query(50, ge=1, le=200), before_id: Optional[int] = None, level: Optional[str] = None,
+                       current_user: User = Depends(get_operator_user_dependency)):
+    """
+    시스템 알림 이력을 최신순으로 조회합니다. (next_before_id를 before_id로 넘기면 다음 페이지)
+    다른 사용자의 유언장 ID/이메일과 내부 오류 내용이 포함되므로 운영자(OPERATOR_EMAILS)만 조회할 수 있습니다.
+    """
+    return get_notification_page(limit, before_id, level)
+
 # --- (3. 웹훅 라우터 - legacy.py 통합) ---
 # NOTE: 환경 변수 STRIPE_WEBHOOK_SECRET는 config.py에서 관리됩니다.
 
@@ -86,14 +124,18 @@ async def stripe_webhook(request: Request):
 def health_check():
     """ DB 연결 및 서비스 상태 확인. """
     try:
-        with get_db() as conn:
-            cur = conn.cursor()
+        with get_db() as (conn, cur):
+            if conn is None:
+                raise RuntimeError("connection failed/misconfigured")
             cur.execute("SELECT 1")
-            cur.close()
-        return {"status": "ok", "db": "connected"}
+        return {"status": "ok", "db": "connected", "db_pool": get_pool_stats(), "db_async_pool": get_async_pool_stats(),
+                "password_hashing": get_hash_pool_stats(), "principal_cache": principal_cache.get_stats(),
+                "heartbeat_buffer": heartbeat_buffer.get_stats()}
     except Exception as e:
         audit(f"HEALTH_CHECK_FAIL: {e}")
-        return {"status": "error", "db": f"failed: {e}"}
+        return {"status": "error", "db": f"failed: {e}", "db_pool": get_pool_stats(), "db_async_pool": get_async_pool_stats(),
+                "password_hashing": get_hash_pool_stats(), "principal_cache": principal_cache.get_stats(),
+                "heartbeat_buffer": heartbeat_buffer.get_stats()}
 
 # --- (앱 시작 시 설정 유효성 검사) ---
 @app.on_event("startup")
@@ -107,3 +149,12 @@ async def startup_event():
 
     if missing:
         print(f"⚠️ WARNING: Missing critical environment variables: {', '.join(missing)}")
+
+    heartbeat_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 남은 heartbeat를 반영한 뒤, 워커 종료 시 풀에 남아 있는 PostgreSQL 연결을 정리
+    heartbeat_buffer.stop()
+    close_pool()
+    await close_async_pool()
@@ -0,0 +1,125 @@
+# backend/policy.py
+import json
+import math
+import zlib
+import datetime
+from typing import Any, Dict, Optional, Union
+from pydantic import ValidationError
+
+from .dependencies import ReleasePolicy
+
+# 유언장 릴리스 정책의 검증과 시간 계산을 한곳에서 담당합니다.
+# - 정책은 ReleasePolicy 모델로 검증하고, 주요 필드는 wills의 타입 컬럼
+#   (policy_type, release_after_at, last_heartbeat_at, heartbeat_interval_seconds)에도 저장합니다.
+# - wills.next_release_check_at(epoch 초)은 항상 이 모듈로 계산하며,
+#   릴리스 검사기는 'next_release_check_at <= 현재 시각'인 유언장만 조회해 타입 컬럼으로 판단합니다.
+
+POLICY_TYPE_INVALID = "invalid" # 검증에 실패한 기존 정책의 policy_type
+DEFAULT_HEARTBEAT_INTERVAL_DAYS = 30 # 저장된 데드맨 주기가 잘못된 경우 사용 (기존 릴리스 검사기와 같은 기본값)
+# 릴리스 검사 샤딩용 고정 버킷 수. 샤드 i/N은 'release_shard % N = i'인 유언장을 담당합니다.
+RELEASE_SHARD_BUCKETS = 1024
+
+def release_shard(will_id: str) -> int:
+    """ 유언장 ID의 해시 버킷(0 ~ RELEASE_SHARD_BUCKETS-1) """
+    return zlib.crc32(str(will_id).encode("utf-8")) % RELEASE_SHARD_BUCKETS
+
+def parse_utc(ts: Optional[str]) -> Optional[datetime.datetime]:
+    """ ISO-8601 UTC 문자열('...Z' 포함)을 datetime으로 변환합니다. 실패 시 None. """
+    if not ts:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+def _with_default_interval(raw) -> Optional[Dict[str, Any]]:
+    """ 저장된 정책의 heartbeat_interval_days를 기본값으로 바꾼 dict (JSON이 아니면 None) """
+    try:
+        data = json.loads(raw) if isinstance(raw, (str, bytes)) else dict(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {**data, "heartbeat_interval_days": DEFAULT_HEARTBEAT_INTERVAL_DAYS}
+
+def load_policy(raw: Union[ReleasePolicy, Dict[str, Any], str, bytes, None]) -> Optional[ReleasePolicy]:
+    """
+    저장된 정책(JSON 문자열 또는 dict)을 ReleasePolicy로 변환합니다.
+    JSON 문자열은 json.loads 없이 pydantic-core가 바로 파싱/검증합니다.
+    잘못된 데드맨 주기("abc", null, 0 등)는 기존 릴리스 검사기처럼 30일로 간주하고,
+    그래도 검증에 실패한 정책은 None.
+    """
+    if raw is None or isinstance(raw, ReleasePolicy):
+        return raw
+    try:
+        if isinstance(raw, (str, bytes)):
+            return ReleasePolicy.model_validate_json(raw) if raw else None
+        return ReleasePolicy.model_validate(raw)
+    except ValidationError as e:
+        if not any(err["loc"][:1] == ("heartbeat_interval_days",) for err in e.errors()):
+            return None
+    coerced = _with_default_interval(raw)
+    if coerced is None:
+        return None
+    try:
+        return ReleasePolicy.model_validate(coerced)
+    except ValidationError:
+        return None
+
+def dump_policy(policy: ReleasePolicy) -> str:
+    """ wills.policy에 저장할 JSON 문자열 (입력에 없던 기본값은 저장하지 않음) """
+    return policy.model_dump_json(exclude_unset=True)
+
+def release_due_at(policy_type: Optional[str], release_after_at: Optional[int],
+                   last_heartbeat_at: Optional[int], heartbeat_interval_seconds: Optional[int]) -> Optional[int]:
+    """
+    타입 컬럼 값만으로 릴리스 조건이 충족되는 시각(epoch 초)을 계산합니다.
+    manual / released 정책이나 시각을 알 수 없는 정책은 None (검사 대상 아님).
+    """
+    if policy_type == "time_lock":
+        return release_after_at
+    if policy_type == "deadman" and last_heartbeat_at is not None and heartbeat_interval_seconds is not None:
+        return last_heartbeat_at + heartbeat_interval_seconds
+    return None
+
+def policy_columns(raw) -> Dict[str, Any]:
+    """ 정책에서 wills 테이블의 타입 컬럼 값을 계산합니다. (INSERT/UPDATE/백필 공통) """
+    policy = load_policy(raw)
+    if policy is None:
+        # 검증에 실패한 기존 정책: 검사 대상에서 제외하고 SQL로 골라낼 수 있도록 표시
+        columns = {"policy_type": POLICY_TYPE_INVALID if raw else None, "release_after_at": None,
+                   "last_heartbeat_at": None, "heartbeat_interval_seconds": None}
+    else:
+        columns = {
+            "policy_type": policy.type,
+            "release_after_at": math.ceil(policy.release_after_utc.timestamp()) if policy.release_after_utc else None,
+            "last_heartbeat_at": math.floor(policy.last_heartbeat_utc.timestamp()) if policy.last_heartbeat_utc else None,
+            # 데드맨 정책만 주기를 저장 (heartbeat API는 이 값이 있는 유언장만 갱신)
+            "heartbeat_interval_seconds": policy.heartbeat_interval_days * 86400 if policy.type == "deadman" else None,
+        }
+    columns["next_release_check_at"] = release_due_at(**columns)
+    return columns
+
+def compute_next_release_check_at(raw) -> Optional[int]:
+    """ 정책이 릴리스 조건을 충족하게 되는 시각(epoch 초)을 반환합니다. """
+    return policy_columns(raw)["next_release_check_at"]
+
+def heartbeat_columns(raw) -> tuple:
+    """ 데드맨 정책의 (last_heartbeat_at, heartbeat_interval_seconds) 컬럼 값을 반환합니다. """
+    columns = policy_columns(raw)
+    return (columns["last_heartbeat_at"], columns["heartbeat_interval_seconds"])
+
+def evaluate_release(row, now_epoch: float) -> Dict[str, Any]:
+    """
+    타입 컬럼(policy_type, release_after_at, last_heartbeat_at, heartbeat_interval_seconds)을 가진
+    행(DB row 또는 dict)으로 현재 시각 기준의 릴리스 여부와 사유를 판단합니다.
+    """
+    due = release_due_at(row["policy_type"], row["release_after_at"],
+                         row["last_heartbeat_at"], row["heartbeat_interval_seconds"])
+    if due is None or now_epoch < due:
+        return {"release": False, "reason": "none", "next_release_check_at": due}
+    reason = "time_lock_expired" if row["policy_type"] == "time_lock" else "deadman_heartbeat_timeout"
+    return {"release": True, "reason": reason, "next_release_check_at": None}
@@ -0,0 +1,94 @@
+# backend/principal_cache.py
+import time
+import hashlib
+import threading
+import collections
+from typing import Optional
+
+from .config import PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS
+from .dependencies import User
+
+# 검증이 끝난 토큰 -> User 매핑을 워커 메모리에 보관합니다. (LRU + TTL)
+# - 키: 토큰 원문이 아닌 SHA-256 다이제스트
+# - 만료: min(저장 시각 + TTL, 토큰의 exp) 이므로 만료된 토큰이 캐시로 통과할 수 없음
+# - 사용자 정보 변경/삭제 시 invalidate_user()를 호출해야 합니다.
+
+_lock = threading.Lock()
+_entries: "collections.OrderedDict[str, tuple[User, float]]" = collections.OrderedDict()
+_by_email: dict[str, set[str]] = {} # 이메일 -> 캐시 키 (무효화용 역색인)
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+def token_digest(token: str) -> str:
+    """ 캐시 키로 사용할 토큰 다이제스트를 반환합니다. """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _remove(key: str):
+    """ (락 보유 상태에서 호출) 항목과 역색인을 함께 제거합니다. """
+    user, _ = _entries.pop(key)
+    keys = _by_email.get(user.email)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del _by_email[user.email]
+
+def get(key: str) -> Optional[User]:
+    """ 유효한 캐시 항목이 있으면 User를, 없으면 None을 반환합니다. """
+    now = time.time()
+    with _lock:
+        item = _entries.get(key)
+        if item is None:
+            _stats["misses"] += 1
+            return None
+        user, expires_at = item
+        if expires_at <= now:
+            _remove(key)
+            _stats["expired"] += 1
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return user
+
+def put(key: str, user: User, token_exp: Optional[float]):
+    """ 검증된 User를 캐시에 저장합니다. 토큰 exp를 넘겨서 보관하지 않습니다. """
+    expires_at = time.time() + PRINCIPAL_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        expires_at = min(expires_at, float(token_exp))
+    if expires_at <= time.time() or PRINCIPAL_CACHE_MAX_ENTRIES <= 0:
+        return
+    with _lock:
+        if key in _entries:
+            _remove(key)
+        _entries[key] = (user, expires_at)
+        _by_email.setdefault(user.email, set()).add(key)
+        while len(_entries) > PRINCIPAL_CACHE_MAX_ENTRIES:
+            _remove(next(iter(_entries)))
+            _stats["evictions"] += 1
+
+def invalidate_user(email: str) -> int:
+    """ (무효화 훅) 사용자 정보가 변경/삭제되면 해당 사용자의 모든 캐시 항목을 제거합니다. """
+    with _lock:
+        keys = list(_by_email.get(email, ()))
+        for key in keys:
+            _remove(key)
+        _stats["invalidations"] += len(keys)
+        return len(keys)
+
+def clear():
+    """ 캐시 전체를 비웁니다. (예: SECRET_KEY 교체 시) """
+    with _lock:
+        _stats["invalidations"] += len(_entries)
+        _entries.clear()
+        _by_email.clear()
+
+def get_stats() -> dict:
+    """ 캐시 적중/미스 통계를 반환합니다. """
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "size": len(_entries),
+            "max_entries": PRINCIPAL_CACHE_MAX_ENTRIES,
+            "ttl_seconds": PRINCIPAL_CACHE_TTL_SECONDS,
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,208 @@
+# backend/queries.py
+import re
+from typing import Any, Iterable, Optional, Sequence
+from psycopg2.extras import execute_batch
+
+from .config import DB_MODE, DB_PREPARED_STATEMENTS
+
+# 애플리케이션의 모든 SQL 문장을 한곳에서 관리합니다.
+# - 문장은 SQLite 형식('?' 자리표시자)으로 한 번만 작성하고, 방언별로 한 번만 컴파일합니다.
+# - PostgreSQL(psycopg2): 연결마다 'PREPARE'한 뒤 'EXECUTE'로 실행 (파싱/플랜 재사용)
+# - PostgreSQL(psycopg3 async): prepare=True로 드라이버의 서버 측 prepared statement 사용
+# - SQLite: 동일한 SQL 문자열을 재사용하므로 sqlite3의 문장 캐시(cached_statements)에 적중
+# 방언마다 문법이 다른 문장은 {"sqlite": ..., "postgres": ...} 형태로 작성합니다.
+
+# 릴리스 판단에 필요한 타입 컬럼 (정책 JSON은 릴리스로 확정된 행에서만 다시 읽음)
+_RELEASE_COLUMNS = ("id, owner_email, policy, policy_type, release_after_at, "
+                    "last_heartbeat_at, heartbeat_interval_seconds")
+
+STATEMENTS = {
+    # --- 사용자 / 인증 ---
+    "user_by_email":
+        "SELECT email, full_name, created_at FROM users WHERE email = ?",
+    # 로그인 시 사용자 정보와 비밀번호 해시를 한 번의 왕복으로 조회
+    "user_auth_by_email":
+        "SELECT email, full_name, created_at, hashed_password FROM users WHERE email = ?",
+
+    # --- 유언장 ---
+    # 타입 컬럼(policy_type 등)과 next_release_check_at은 정책이 바뀔 때마다
+    # backend/policy.py의 policy_columns()로 다시 계산해 함께 저장합니다.
+    "will_insert":
+        "INSERT INTO wills (id, owner_email, policy, policy_type, release_after_at, last_heartbeat_at, "
+        "heartbeat_interval_seconds, next_release_check_at, release_shard, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "will_update_policy":
+        "UPDATE wills SET policy = ?, policy_type = ?, release_after_at = ?, heartbeat_interval_seconds = ?, "
+        "next_release_check_at = ?, updated_at = ? WHERE id = ?",
+
+    # --- 데드맨 heartbeat (backend/heartbeat_buffer.py가 모아서 일괄 반영) ---
+    # heartbeat_interval_seconds가 NULL이 아닌(데드맨) 유언장만, 소유자가 일치하고 더 최신인 경우에만 갱신
+    # PostgreSQL은 execute_values로 'VALUES ?'(-> %s)에 여러 행을 펼쳐 UPDATE ... FROM 한 문장으로 실행
+    "will_heartbeat_apply": {
+        "sqlite": "UPDATE wills SET last_heartbeat_at = ?, next_release_check_at = ? + heartbeat_interval_seconds "
+                  "WHERE id = ? AND owner_email = ? AND heartbeat_interval_seconds IS NOT NULL "
+                  "AND (last_heartbeat_at IS NULL OR last_heartbeat_at < ?)",
+        "postgres": "UPDATE wills AS w SET last_heartbeat_at = v.hb, next_release_check_at = v.hb + w.heartbeat_interval_seconds "
+                    "FROM (VALUES ?) AS v (hb, id, owner_email) "
+                    "WHERE w.id = v.id AND w.owner_email = v.owner_email AND w.heartbeat_interval_seconds IS NOT NULL "
+                    "AND (w.last_heartbeat_at IS NULL OR w.last_heartbeat_at < v.hb)",
+    },
+
+    # --- 유언장 릴리스 (idx_wills_next_release_check_at 사용) ---
+    # PostgreSQL은 FOR UPDATE SKIP LOCKED로 다른 노드/프로세스가 처리 중인 행을 건너뜀 (중복 릴리스 방지)
+    "wills_release_due": {
+        "sqlite": "SELECT " + _RELEASE_COLUMNS + " FROM wills WHERE next_release_check_at <= ? "
+                  "ORDER BY next_release_check_at LIMIT ?",
+        "postgres": "SELECT " + _RELEASE_COLUMNS + " FROM wills WHERE next_release_check_at <= ? "
+                    "ORDER BY next_release_check_at LIMIT ? FOR UPDATE SKIP LOCKED",
+    },
+    # 샤드 모드: release_shard(0~1023) % 샤드 수 = 샤드 번호
+    # PostgreSQL은 mod()를 사용 (psycopg2가 '%'를 자리표시자로 해석하지 않도록)
+    "wills_release_due_shard": {
+        "sqlite": "SELECT " + _RELEASE_COLUMNS + " FROM wills WHERE next_release_check_at <= ? "
+                  "AND release_shard % ? = ? ORDER BY next_release_check_at LIMIT ?",
+        "postgres": "SELECT " + _RELEASE_COLUMNS + " FROM wills WHERE next_release_check_at <= ? "
+                    "AND mod(release_shard, ?) = ? ORDER BY next_release_check_at LIMIT ? FOR UPDATE SKIP LOCKED",
+    },
+    # (PostgreSQL 전용) 노드 간 샤드 점유용 세션 advisory lock
+    "release_shard_try_lock":
+        "SELECT pg_try_advisory_lock(?, ?)",
+    "release_shard_unlock":
+        "SELECT pg_advisory_unlock(?, ?)",
+    # 검증에 실패해 검사 대상에서 빠진 정책 (idx_wills_policy_invalid 사용)
+    "wills_invalid_policy_count":
+        "SELECT COUNT(*) FROM wills WHERE policy_type = 'invalid'",
+    "will_reschedule_release_check":
+        "UPDATE wills SET next_release_check_at = ? WHERE id = ?",
+    # 릴리스 스케줄러가 메모리에 올릴 가까운 미래의 예정 시각
+    "wills_release_upcoming":
+        "SELECT id, next_release_check_at FROM wills WHERE next_release_check_at <= ? "
+        "ORDER BY next_release_check_at LIMIT ?",
+
+    # --- 알림 이력 ---
+    # --- 수신자 전달 (notify/delivery_engine.py, idx_will_deliveries_due 사용) ---
+    # 릴리스와 같은 트랜잭션에서 유언장의 모든 수신자(grants)를 한 문장으로 대기열에 추가
+    "will_deliveries_enqueue":
+        "INSERT INTO will_deliveries (will_id, email, role, status, attempts, next_attempt_at, created_at, updated_at) "
+        "SELECT will_id, email, role, 'pending', 0, ?, ?, ? FROM grants WHERE will_id = ? "
+        "ON CONFLICT (will_id, email) DO NOTHING",
+    # 'sending'은 next_attempt_at을 임대 만료 시각으로 사용 (전송 중 종료된 프로세스의 항목을 다시 가져옴)
+    "will_deliveries_due": {
+        "sqlite": "SELECT d.will_id, d.email, d.role, d.attempts, w.owner_email FROM will_deliveries d "
+                  "JOIN wills w ON w.id = d.will_id WHERE d.status IN ('pending', 'sending') AND d.next_attempt_at <= ? "
+                  "ORDER BY d.next_attempt_at LIMIT ?",
+        "postgres": "SELECT d.will_id, d.email, d.role, d.attempts, w.owner_email FROM will_deliveries d "
+                    "JOIN wills w ON w.id = d.will_id WHERE d.status IN ('pending', 'sending') AND d.next_attempt_at <= ? "
+                    "ORDER BY d.next_attempt_at LIMIT ? FOR UPDATE OF d SKIP LOCKED",
+    },
+    "will_delivery_lease":
+        "UPDATE will_deliveries SET status = 'sending', next_attempt_at = ?, updated_at = ? WHERE will_id = ? AND email = ?",
+    "will_delivery_sent":
+        "UPDATE will_deliveries SET status = 'sent', attempts = attempts + 1, last_error = NULL, updated_at = ? "
+        "WHERE will_id = ? AND email = ?",
+    "will_delivery_retry":
+        "UPDATE will_deliveries SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+        "WHERE will_id = ? AND email = ?",
+    # 시간 제한으로 보내지 못한 수신자를 시도 횟수 변경 없이 되돌림
+    "will_delivery_release":
+        "UPDATE will_deliveries SET status = 'pending', next_attempt_at = ?, updated_at = ? "
+        "WHERE will_id = ? AND email = ? AND status = 'sending'",
+    "will_deliveries_count_by_status":
+        "SELECT status, COUNT(*) AS n FROM will_deliveries GROUP BY status",
+
+    # notify/history.py가 모아서 일괄 기록 (PostgreSQL은 execute_values로 여러 행을 INSERT 한 문장으로)
+    "notification_insert_batch": {
+        "sqlite": "INSERT INTO notifications (timestamp, level, title, body, status) VALUES (?, ?, ?, ?, ?)",
+        "postgres": "INSERT INTO notifications (timestamp, level, title, body, status) VALUES ?",
+    },
+    # 알림 이력 페이지 조회 (id 역순 keyset: 'id < 이전 페이지의 마지막 id')
+    "notifications_page":
+        "SELECT id, timestamp, level, title, body, status FROM notifications "
+        "WHERE id < ? ORDER BY id DESC LIMIT ?",
+    "notifications_page_by_level":
+        "SELECT id, timestamp, level, title, body, status FROM notifications "
+        "WHERE level = ? AND id < ? ORDER BY id DESC LIMIT ?",
+}
+
+
+def dialect() -> str:
+    """ 현재 DB_MODE에 해당하는 SQL 방언 이름 """
+    return "postgres" if DB_MODE == "production" else "sqlite"
+
+
+class CompiledStatement:
+    """ 방언별로 한 번만 컴파일된 SQL 문장 """
+
+    def __init__(self, name: str, sql: str, target: str):
+        self.name = name
+        self.n_params = sql.count("?")
+        if target == "postgres":
+            # 파라미터와 함께 실행되는 문장은 psycopg2가 '%'를 해석하므로 리터럴 '%'는 '%%'로 이스케이프
+            # (PREPARE 문은 파라미터 없이 실행되므로 원문 그대로 사용)
+            self.sql = sql.replace("%", "%%").replace("?", "%s")
+            # 서버 측 prepared statement ($1, $2, ...)
+            counter = iter(range(1, self.n_params + 1))
+            self.prepare_sql = f"PREPARE q_{name} AS " + re.sub(r"\?", lambda _: f"${next(counter)}", sql)
+            args = ", ".join(["%s"] * self.n_params)
+            self.execute_sql = f"EXECUTE q_{name} ({args})" if self.n_params else f"EXECUTE q_{name}"
+        else:
+            self.sql = sql
+            self.prepare_sql = None
+            self.execute_sql = None
+
+
+_compiled: dict[str, dict[str, CompiledStatement]] = {}
+
+def statement(name: str, target: Optional[str] = None) -> CompiledStatement:
+    """ 이름으로 컴파일된 문장을 반환합니다. (최초 1회만 컴파일) """
+    target = target or dialect()
+    cache = _compiled.setdefault(target, {})
+    stmt = cache.get(name)
+    if stmt is None:
+        text = STATEMENTS[name]
+        if isinstance(text, dict):
+            text = text[target]
+        stmt = cache[name] = CompiledStatement(name, text, target)
+    return stmt
+
+def sql(name: str) -> str:
+    """ 현재 방언의 SQL 문자열을 반환합니다. (execute_values 등 직접 실행이 필요한 경우) """
+    return statement(name).sql
+
+def _prepared_sql(cur, stmt: CompiledStatement) -> str:
+    """ psycopg2 연결에 문장을 준비(PREPARE)하고 EXECUTE 문을 반환합니다. """
+    prepared = getattr(cur.connection, "prepared_statements", None)
+    if not DB_PREPARED_STATEMENTS or prepared is None:
+        return stmt.sql
+    if stmt.name not in prepared:
+        cur.execute(stmt.prepare_sql)
+        prepared.add(stmt.name)
+    return stmt.execute_sql
+
+def execute(cur, name: str, params: Sequence[Any] = ()):
+    """ get_db()의 커서로 이름 붙은 문장을 실행합니다. """
+    stmt = statement(name)
+    if stmt.prepare_sql is None:
+        return cur.execute(stmt.sql, tuple(params))
+    return cur.execute(_prepared_sql(cur, stmt), tuple(params))
+
+def executemany(cur, name: str, seq_of_params: Iterable[Sequence[Any]], page_size: int = 100):
+    """
+    같은 문장을 여러 파라미터 묶음으로 실행합니다.
+    PostgreSQL에서는 execute_batch로 page_size개씩 묶어 왕복 횟수를 줄입니다.
+    """
+    stmt = statement(name)
+    rows = [tuple(p) for p in seq_of_params]
+    if not rows:
+        return None
+    if stmt.prepare_sql is None:
+        return cur.executemany(stmt.sql, rows)
+    return execute_batch(cur, _prepared_sql(cur, stmt), rows, page_size=page_size)
+
+async def execute_async(cur, name: str, params: Sequence[Any] = ()):
+    """ get_async_db()의 커서로 이름 붙은 문장을 실행합니다. """
+    stmt = statement(name)
+    if stmt.prepare_sql is None:
+        return await cur.execute(stmt.sql, tuple(params))
+    # psycopg3가 연결별로 서버 측 prepared statement를 관리합니다.
+    return await cur.execute(stmt.sql, tuple(params), prepare=DB_PREPARED_STATEMENTS)
@@ -11,6 +11,7 @@ from google.genai import types
 
 # --- (내부 I/O 에이전트 임포트) ---
 from backend import data_access_agent
+from common.log_rules import load_rules # 로그 진단 규칙 (한 번의 순회로 평가)
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 load_dotenv(PROJECT_ROOT / ".env")
@@ -23,14 +24,17 @@ SYSTEM_PROMPT = (
 "If you detect missing configuration (API keys, notify, policy), add a 'questions' array in Korean with concise actionable items."
 )
 
-def _heuristic_check():
+RULES = load_rules()
+
+def _heuristic_check(rules=None):
     """
     Gemini API 호출이 불가능하거나 실패했을 때 사용되는 휴리스틱 분석 로직.
+    rules: 이미 평가한 규칙 결과 (없으면 최근 로그를 읽어 평가)
     """
-    logs = data_access_agent.read_system_logs()
+    if rules is None:
+        rules = RULES.evaluate(data_access_agent.read_system_log_lines())
 
-    # ... (휴리스틱 로직은 이름에 영향을 받지 않음) ...
-    need = bool(logs and (("ERROR" in logs) or ("failed" in logs.lower())))
+    need = rules.need_upgrade
     questions = []
 
     if not os.environ.get("GEMINI_API_KEY"):
@@ -43,9 +47,9 @@ def _heuristic_check():
 
     return {
         "need_upgrade": bool(need),
-        "reasons": ["local heuristic trigger" if need else "no critical error"],
+        "reasons": rules.reasons() if need else ["no critical error"],
         "new_features": [],
-        "priority": "normal" if need else "low",
+        "priority": rules.priority,
         "questions": questions,
         "source": "local-heuristic",
         "generated_at": datetime.datetime.utcnow().isoformat()+"Z"
@@ -60,27 +64,31 @@ def get_upgrade_suggestion():
     api_key = os.environ.get("GEMINI_API_KEY", "").strip()
     model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
 
+    # 로그는 한 번만 읽고, 규칙 평가 결과를 프롬프트와 휴리스틱 폴백이 함께 사용
+    log_lines = data_access_agent.read_system_log_lines()
+    rules = RULES.evaluate(log_lines)
+
     # 2. 키가 없으면 AI 호출 없이 휴리스틱(Heuristic) 모드로 즉시 전환
     if not api_key:
         print("GEMINI_API_KEY not found in .env. Falling back to heuristic mode.")
-        return _heuristic_check()
+        return _heuristic_check(rules)
 
     # Gemini 클라이언트 초기화
     try:
         client = genai.Client()
     except Exception as e:
         print(f"Gemini Client initialization failed: {e}. Falling back to heuristic mode.")
-        payload = _heuristic_check()
+        payload = _heuristic_check(rules)
         payload["reasons"] = [f"gemini client error: {e}"]
         payload["source"] = "gemini-error"
         return payload
 
     # 요청 내용 구성
-    logs_excerpt = data_access_agent.read_system_logs()
+    logs_excerpt = "\n".join(log_lines) if log_lines else "(no logs yet)"
     contents = [
         types.Content(
             role="user",
-            parts=[types.Part.from_text(f"Logs excerpt:\n```\n{logs_excerpt}\n```")]
+            parts=[types.Part.from_text(f"Logs excerpt:\n```\n{logs_excerpt}\n```\n{rules.describe()}")]
         )
     ]
 
@@ -111,7 +119,7 @@ def get_upgrade_suggestion():
         except Exception:
             # 5. AI가 JSON이 아닌 엉뚱한 텍스트를 반환한 경우
             print("Model returned non-JSON. Falling back to heuristic mode.")
-            payload = _heuristic_check()
+            payload = _heuristic_check(rules)
             payload["reasons"] = [f"model returned non-JSON; fallback heuristic", txt[:400]]
             payload["source"] = "gemini-fallback"
 
@@ -120,7 +128,7 @@ def get_upgrade_suggestion():
     except Exception as e:
         # 6. Gemini API 호출 자체가 실패한 경우 (네트워크 오류, 인증 오류 등)
         print(f"Gemini call failed: {e}. Falling back to heuristic mode.")
-        payload = _heuristic_check()
+        payload = _heuristic_check(rules)
         payload["reasons"] = [f"gemini error: {e}"]
         payload["source"] = "gemini-error"
         return payload
@@ -0,0 +1,2 @@
+# common/__init__.py
+# 에이전트와 백엔드가 함께 쓰는 의존성 없는 유틸리티 (backend 패키지를 임포트하지 않음)
@@ -0,0 +1,95 @@
+# common/log_rules.py
+import os
+import re
+import json
+import pathlib
+
+# 로그 진단 규칙 엔진 (AI 진단 에이전트와 휴리스틱 폴백이 함께 사용)
+# - 모든 규칙을 하나의 정규식으로 합쳐 먼저 걸러내고, 걸린 줄에서만 규칙별로 확인 -> 로그를 한 번만 훑음
+# - 규칙별 일치 줄 수와 가중치 합(score)으로 업그레이드 필요 여부/우선순위를 판단
+# - ADVISOR_RULES_PATH(JSON 목록)로 규칙을 바꿀 수 있음: [{"name", "pattern", "weight", "ignore_case"?}]
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+ADVISOR_RULES_PATH = os.environ.get("ADVISOR_RULES_PATH", "")
+ADVISOR_NEED_SCORE = int(os.environ.get("ADVISOR_NEED_SCORE", 2))     # 이 점수 이상이면 업그레이드 필요
+ADVISOR_HIGH_SCORE = int(os.environ.get("ADVISOR_HIGH_SCORE", 50))    # 이 점수 이상이면 우선순위 high
+RULE_SAMPLE_LINES = 3
+
+DEFAULT_RULES = [
+    {"name": "error", "pattern": r"\bERROR\b|\bCRITICAL\b", "weight": 3},
+    {"name": "failed", "pattern": r"failed", "weight": 2, "ignore_case": True},
+    {"name": "traceback", "pattern": r"Traceback \(most recent call last\)", "weight": 3},
+    {"name": "db_unavailable", "pattern": r"DB connection unavailable|CRITICAL DB LOGGING ERROR", "weight": 5},
+    {"name": "dead_letter", "pattern": r"dead-letter", "weight": 2},
+    {"name": "timeout", "pattern": r"timed? ?out", "weight": 1, "ignore_case": True},
+]
+
+
+class RuleSet:
+    """ 컴파일된 규칙 목록. evaluate()로 줄들을 한 번에 평가합니다. """
+
+    def __init__(self, rules: list[dict]):
+        self.rules = []
+        alternatives = []
+        for rule in rules:
+            flags = re.IGNORECASE if rule.get("ignore_case") else 0
+            self.rules.append((rule["name"], re.compile(rule["pattern"], flags), int(rule.get("weight", 1))))
+            alternatives.append(f"(?i:{rule['pattern']})" if flags else f"(?:{rule['pattern']})")
+        # 사전 필터: 어느 규칙에도 걸리지 않는 줄(대부분)은 정규식 한 번으로 통과
+        self.prefilter = re.compile("|".join(alternatives)) if alternatives else None
+
+    def evaluate(self, lines) -> "RuleResult":
+        result = RuleResult([name for name, _, _ in self.rules])
+        for line in lines:
+            result.lines += 1
+            if self.prefilter is None or not self.prefilter.search(line):
+                continue
+            for name, pattern, weight in self.rules:
+                if pattern.search(line):
+                    result.counts[name] += 1
+                    result.score += weight
+                    samples = result.samples[name]
+                    if len(samples) < RULE_SAMPLE_LINES:
+                        samples.append(line[:300])
+        return result
+
+
+class RuleResult:
+    """ 규칙별 일치 줄 수, 가중치 합, 예시 줄 """
+
+    def __init__(self, names: list[str]):
+        self.lines = 0
+        self.score = 0
+        self.counts = {name: 0 for name in names}
+        self.samples = {name: [] for name in names}
+
+    @property
+    def need_upgrade(self) -> bool:
+        return self.score >= ADVISOR_NEED_SCORE
+
+    @property
+    def priority(self) -> str:
+        if self.score >= ADVISOR_HIGH_SCORE:
+            return "high"
+        return "normal" if self.need_upgrade else "low"
+
+    def reasons(self) -> list[str]:
+        hits = sorted(((n, c) for n, c in self.counts.items() if c), key=lambda x: -x[1])
+        return [f"rule '{n}' matched {c} lines" for n, c in hits]
+
+    def describe(self) -> str:
+        """ 프롬프트에 넣을 한 줄 요약 """
+        hits = ", ".join(f"{n}={c}" for n, c in self.counts.items() if c) or "none"
+        return f"Rule hits over {self.lines} lines (score {self.score}): {hits}"
+
+
+def load_rules() -> RuleSet:
+    """ ADVISOR_RULES_PATH가 있으면 그 규칙을, 없거나 읽을 수 없으면 기본 규칙을 사용합니다. """
+    if ADVISOR_RULES_PATH:
+        path = pathlib.Path(ADVISOR_RULES_PATH)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        try:
+            return RuleSet(json.loads(path.read_text(encoding="utf-8")))
+        except Exception as e:
+            print(f"Warning: could not load advisor rules from {path} ({e}). Using default rules.")
+    return RuleSet(DEFAULT_RULES)
@@ -0,0 +1,71 @@
+# common/log_tail.py
+import os
+import pathlib
+
+# 로그 파일의 끝부분만 읽습니다. (파일 전체를 메모리에 올리지 않음)
+# - 로그는 회전(rotate)되지 않고 계속 커지므로, 비용이 파일 크기가 아닌 읽을 꼬리 크기에 비례하도록 끝에서부터 블록 단위로 탐색
+TAIL_BLOCK_SIZE = 64 * 1024
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+LOGS_DIR = PROJECT_ROOT / "logs"
+
+# AI 진단에 사용하는 로그 파일
+SYSTEM_LOG_FILES = [
+    "runtime.log", "update_audit.log", "recovery.log",
+    "hourly_task.log", "daily_task.log", "notify.log"
+]
+
+
+def tail_lines(path, n_lines: int, block_size: int = TAIL_BLOCK_SIZE) -> list[str]:
+    """ 파일의 마지막 n_lines 줄을 반환합니다. (splitlines()[-n_lines:]와 같은 결과) """
+    if n_lines <= 0:
+        return []
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        chunks, newlines = [], 0
+        # 줄바꿈이 n_lines개보다 많아지면 맨 앞 조각(잘린 줄)을 제외해도 n_lines줄이 확보됨
+        while pos > 0 and newlines <= n_lines:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    lines = b"".join(reversed(chunks)).decode("utf-8", errors="ignore").splitlines()
+    if pos > 0:
+        lines = lines[1:] # 블록 경계에서 잘린 첫 줄
+    return lines[-n_lines:]
+
+
+def tail_text(path, n_chars: int) -> str:
+    """ 파일의 마지막 n_chars 글자를 반환합니다. (read_text()[-n_chars:]와 같은 결과) """
+    if n_chars <= 0:
+        return ""
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        # UTF-8은 한 글자가 최대 4바이트
+        start = max(0, size - 4 * n_chars)
+        f.seek(start)
+        data = f.read()
+    # 중간에서 잘린 멀티바이트 글자는 errors="ignore"로 버려짐
+    return data.decode("utf-8", errors="ignore")[-n_chars:]
+
+
+def read_log_tails(logs_dir: pathlib.Path, names: list[str], n_lines: int) -> list[str]:
+    """ 여러 로그 파일의 마지막 n_lines 줄을 순서대로 이어 붙여 반환합니다. (없는 파일은 건너뜀) """
+    merged = []
+    for name in names:
+        p = logs_dir / name
+        if p.exists():
+            try:
+                merged += tail_lines(p, n_lines)
+            except Exception as e:
+                print(f"Error reading log file {p}: {e}")
+    return merged
+
+
+def read_system_log_lines(n_lines=2000) -> list[str]:
+    """
+    여러 로그 파일에서 최근 n줄씩 읽어 줄 목록으로 반환합니다.
+    """
+    return read_log_tails(LOGS_DIR, SYSTEM_LOG_FILES, n_lines)
@@ -0,0 +1,394 @@
+# database/migrations.py
+import sys
+import time
+import json
+import datetime
+import os
+import pathlib
+from dotenv import load_dotenv
+
+# --- (1. 설정) ---
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+load_dotenv(PROJECT_ROOT / ".env")
+sys.path.append(str(PROJECT_ROOT))
+
+DB_MODE = os.environ.get("DB_MODE", "local")
+# 운영 중인 DB에서 긴 잠금을 피하기 위한 설정
+MIGRATION_LOCK_TIMEOUT = os.environ.get("MIGRATION_LOCK_TIMEOUT", "5s")              # DDL이 잠금을 기다리는 최대 시간 (PostgreSQL)
+MIGRATION_BACKFILL_BATCH_SIZE = int(os.environ.get("MIGRATION_BACKFILL_BATCH_SIZE", 500))
+MIGRATION_BACKFILL_PAUSE_SECONDS = float(os.environ.get("MIGRATION_BACKFILL_PAUSE_SECONDS", 0.05)) # 배치 사이 대기 (부하 조절)
+
+
+# --- (2. 마이그레이션 컨텍스트) ---
+
+class MigrationContext:
+    """
+    마이그레이션 함수에 전달되는 실행 도구.
+    SQL은 SQLite 형식('?')으로 작성하면 PostgreSQL에서는 '%s'로 변환됩니다.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dialect = "postgres" if DB_MODE == "production" else "sqlite"
+
+    @property
+    def is_postgres(self) -> bool:
+        return self.dialect == "postgres"
+
+    def _sql(self, sql: str) -> str:
+        return sql.replace("?", "%s") if self.is_postgres else sql
+
+    def execute(self, sql: str, params=()):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(self._sql(sql), tuple(params))
+            return cur.fetchall() if cur.description else []
+        finally:
+            cur.close()
+
+    def executemany(self, sql: str, rows):
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(self._sql(sql), rows)
+        finally:
+            cur.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    def column_exists(self, table: str, column: str) -> bool:
+        if self.is_postgres:
+            rows = self.execute(
+                "SELECT 1 FROM information_schema.columns WHERE table_name = ? AND column_name = ?",
+                (table, column))
+            return bool(rows)
+        return any(r[1] == column for r in self.execute(f"PRAGMA table_info({table})"))
+
+    def add_column(self, table: str, column: str, coltype: str):
+        """ 컬럼을 추가합니다. (기본값 없는 NULL 허용 컬럼이므로 테이블 재작성 없음) """
+        if self.column_exists(table, column):
+            return
+        print(f"  + column {table}.{column} {coltype}")
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {coltype}")
+        self.commit()
+
+    def create_index(self, name: str, table: str, columns: str, unique: bool = False, where: str = None):
+        """
+        인덱스를 생성합니다. PostgreSQL에서는 CONCURRENTLY로 생성하여 쓰기를 막지 않으며,
+        이전 실패로 남은 INVALID 인덱스는 삭제 후 다시 만듭니다.
+        """
+        unique_sql = "UNIQUE " if unique else ""
+        where_sql = f" WHERE {where}" if where else ""
+        if self.is_postgres:
+            invalid = self.execute(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = ? AND NOT i.indisvalid", (name,))
+            if invalid:
+                print(f"  - dropping invalid index {name}")
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            print(f"  + index {name} ON {table} ({columns}) CONCURRENTLY")
+            self.execute(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns}){where_sql}")
+        else:
+            print(f"  + index {name} ON {table} ({columns})")
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns}){where_sql}")
+            self.commit()
+
+    def backfill(self, table: str, select_columns: str, compute, update_sql: str,
+                 where: str = None, key: str = "id",
+                 batch_size: int = None, pause: float = None) -> int:
+        """
+        대용량 테이블을 키 순서(keyset)로 나누어 채웁니다.
+        - compute(row) -> update 파라미터 튜플 (None이면 건너뜀)
+        - 배치마다 커밋하고 잠시 쉬어서 잠금 시간과 I/O 부하를 제한합니다.
+        """
+        batch_size = batch_size or MIGRATION_BACKFILL_BATCH_SIZE
+        pause = MIGRATION_BACKFILL_PAUSE_SECONDS if pause is None else pause
+        where_sql = f" AND ({where})" if where else ""
+        last_key, total = None, 0
+        while True:
+            if last_key is None:
+                rows = self.execute(
+                    f"SELECT {key}, {select_columns} FROM {table} WHERE 1 = 1{where_sql} ORDER BY {key} LIMIT ?",
+                    (batch_size,))
+            else:
+                rows = self.execute(
+                    f"SELECT {key}, {select_columns} FROM {table} WHERE {key} > ?{where_sql} ORDER BY {key} LIMIT ?",
+                    (last_key, batch_size))
+            if not rows:
+                break
+            updates = [p for p in (compute(r) for r in rows) if p is not None]
+            if updates:
+                # PostgreSQL은 autocommit 모드로 실행되므로 배치 단위로만 트랜잭션을 묶음
+                autocommit = getattr(self.conn, "autocommit", False)
+                if self.is_postgres: self.conn.autocommit = False
+                try:
+                    self.executemany(update_sql, updates)
+                    self.commit()
+                except Exception:
+                    self.conn.rollback()
+                    raise
+                finally:
+                    if self.is_postgres: self.conn.autocommit = autocommit
+            total += len(updates)
+            last_key = rows[-1][0]
+            print(f"  ~ backfill {table}: {total} rows updated (last {key}={last_key})")
+            if len(rows) < batch_size:
+                break
+            time.sleep(pause)
+        return total
+
+
+# --- (3. 마이그레이션 목록) ---
+# 새 마이그레이션은 항상 목록의 끝에 더 큰 버전 번호로 추가합니다. (적용된 버전은 수정 금지)
+
+def m0001_performance_indexes(ctx: MigrationContext):
+    """ 자주 조회되는 컬럼에 보조 인덱스를 추가합니다. """
+    ctx.create_index("idx_wills_owner_email", "wills", "owner_email")
+    ctx.create_index("idx_versions_will_version", "versions", "will_id, version")
+    ctx.create_index("idx_grants_will_email", "grants", "will_id, email")
+    ctx.create_index("idx_notifications_timestamp", "notifications", "timestamp")
+
+def _json_or_none(text):
+    try: return json.loads(text) if text else None
+    except (ValueError, TypeError): return None
+
+def m0002_next_release_check_at(ctx: MigrationContext):
+    """ 릴리스 예정 시각(epoch) 컬럼과 인덱스를 추가하고 기존 정책에서 백필합니다. """
+    from backend.policy import compute_next_release_check_at
+
+    ctx.add_column("wills", "next_release_check_at", "BIGINT")
+    ctx.backfill(
+        "wills", "policy",
+        compute=lambda row: (compute_next_release_check_at(_json_or_none(row[1])), row[0]),
+        update_sql="UPDATE wills SET next_release_check_at = ? WHERE id = ?",
+        where="policy IS NOT NULL",
+    )
+    # 검사 대상(NULL이 아닌 행)만 담는 부분 인덱스
+    ctx.create_index("idx_wills_next_release_check_at", "wills", "next_release_check_at",
+                     where="next_release_check_at IS NOT NULL")
+
+def m0003_release_schedule_notify(ctx: MigrationContext):
+    """ (PostgreSQL) 릴리스 예정 시각이 바뀌면 스케줄러에 NOTIFY합니다. (payload: '<will_id>:<epoch|빈값>') """
+    if not ctx.is_postgres:
+        return # SQLite 스케줄러는 주기적 폴링을 사용
+    ctx.execute("""
+        CREATE OR REPLACE FUNCTION notify_will_release_schedule() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('will_release_schedule', OLD.id || ':');
+                RETURN OLD;
+            END IF;
+            IF TG_OP = 'INSERT' OR NEW.next_release_check_at IS DISTINCT FROM OLD.next_release_check_at THEN
+                PERFORM pg_notify('will_release_schedule',
+                                  NEW.id || ':' || COALESCE(NEW.next_release_check_at::text, ''));
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    ctx.execute("DROP TRIGGER IF EXISTS trg_will_release_schedule ON wills")
+    ctx.execute("""
+        CREATE TRIGGER trg_will_release_schedule
+        AFTER INSERT OR UPDATE OF next_release_check_at OR DELETE ON wills
+        FOR EACH ROW EXECUTE FUNCTION notify_will_release_schedule()
+    """)
+
+def m0004_release_shard(ctx: MigrationContext):
+    """ 샤드 모드 릴리스 검사를 위한 해시 버킷 컬럼을 추가하고 백필합니다. """
+    from backend.policy import release_shard
+
+    ctx.add_column("wills", "release_shard", "INTEGER")
+    ctx.backfill(
+        "wills", "release_shard",
+        compute=lambda row: (release_shard(row[0]), row[0]) if row[1] is None else None,
+        update_sql="UPDATE wills SET release_shard = ? WHERE id = ?",
+    )
+    # 샤드별 검사 대상 조회용 (release_shard % N = i 조건 후 예정 시각 범위 검색)
+    ctx.create_index("idx_wills_release_shard_due", "wills", "release_shard, next_release_check_at",
+                     where="next_release_check_at IS NOT NULL")
+
+def m0005_heartbeat_columns(ctx: MigrationContext):
+    """ heartbeat API용 컬럼(마지막 heartbeat, 데드맨 주기)을 추가하고 기존 데드맨 정책에서 백필합니다. """
+    from backend.policy import heartbeat_columns
+
+    def compute(row):
+        last_heartbeat_at, interval = heartbeat_columns(_json_or_none(row[1]))
+        return None if interval is None else (last_heartbeat_at, interval, row[0])
+
+    ctx.add_column("wills", "last_heartbeat_at", "BIGINT")
+    ctx.add_column("wills", "heartbeat_interval_seconds", "BIGINT")
+    ctx.backfill(
+        "wills", "policy",
+        compute=compute,
+        update_sql="UPDATE wills SET last_heartbeat_at = ?, heartbeat_interval_seconds = ? WHERE id = ?",
+        where="policy IS NOT NULL AND heartbeat_interval_seconds IS NULL",
+    )
+
+def m0006_policy_type_columns(ctx: MigrationContext):
+    """
+    정책의 주요 필드를 타입 컬럼(policy_type, release_after_at)으로 추가하고 정책에서 백필합니다.
+    기존 컬럼(last_heartbeat_at 등)은 heartbeat API가 더 최신 값을 썼을 수 있으므로 비어 있을 때만 채웁니다.
+    """
+    from backend.policy import policy_columns, POLICY_TYPE_INVALID
+    invalid = []
+
+    def compute(row):
+        c = policy_columns(row[1])
+        if c["policy_type"] == POLICY_TYPE_INVALID:
+            invalid.append(row[0])
+        return (c["policy_type"], c["release_after_at"], c["last_heartbeat_at"], c["heartbeat_interval_seconds"],
+                c["next_release_check_at"], row[0])
+
+    ctx.add_column("wills", "policy_type", "TEXT")
+    ctx.add_column("wills", "release_after_at", "BIGINT")
+    ctx.backfill(
+        "wills", "policy",
+        compute=compute,
+        update_sql="UPDATE wills SET policy_type = ?, release_after_at = ?, "
+                   "last_heartbeat_at = COALESCE(last_heartbeat_at, ?), "
+                   "heartbeat_interval_seconds = COALESCE(heartbeat_interval_seconds, ?), "
+                   "next_release_check_at = COALESCE(next_release_check_at, ?) WHERE id = ?",
+        where="policy IS NOT NULL AND policy_type IS NULL",
+    )
+    _report_invalid_policies(invalid)
+    ctx.create_index("idx_wills_owner_policy_type", "wills", "owner_email, policy_type")
+    ctx.create_index("idx_wills_release_after_at", "wills", "release_after_at",
+                     where="release_after_at IS NOT NULL")
+
+def _report_invalid_policies(will_ids: list):
+    """ 검증에 실패해 릴리스 검사 대상에서 빠지는 유언장을 운영자에게 알립니다. """
+    if not will_ids:
+        return
+    sample = ", ".join(map(str, will_ids[:20])) + (" ..." if len(will_ids) > 20 else "")
+    print(f"  ! {len(will_ids)} wills have invalid release policies and will NOT be released "
+          f"until fixed (policy_type='invalid'): {sample}")
+
+def m0007_notifications_level_index(ctx: MigrationContext):
+    """ 알림 이력의 레벨별 페이지 조회(level = ? AND id < ? ORDER BY id DESC)용 인덱스 """
+    ctx.create_index("idx_notifications_level_id", "notifications", "level, id")
+
+def m0008_will_deliveries(ctx: MigrationContext):
+    """ 릴리스된 유언장의 수신자(grants)별 전달 상태 테이블 (notify/delivery_engine.py) """
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS will_deliveries (
+            will_id TEXT NOT NULL,
+            email TEXT NOT NULL,
+            role TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at BIGINT NOT NULL,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (will_id, email),
+            FOREIGN KEY (will_id) REFERENCES wills (id) ON DELETE CASCADE
+        )
+    """)
+    ctx.commit()
+    # 전송 대상(pending/sending)만 담는 부분 인덱스
+    ctx.create_index("idx_will_deliveries_due", "will_deliveries", "next_attempt_at",
+                     where="status IN ('pending', 'sending')")
+
+def m0009_revalidate_invalid_policies(ctx: MigrationContext):
+    """
+    0006에서 'invalid'로 표시된 정책을 다시 계산합니다. (잘못된 데드맨 주기는 이제 30일로 보정됨)
+    그래도 잘못된 정책은 목록을 출력하고, 릴리스 검사기가 매 실행 집계할 수 있도록 부분 인덱스를 만듭니다.
+    """
+    from backend.policy import policy_columns, POLICY_TYPE_INVALID
+    invalid = []
+
+    def compute(row):
+        c = policy_columns(row[1])
+        if c["policy_type"] == POLICY_TYPE_INVALID:
+            invalid.append(row[0])
+            return None
+        return (c["policy_type"], c["release_after_at"], c["last_heartbeat_at"], c["heartbeat_interval_seconds"],
+                c["next_release_check_at"], row[0])
+
+    ctx.backfill(
+        "wills", "policy",
+        compute=compute,
+        update_sql="UPDATE wills SET policy_type = ?, release_after_at = ?, last_heartbeat_at = ?, "
+                   "heartbeat_interval_seconds = ?, next_release_check_at = ? WHERE id = ?",
+        where=f"policy_type = '{POLICY_TYPE_INVALID}'",
+    )
+    _report_invalid_policies(invalid)
+    ctx.create_index("idx_wills_policy_invalid", "wills", "id", where=f"policy_type = '{POLICY_TYPE_INVALID}'")
+
+
+MIGRATIONS = [
+    (1, "performance_indexes", m0001_performance_indexes),
+    (2, "next_release_check_at", m0002_next_release_check_at),
+    (3, "release_schedule_notify", m0003_release_schedule_notify),
+    (4, "release_shard", m0004_release_shard),
+    (5, "heartbeat_columns", m0005_heartbeat_columns),
+    (6, "policy_type_columns", m0006_policy_type_columns),
+    (7, "notifications_level_index", m0007_notifications_level_index),
+    (8, "will_deliveries", m0008_will_deliveries),
+    (9, "revalidate_invalid_policies", m0009_revalidate_invalid_policies),
+]
+
+
+# --- (4. 실행기) ---
+
+def _ensure_migrations_table(ctx: MigrationContext):
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    ctx.commit()
+
+def applied_versions(ctx: MigrationContext) -> set[int]:
+    _ensure_migrations_table(ctx)
+    return {row[0] for row in ctx.execute("SELECT version FROM schema_migrations")}
+
+def run_migrations(conn) -> int:
+    """
+    아직 적용되지 않은 마이그레이션을 버전 순서대로 적용하고, 적용한 개수를 반환합니다.
+    각 단계는 IF NOT EXISTS 등으로 멱등하게 작성되어 중간 실패 후 재실행해도 안전합니다.
+    """
+    ctx = MigrationContext(conn)
+    if ctx.is_postgres:
+        # CREATE INDEX CONCURRENTLY는 트랜잭션 블록 안에서 실행할 수 없음
+        conn.autocommit = True
+        ctx.execute(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'")
+
+    done = applied_versions(ctx)
+    count = 0
+    for version, name, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done:
+            continue
+        print(f"Applying migration {version:04d}_{name}...")
+        started = time.monotonic()
+        fn(ctx)
+        ctx.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.datetime.utcnow().isoformat() + "Z"))
+        ctx.commit()
+        count += 1
+        print(f"Migration {version:04d}_{name} applied in {time.monotonic() - started:.2f}s.")
+
+    if count == 0:
+        print("Database schema is up to date.")
+    return count
+
+def migration_status(conn) -> list[tuple[int, str, bool]]:
+    """ (버전, 이름, 적용 여부) 목록을 반환합니다. """
+    done = applied_versions(MigrationContext(conn))
+    return [(v, n, v in done) for v, n, _ in sorted(MIGRATIONS, key=lambda m: m[0])]
+
+
+if __name__ == "__main__":
+    from database.setup_database import get_db_connection
+
+    with get_db_connection() as conn:
+        if conn is None:
+            print("Error! cannot create the database connection.", file=sys.stderr)
+            sys.exit(1)
+        if "--status" in sys.argv:
+            for version, name, applied in migration_status(conn):
+                print(f"{version:04d}_{name}: {'applied' if applied else 'pending'}")
+        else:
+            run_migrations(conn)
@@ -11,6 +11,9 @@ PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 load_dotenv(PROJECT_ROOT / ".env")
 # --- (여기까지 새로 추가) ---
 
+sys.path.append(str(PROJECT_ROOT))
+from database.migrations import run_migrations
+
 # --- (✨ 새로 추가) .env에서 DB 설정 읽기 ---
 DB_MODE = os.environ.get("DB_MODE", "local")
 DB_NAME = os.environ.get("DB_NAME")
@@ -18,7 +21,7 @@ DB_USER = os.environ.get("DB_USER")
 DB_PASSWORD = os.environ.get("DB_PASSWORD")
 DB_HOST = os.environ.get("DB_HOST")
 DB_PORT = os.environ.get("DB_PORT")
-SQLITE_DB_PATH = PROJECT_ROOT / "data" / "wills.db"
+SQLITE_DB_PATH = PROJECT_ROOT / "data" / "eterna_legacy.db" # backend/db.py와 같은 파일
 # --- (여기까지 새로 추가) ---
 
 
@@ -141,20 +144,21 @@ def create_tables(conn):
 
 
     try:
-        with conn.cursor() as c:
-            print("Creating/Updating table: users...")
-            c.execute(users_table_sql)
-            print("Creating/Updating table: wills...")
-            c.execute(wills_table_sql)
-            print("Creating/Updating table: versions...")
-            c.execute(versions_table_sql)
-            print("Creating/Updating table: grants...")
-            c.execute(grants_table_sql)
-
-            # (✨ 새로 추가) notifications 테이블 생성
-            print("Creating/Updating table: notifications...")
-            c.execute(notifications_table_sql)
-
+        c = conn.cursor() # (sqlite3 커서는 with 문을 지원하지 않음)
+        print("Creating/Updating table: users...")
+        c.execute(users_table_sql)
+        print("Creating/Updating table: wills...")
+        c.execute(wills_table_sql)
+        print("Creating/Updating table: versions...")
+        c.execute(versions_table_sql)
+        print("Creating/Updating table: grants...")
+        c.execute(grants_table_sql)
+
+        # (✨ 새로 추가) notifications 테이블 생성
+        print("Creating/Updating table: notifications...")
+        c.execute(notifications_table_sql)
+
+        c.close()
         conn.commit()
         print("Tables schema updated successfully.")
     except Exception as e:
@@ -167,6 +171,8 @@ def main():
     with get_db_connection() as conn:
         if conn is not None:
             create_tables(conn)
+            # 버전 관리되는 마이그레이션(인덱스, 컬럼 추가, 백필) 적용
+            run_migrations(conn)
             print("Database setup complete.")
         else:
             print("Error! cannot create the database connection.", file=sys.stderr)
@@ -0,0 +1,285 @@
+# notify/delivery_engine.py
+import os
+import sys
+import time
+import json
+import random
+import string
+import logging
+import pathlib
+import argparse
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from email.header import Header
+from email.utils import formataddr
+from dotenv import load_dotenv
+
+# --- (1. 설정 및 모듈 임포트) ---
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+load_dotenv(PROJECT_ROOT / ".env")
+
+sys.path.append(str(PROJECT_ROOT))
+from backend.db import get_db
+from backend import queries # 방언별 SQL 문장
+from notify.notify_agent import SMTPPool, notify
+
+LOGS_DIR = PROJECT_ROOT / "logs"; LOGS_DIR.mkdir(parents=True, exist_ok=True)
+logger = logging.getLogger("delivery_engine")
+
+def _setup_logging():
+    """
+    에이전트 전용 로그 파일 핸들러를 붙입니다. (명령행 진입점에서 호출, 여러 번 호출해도 한 번만)
+    루트 로거(basicConfig)를 쓰지 않으므로 run/runner_util의 프로세스 내 실행에서도 이 파일에 기록됩니다.
+    """
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(LOGS_DIR / "delivery_engine.log", encoding="utf-8")
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False # 실행기(hourly/daily_task.log)에 중복 기록하지 않음
+
+# 릴리스된 유언장의 수신자(grants)에게 알림 메일을 보냅니다.
+# - 수신자 목록은 릴리스 트랜잭션에서 will_deliveries에 기록되므로, 엔진이 중간에 종료되어도 다음 실행에서 이어서 전송
+# - 수신자별 상태: pending -> sending(임대) -> sent / failed(시도 횟수 소진)
+DELIVERY_WORKERS = int(os.environ.get("DELIVERY_WORKERS", 8))                      # 동시 전송 수 (= SMTP 세션 수)
+DELIVERY_BATCH_SIZE = int(os.environ.get("DELIVERY_BATCH_SIZE", 200))              # 한 번에 점유할 수신자 수
+DELIVERY_LEASE_SECONDS = int(os.environ.get("DELIVERY_LEASE_SECONDS", 300))        # 점유 후 이 시간 안에 결과가 없으면 다시 전송
+DELIVERY_MAX_ATTEMPTS = int(os.environ.get("DELIVERY_MAX_ATTEMPTS", 6))
+DELIVERY_RETRY_BASE_SECONDS = float(os.environ.get("DELIVERY_RETRY_BASE_SECONDS", 60)) # 재시도 대기 (이후 2배씩, 최대 6시간)
+DELIVERY_DOMAIN_CONCURRENCY = int(os.environ.get("DELIVERY_DOMAIN_CONCURRENCY", 2))   # 수신 도메인별 동시 연결 수
+DELIVERY_DOMAIN_RATE_PER_MINUTE = float(os.environ.get("DELIVERY_DOMAIN_RATE_PER_MINUTE", 60)) # 수신 도메인별 분당 전송 수
+DELIVERY_ACCESS_URL = os.environ.get("DELIVERY_ACCESS_URL", "")                    # 본문에 넣을 열람 링크 (예: https://.../wills/{will_id})
+DELIVERY_FROM_NAME = os.environ.get("DELIVERY_FROM_NAME", "EternaLegacy")
+
+
+# --- (2. 메시지 템플릿 - 모듈 로드 시 1회 컴파일) ---
+
+_TEMPLATES = {
+    "viewer": (
+        string.Template("[EternaLegacy] ${owner_email} 님의 유언장이 공개되었습니다"),
+        string.Template(
+            "안녕하세요, ${recipient} 님.\n\n"
+            "${owner_email} 님이 EternaLegacy에 남긴 유언장(ID: ${will_id})의 릴리스 조건이 충족되어\n"
+            "열람 권한(${role})이 있는 분께 안내드립니다.\n${access_line}\n"
+            "본 메일은 발신 전용입니다."),
+    ),
+    "approver": (
+        string.Template("[EternaLegacy] ${owner_email} 님의 유언장 승인 요청"),
+        string.Template(
+            "안녕하세요, ${recipient} 님.\n\n"
+            "${owner_email} 님의 유언장(ID: ${will_id})이 릴리스되었습니다.\n"
+            "승인자(${role})로 지정되어 있으므로 내용을 확인하고 승인 절차를 진행해 주세요.\n${access_line}\n"
+            "본 메일은 발신 전용입니다."),
+    ),
+}
+_TEMPLATES["default"] = _TEMPLATES["viewer"]
+
+def render(row) -> tuple[str, str]:
+    """ 수신자 행으로 (제목, 본문)을 만듭니다. """
+    subject_t, body_t = _TEMPLATES.get(row["role"], _TEMPLATES["default"])
+    values = {
+        "recipient": row["email"], "owner_email": row["owner_email"],
+        "will_id": row["will_id"], "role": row["role"],
+        "access_line": f"\n열람: {DELIVERY_ACCESS_URL.format(will_id=row['will_id'])}\n" if DELIVERY_ACCESS_URL else "",
+    }
+    return subject_t.safe_substitute(values), body_t.safe_substitute(values)
+
+
+# --- (3. 도메인별 전송 속도 제한) ---
+
+class DeadlineExceeded(Exception):
+    """ 시간 제한 안에 전송을 시작할 수 없음 (전송하지 않은 수신자는 대기열로 되돌림) """
+
+
+class DomainThrottle:
+    """ 수신 도메인별 동시 연결 수와 전송 간격을 제한합니다. (수신 서버의 속도 제한/스팸 판정 회피) """
+
+    def __init__(self, concurrency: int, rate_per_minute: float):
+        self.concurrency = concurrency
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._slots = {}    # domain -> Semaphore
+        self._next_at = {}  # domain -> 다음 전송 가능 시각 (monotonic)
+
+    def _slot(self, domain: str) -> threading.Semaphore:
+        with self._lock:
+            sem = self._slots.get(domain)
+            if sem is None:
+                sem = self._slots[domain] = threading.Semaphore(self.concurrency)
+            return sem
+
+    def run(self, domain: str, fn, *args, deadline: float = None):
+        """
+        도메인 제한 안에서 fn을 실행합니다.
+        deadline(monotonic)까지 시작할 수 없으면 실행하지 않고 DeadlineExceeded를 발생시킵니다.
+        """
+        sem = self._slot(domain)
+        if not sem.acquire(timeout=None if deadline is None else max(0.0, deadline - time.monotonic())):
+            raise DeadlineExceeded(domain)
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, self._next_at.get(domain, now))
+                if deadline is not None and start_at > deadline:
+                    raise DeadlineExceeded(domain)
+                self._next_at[domain] = start_at + self.interval
+            if start_at > now:
+                time.sleep(start_at - now)
+            return fn(*args)
+        finally:
+            sem.release()
+
+
+# --- (4. 전송) ---
+
+_smtp_pool = SMTPPool(DELIVERY_WORKERS)
+_throttle = DomainThrottle(DELIVERY_DOMAIN_CONCURRENCY, DELIVERY_DOMAIN_RATE_PER_MINUTE)
+
+def _smtp_config():
+    host = os.environ.get("SMTP_HOST")
+    port = int(os.environ.get("SMTP_PORT", 587))
+    user = os.environ.get("SMTP_USER")
+    password = os.environ.get("SMTP_PASSWORD")
+    if not (host and user and password):
+        raise RuntimeError("missing smtp config in .env file")
+    return host, port, user, password
+
+def _send(row):
+    """ 수신자 1명에게 메일을 보냅니다. (실패 시 예외) """
+    host, port, user, password = _smtp_config()
+    subject, body = render(row)
+    msg = MIMEText(body, 'plain', 'utf-8')
+    msg['From'] = formataddr((DELIVERY_FROM_NAME, user))
+    msg['To'] = row["email"]
+    msg['Subject'] = Header(subject, 'utf-8')
+
+    _smtp_pool.sendmail(host, port, user, password, [row["email"]], msg.as_string())
+
+_DEFERRED = object() # 시간 제한 때문에 보내지 않은 수신자
+
+def _deliver(row, deadline: float = None):
+    domain = row["email"].rpartition("@")[2].lower()
+    try:
+        _throttle.run(domain, _send, row, deadline=deadline)
+        return None
+    except DeadlineExceeded:
+        return _DEFERRED
+    except Exception as e:
+        return str(e) or type(e).__name__
+
+def _backoff(attempts: int) -> int:
+    delay = min(6 * 3600, DELIVERY_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+# --- (5. 실행) ---
+
+def _claim(batch_size: int) -> list:
+    """
+    전송할 차례인 수신자를 점유합니다.
+    (PostgreSQL은 SKIP LOCKED로, SQLite는 쓰기 잠금을 먼저 잡아 여러 엔진이 같은 수신자를 점유하지 않음)
+    """
+    now = int(time.time())
+    ts = datetime.datetime.utcnow().isoformat() + "Z"
+    with get_db() as (conn, cur):
+        if conn is None:
+            raise RuntimeError("DB connection unavailable")
+        if queries.dialect() == "sqlite" and not conn.in_transaction:
+            # SELECT와 임대 UPDATE 사이에 다른 엔진(샤드 워커, 스케줄러 데몬, 시간별 작업)이 끼어들지 못하도록
+            cur.execute("BEGIN IMMEDIATE")
+        queries.execute(cur, "will_deliveries_due", (now, batch_size))
+        rows = [dict(r) for r in cur.fetchall()]
+        queries.executemany(cur, "will_delivery_lease",
+                            [(now + DELIVERY_LEASE_SECONDS, ts, r["will_id"], r["email"]) for r in rows])
+    return rows
+
+def _record(results):
+    """ 배치의 전송 결과를 한 트랜잭션으로 반영합니다. """
+    now = int(time.time())
+    ts = datetime.datetime.utcnow().isoformat() + "Z"
+    sent, retries, deferred = [], [], []
+    for row, error in results:
+        if error is None:
+            sent.append((ts, row["will_id"], row["email"]))
+            continue
+        if error is _DEFERRED:
+            # 보내지 않았으므로 시도 횟수를 쓰지 않고 바로 다시 가져갈 수 있게 되돌림
+            deferred.append((now, ts, row["will_id"], row["email"]))
+            continue
+        attempts = row["attempts"] + 1
+        status = "failed" if attempts >= DELIVERY_MAX_ATTEMPTS else "pending"
+        retries.append((status, attempts, now + _backoff(attempts), error[:500], ts, row["will_id"], row["email"]))
+    with get_db() as (conn, cur):
+        if conn is None:
+            raise RuntimeError("DB connection unavailable")
+        queries.executemany(cur, "will_delivery_sent", sent)
+        queries.executemany(cur, "will_delivery_retry", retries)
+        queries.executemany(cur, "will_delivery_release", deferred)
+    return (len(sent), sum(1 for r in retries if r[0] == "failed"), sum(1 for r in retries if r[0] == "pending"),
+            len(deferred))
+
+def run_deliveries(max_seconds: float = None, batch_size: int = None) -> dict:
+    """
+    대기 중인 수신자 전달을 모두(또는 max_seconds 동안) 처리하고 통계를 반환합니다.
+    배치마다 점유 -> 동시 전송(도메인별 제한) -> 결과 일괄 반영 순서로 진행합니다.
+    전송 시작은 max_seconds와 임대 시간의 절반(다른 엔진이 다시 점유하기 전) 안으로 제한하며,
+    그때까지 시작하지 못한 수신자는 시도 횟수 없이 대기열로 되돌립니다.
+    """
+    batch_size = batch_size or DELIVERY_BATCH_SIZE
+    deadline = None if max_seconds is None else time.monotonic() + max_seconds
+    stats = {"sent": 0, "failed": 0, "retry_scheduled": 0, "deferred": 0, "batches": 0}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=DELIVERY_WORKERS, thread_name_prefix="delivery") as pool:
+        while deadline is None or time.monotonic() < deadline:
+            rows = _claim(batch_size)
+            if not rows:
+                break
+            batch_deadline = time.monotonic() + DELIVERY_LEASE_SECONDS / 2
+            if deadline is not None:
+                batch_deadline = min(batch_deadline, deadline)
+            errors = list(pool.map(lambda row: _deliver(row, batch_deadline), rows))
+            sent, failed, retry, deferred = _record(zip(rows, errors))
+            stats["sent"] += sent; stats["failed"] += failed; stats["retry_scheduled"] += retry
+            stats["deferred"] += deferred
+            stats["batches"] += 1
+            if len(rows) < batch_size and not deferred:
+                break
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    if stats["batches"]:
+        logger.info(f"Delivery run: {json.dumps(stats)}")
+    if stats["failed"]:
+        notify("⚠️ 수신자 전달 실패",
+               f"{stats['failed']}명의 수신자에게 유언장 릴리스 안내를 보내지 못했습니다. (will_deliveries 상태 'failed')",
+               level="warn")
+    return stats
+
+def get_stats() -> dict:
+    with get_db() as (conn, cur):
+        if conn is None:
+            return {}
+        queries.execute(cur, "will_deliveries_count_by_status")
+        return {r["status"]: r["n"] for r in cur.fetchall()}
+
+
+def run_cli(argv=None) -> int:
+    """ 명령행 인자로 실행하고 종료 코드를 반환합니다. (run/runner_util의 프로세스 내 실행 진입점) """
+    ap = argparse.ArgumentParser(description="Deliver release notices to will grantees")
+    ap.add_argument("--stats", action="store_true", help="Print delivery counts by status")
+    ap.add_argument("--max-seconds", type=float, default=None, help="Time budget for this run")
+    args = ap.parse_args(argv)
+    _setup_logging()
+
+    if args.stats:
+        print(json.dumps(get_stats(), indent=2))
+    else:
+        print(f"Delivery run finished: {run_deliveries(max_seconds=args.max_seconds)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,151 @@
+# notify/history.py
+import os
+import sys
+import atexit
+import pathlib
+import datetime
+import threading
+from dotenv import load_dotenv
+
+# --- (1. 설정 및 모듈 임포트) ---
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+load_dotenv(PROJECT_ROOT / ".env")
+
+sys.path.append(str(PROJECT_ROOT))
+try:
+    from backend.database_agent import get_db
+    from backend import queries # 방언별 SQL 문장
+    from psycopg2.extras import execute_values
+except ImportError:
+    print("Warning: Could not import get_db from backend. Notification history will be disabled.")
+    get_db = None
+
+LOGS_DIR = PROJECT_ROOT / "logs"; LOGS_DIR.mkdir(parents=True, exist_ok=True)
+DB_MODE = os.environ.get("DB_MODE", "local")
+
+# 알림 이력(notifications 테이블)을 모았다가 한 번에 기록합니다.
+# - 개수(NOTIFY_HISTORY_BATCH_SIZE) 또는 시간(NOTIFY_HISTORY_FLUSH_SECONDS) 조건을 만족하면 반영
+# - 프로세스 종료 시 남은 이력을 반영 (notify_agent의 outbox 종료 처리 이후에 실행되도록 먼저 import)
+NOTIFY_HISTORY_BATCH_SIZE = int(os.environ.get("NOTIFY_HISTORY_BATCH_SIZE", 50))
+NOTIFY_HISTORY_FLUSH_SECONDS = float(os.environ.get("NOTIFY_HISTORY_FLUSH_SECONDS", 5))
+NOTIFY_HISTORY_MAX_BUFFER = int(os.environ.get("NOTIFY_HISTORY_MAX_BUFFER", 5000)) # DB 장애 시 메모리 상한 (초과분은 오래된 것부터 버림)
+
+
+def _log(msg: str):
+    ts = datetime.datetime.utcnow().isoformat() + "Z"
+    with open(LOGS_DIR / "notify.log", "a", encoding="utf-8") as f:
+        f.write(f"{ts} {msg}\n")
+
+
+# --- (2. 테이블 준비 - 프로세스당 1회) ---
+
+_table_ready = False
+
+def _ensure_table(conn, cur):
+    """ 알림 테이블이 없으면 생성합니다. (성공한 뒤에는 다시 확인하지 않음) """
+    global _table_ready
+    if _table_ready:
+        return
+    if DB_MODE == "production":
+        # PostgreSQL
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                id SERIAL PRIMARY KEY,
+                timestamp TIMESTAMPTZ DEFAULT NOW(),
+                level VARCHAR(10) NOT NULL,
+                title TEXT NOT NULL,
+                body TEXT,
+                status VARCHAR(20)
+            );
+        """)
+    else:
+        # SQLite
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+                level TEXT NOT NULL,
+                title TEXT NOT NULL,
+                body TEXT,
+                status TEXT
+            );
+        """)
+    conn.commit()
+    _table_ready = True
+
+
+# --- (3. 버퍼 / 반영) ---
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock() # 반영은 한 번에 하나만 (순서 유지)
+_buffer = []
+_wakeup = threading.Event()
+_flusher = None
+
+def record(level: str, title: str, body: str, status: str):
+    """ 알림 이력 1건을 버퍼에 추가합니다. (DB 접근 없음) """
+    if get_db is None:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    # SQLite는 CURRENT_TIMESTAMP와 같은 형식의 문자열, PostgreSQL은 timestamptz로 저장
+    ts = now if DB_MODE == "production" else now.strftime("%Y-%m-%d %H:%M:%S")
+    with _lock:
+        _buffer.append((ts, level, title, body[:4000], status)) # 본문은 4000자로 제한
+        if len(_buffer) > NOTIFY_HISTORY_MAX_BUFFER:
+            dropped = len(_buffer) - NOTIFY_HISTORY_MAX_BUFFER
+            del _buffer[:dropped]
+            _log(f"[db_log] history buffer full, dropped {dropped} oldest rows")
+        full = len(_buffer) >= NOTIFY_HISTORY_BATCH_SIZE
+    _ensure_flusher()
+    if full:
+        _wakeup.set()
+
+def _insert(cur, rows):
+    if queries.dialect() == "postgres":
+        # 여러 행을 INSERT 한 문장으로 전송
+        execute_values(cur, queries.sql("notification_insert_batch"), rows, page_size=len(rows))
+    else:
+        cur.executemany(queries.sql("notification_insert_batch"), rows)
+
+def flush() -> int:
+    """ 버퍼의 이력을 한 트랜잭션으로 기록하고, 기록한 행 수를 반환합니다. 실패하면 버퍼에 되돌립니다. """
+    if get_db is None:
+        return 0
+    with _flush_lock:
+        with _lock:
+            rows = _buffer[:]
+            _buffer.clear()
+        if not rows:
+            return 0
+        try:
+            with get_db() as (conn, cur):
+                if conn is None:
+                    raise RuntimeError("DB connection unavailable")
+                _ensure_table(conn, cur)
+                _insert(cur, rows)
+            _log(f"[db_log] Logged {len(rows)} notifications")
+            return len(rows)
+        except Exception as e:
+            with _lock:
+                _buffer[:0] = rows
+            _log(f"[db_log] CRITICAL DB LOGGING ERROR ({len(rows)} rows kept for retry): {e}")
+            return 0
+
+def _run():
+    while True:
+        _wakeup.wait(NOTIFY_HISTORY_FLUSH_SECONDS)
+        _wakeup.clear()
+        flush()
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run, name="notify-history", daemon=True)
+            _flusher.start()
+
+@atexit.register
+def _flush_on_exit():
+    flush()
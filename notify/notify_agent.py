@@ -1,4 +1,6 @@
-import json, pathlib, smtplib, ssl, requests, datetime, os
+import json, pathlib, smtplib, ssl, requests, datetime, os, time, threading, atexit, asyncio, argparse
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from requests.adapters import HTTPAdapter
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
@@ -11,23 +13,21 @@ load_dotenv(PROJECT_ROOT / ".env")
 
 LOGS_DIR = PROJECT_ROOT / "logs"; LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
-# --- (2. DB 연결 모듈 임포트 및 설정) ---
-# EternaLegacy 프로젝트의 backend/database_agent.py에서 get_db를 가져옵니다.
+# --- (2. 대기열 / 이력 모듈 임포트) ---
 sys.path.append(str(PROJECT_ROOT))
-try:
-    # 모듈화된 backend 패키지에서 DB 연결 함수 임포트
-    from backend.database_agent import get_db
-except ImportError:
-    print("Warning: Could not import get_db from backend. Database logging will be disabled.")
-    # DB 로깅을 비활성화하는 더미 함수
-    def get_db():
-        class DummyConn:
-            def __enter__(self): return None, None
-            def __exit__(self, exc_type, exc_val, exc_tb): pass
-        return DummyConn()
-
-DB_MODE = os.environ.get("DB_MODE", "local")
-# --- (여기까지 DB 설정) ---
+from notify import outbox # 알림 전송 대기열 (로컬 SQLite)
+from notify import history # 알림 이력 일괄 기록 (DB) — 종료 시 반영이 outbox 처리 이후에 실행되도록 먼저 import
+
+# notify()는 알림을 로컬 outbox(notify/outbox.py)에 넣고 바로 반환하며, 백그라운드 워커가 전송합니다.
+NOTIFY_OUTBOX_POLL_SECONDS = float(os.environ.get("NOTIFY_OUTBOX_POLL_SECONDS", 30))             # 대기열이 비었을 때 확인 주기
+NOTIFY_OUTBOX_EXIT_DRAIN_SECONDS = float(os.environ.get("NOTIFY_OUTBOX_EXIT_DRAIN_SECONDS", 15)) # 프로세스 종료 시 전송 시도 시간
+NOTIFY_RATE_LIMIT_RECHECK_SECONDS = 5 # 전송 한도에 걸렸을 때 다시 확인하는 주기
+# 채널별 최대 대기 시간(초). 채널은 동시에 전송되므로 알림 1건의 지연은 가장 느린 채널의 시간입니다.
+NOTIFY_EMAIL_TIMEOUT = float(os.environ.get("NOTIFY_EMAIL_TIMEOUT", 10))
+NOTIFY_TELEGRAM_TIMEOUT = float(os.environ.get("NOTIFY_TELEGRAM_TIMEOUT", 10))
+NOTIFY_WORKERS = int(os.environ.get("NOTIFY_WORKERS", 4))                    # 채널 전송용 스레드 수
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 2))                    # 재사용할 SMTP 세션 수
+SMTP_POOL_IDLE_SECONDS = float(os.environ.get("SMTP_POOL_IDLE_SECONDS", 30)) # 이 시간 이상 쉰 세션은 NOOP으로 확인 후 재사용
 
 
 LEVEL_ICON = {
@@ -38,7 +38,8 @@ LEVEL_ICON = {
     "info": "ℹ️"
 }
 
-# --- (3. 로깅 및 DB 로깅 함수) ---
+# --- (3. 로깅 함수) ---
+# DB 이력 기록은 notify/history.py의 버퍼 writer가 일괄 처리합니다.
 
 def log(msg: str):
     """(파일 로깅) 로그 파일에 메시지를 기록합니다."""
@@ -47,63 +48,100 @@ def log(msg: str):
     with open(p, "a", encoding="utf-8") as f:
         f.write(f"{ts} {msg}\n")
 
-def _initialize_db_table(conn, cur):
-    """ 알림 테이블이 없으면 생성합니다. """
-    try:
-        if DB_MODE == "production":
-            # PostgreSQL
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id SERIAL PRIMARY KEY,
-                    timestamp TIMESTAMPTZ DEFAULT NOW(),
-                    level VARCHAR(10) NOT NULL,
-                    title TEXT NOT NULL,
-                    body TEXT,
-                    status VARCHAR(20)
-                );
-            """)
-        else:
-            # SQLite
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
-                    level TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    body TEXT,
-                    status TEXT
-                );
-            """)
-        conn.commit()
-    except Exception as e:
-        log(f"[db_init] Error creating notifications table: {e}")
+# --- (4. 연결 재사용) ---
 
-def _log_to_db(level: str, title: str, body: str, status: str):
-    """ DB에 알림 이력을 기록합니다. """
-    try:
-        with get_db() as (conn, cur):
-            if conn is None: return
-
-            _initialize_db_table(conn, cur)
-
-            placeholder = "%s" if DB_MODE == "production" else "?"
-            cur.execute(
-                f"""
-                INSERT INTO notifications (level, title, body, status)
-                VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})
-                """,
-                (level, title, body[:4000], status) # 본문은 4000자로 제한
-            )
-            conn.commit()
-            log(f"[db_log] Logged notification: {title} ({status})")
-    except Exception as e:
-        log(f"[db_log] CRITICAL DB LOGGING ERROR: {e}")
+class SMTPPool:
+    """
+    로그인까지 마친 SMTP 세션을 보관했다가 다음 메일에 재사용합니다.
+    (메일마다 TCP 연결 + STARTTLS + 로그인을 반복하지 않음)
+    """
 
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = [] # [(server, 반납 시각)]
 
-# --- (4. 알림 전송 함수) ---
+    def _connect(self, host, port, user, password):
+        server = smtplib.SMTP(host, port, timeout=NOTIFY_EMAIL_TIMEOUT)
+        try:
+            server.starttls(context=ssl.create_default_context())
+            server.login(user, password)
+        except Exception:
+            server.close(); raise
+        return server
+
+    def get(self, host, port, user, password):
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                return self._connect(host, port, user, password)
+            server, returned_at = item
+            if time.monotonic() - returned_at < SMTP_POOL_IDLE_SECONDS:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self.discard(server) # 서버가 끊은 세션
+
+    def put(self, server):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self.discard(server)
+
+    def sendmail(self, host, port, user, password, to_addrs: list, msg: str):
+        """
+        풀의 세션으로 메일 1통을 보내고 세션을 반납합니다. (실패 시 예외)
+        재사용한 세션이 그 사이 끊겼으면 새 세션으로 한 번 더 시도하며, 실패한 세션은 항상 폐기합니다.
+        """
+        server = self.get(host, port, user, password)
+        try:
+            server.sendmail(user, to_addrs, msg)
+        except smtplib.SMTPServerDisconnected:
+            self.discard(server)
+            server = self.get(host, port, user, password)
+            try:
+                server.sendmail(user, to_addrs, msg)
+            except Exception:
+                self.discard(server); raise
+        except Exception:
+            self.discard(server); raise
+        self.put(server)
+
+    def discard(self, server):
+        try: server.quit()
+        except Exception:
+            try: server.close()
+            except Exception: pass
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self.discard(server)
+
+_smtp_pool = SMTPPool(SMTP_POOL_SIZE)
+
+# 텔레그램은 keep-alive 세션으로 TLS 연결을 재사용
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=NOTIFY_WORKERS))
+
+# 채널 전송 전용 스레드 풀 (느린 채널이 다른 작업의 스레드를 점유하지 않도록 분리)
+_executor = ThreadPoolExecutor(max_workers=NOTIFY_WORKERS, thread_name_prefix="notify")
+
+@atexit.register
+def _close_connections():
+    _smtp_pool.close()
+    _http.close()
+
+
+# --- (5. 알림 전송 함수) ---
 
 def _send_email(subject, body):
-    # ... (기존 _send_email 로직 유지) ...
     try:
         host = os.environ.get("SMTP_HOST")
         port = int(os.environ.get("SMTP_PORT", 587))
@@ -112,49 +150,44 @@ def _send_email(subject, body):
         to = os.environ.get("SMTP_TO")
 
         if not (host and user and password and to):
-            log("[email] missing smtp config in .env file"); return False
+            raise RuntimeError("missing smtp config in .env file")
 
-        context = ssl.create_default_context()
         msg = MIMEMultipart()
         msg['From'] = user
         msg['To'] = to
         msg['Subject'] = Header(subject, 'utf-8')
         msg.attach(MIMEText(body, 'plain', 'utf-8'))
 
-        with smtplib.SMTP(host, port) as server:
-            server.starttls(context=context)
-            server.login(user, password)
-            server.sendmail(user, [to], msg.as_string())
+        _smtp_pool.sendmail(host, port, user, password, [to], msg.as_string())
 
         log("[email] sent"); return True
     except Exception as e:
-        log(f"[email] error: {e}"); return False
+        log(f"[email] error: {e}"); raise
 
 def _send_telegram(text):
-    # ... (기존 _send_telegram 로직 유지) ...
     try:
         token = os.environ.get("TELEGRAM_BOT_TOKEN")
         chat_id = os.environ.get("TELEGRAM_CHAT_ID")
 
         if not (token and chat_id):
-            log("[telegram] missing config in .env file"); return False
+            raise RuntimeError("missing telegram config in .env file")
 
         url = f"https://api.telegram.org/bot{token}/sendMessage"
 
         if len(text) > 4096:
             text = text[:4090] + "\n...(truncated)"
 
-        r = requests.post(url, json={
+        r = _http.post(url, json={
             "chat_id": chat_id,
             "text": text,
             "parse_mode": "HTML",
             "disable_web_page_preview": True
-        }, timeout=15)
+        }, timeout=NOTIFY_TELEGRAM_TIMEOUT)
 
         r.raise_for_status()
         log("[telegram] sent"); return True
     except Exception as e:
-        log(f"[telegram] error: {e}"); return False
+        log(f"[telegram] error: {e}"); raise
 
 def format_block(title: str, lines: list[str] | None = None) -> str:
     # ... (기존 format_block 로직 유지) ...
@@ -166,33 +199,194 @@ def format_block(title: str, lines: list[str] | None = None) -> str:
             s += f"\n• {ln}"
     return s
 
-def notify(title: str, body: str, level: str = "info"):
-    """
-    주요 알림 함수. 이메일/텔레그램으로 전송하고, DB에 기록합니다.
-    """
+def _messages(title: str, body: str, level: str):
+    """ 채널별 메시지 (이메일 제목/본문, 텔레그램 텍스트) """
     icon = LEVEL_ICON.get(level, LEVEL_ICON["info"])
+    return (f"{icon} {title}", f"{title}\n\n{body}", f"{icon} {format_block(title)}\n{body}")
+
+def _channels_configured() -> dict:
+    """ {채널: 설정 여부} — 설정되지 않은 채널은 대기열에 넣지 않음 """
+    env = os.environ.get
+    return {
+        "email": bool(env("SMTP_HOST") and env("SMTP_USER") and env("SMTP_PASSWORD") and env("SMTP_TO")),
+        "telegram": bool(env("TELEGRAM_BOT_TOKEN") and env("TELEGRAM_CHAT_ID")),
+    }
+
+CHANNEL_TIMEOUT = {"email": NOTIFY_EMAIL_TIMEOUT, "telegram": NOTIFY_TELEGRAM_TIMEOUT}
+
+def _digest(item: dict):
+    """ 병합된 반복 알림이면 제목/본문에 발생 횟수와 기간을 붙입니다. """
+    count = item.get("repeat_count") or 1
+    if count <= 1:
+        return item["title"], item["body"]
+    fmt = lambda ts: datetime.datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%SZ")
+    first, last = item["created_at"], item.get("last_seen_at") or item["created_at"]
+    return (f"{item['title']} (x{count})",
+            f"{item['body']}\n\n(같은 알림이 {fmt(first)} ~ {fmt(last)} 동안 {count}회 발생하여 한 번에 보냅니다.)")
+
+def _deliver(item: dict):
+    """ outbox 항목 하나를 해당 채널로 전송합니다. (실패 시 예외) """
+    title, body = _digest(item)
+    email_subject, email_body, telegram_text = _messages(title, body, item["level"])
+    if item["channel"] == "email":
+        return _send_email(email_subject, email_body)
+    if item["channel"] == "telegram":
+        return _send_telegram(telegram_text)
+    raise ValueError(f"unknown channel: {item['channel']}")
+
+def _status(states: dict) -> str:
+    ok1, ok2 = states.get("email") == "sent", states.get("telegram") == "sent"
+    if ok1 and ok2: return "SUCCESS_BOTH"
+    if ok1: return "SUCCESS_EMAIL"
+    if ok2: return "SUCCESS_TELEGRAM"
+    return "FAILED_ALL"
+
+def _finish(item: dict, states: dict):
+    """ 모든 채널이 끝난 메시지의 최종 결과를 파일/DB에 기록합니다. """
+    status_str = _status(states)
+    delay = time.time() - item["created_at"]
+    title, body = _digest(item)
+    log(f"[notify] {status_str} level={item['level']} title={title} states={states} delay={delay:.1f}s")
+    history.record(item["level"], title, body, status_str)
+
+def _settle(item: dict, error: str = None):
+    """ 채널 전송 결과를 outbox에 반영하고, 메시지가 끝났으면 결과를 기록합니다. """
+    if error is None:
+        outbox.mark_sent(item["message_id"], item["channel"])
+    else:
+        state = outbox.mark_failed(item["message_id"], item["channel"], item["attempts"], error)
+        if state == "dead":
+            log(f"[outbox] dead-letter message={item['message_id']} channel={item['channel']} "
+                f"attempts={item['attempts'] + 1} error={error}")
+    states = outbox.complete_if_final(item["message_id"])
+    if states is not None:
+        _finish(item, states)
+
+def _submit(item: dict) -> Future:
+    try:
+        return _executor.submit(_deliver, item)
+    except RuntimeError:
+        # 인터프리터 종료 중(스레드 풀이 이미 닫힘)에는 현재 스레드에서 전송
+        future = Future()
+        try: future.set_result(_deliver(item))
+        except Exception as e: future.set_exception(e)
+        return future
+
+def _settle_result(item: dict, future: Future):
+    """ 실제로 실행된 전송의 결과로 outbox를 갱신합니다. """
+    try:
+        future.result()
+        _settle(item)
+    except Exception as e:
+        _settle(item, str(e))
 
-    email_subject = f"{icon} {title}"
-    telegram_text = f"{icon} {format_block(title)}\n{body}"
-    email_body = f"{title}\n\n{body}"
-
-    # 1. 전송 시도
-    ok1 = _send_email(email_subject, email_body)
-    ok2 = _send_telegram(telegram_text)
-
-    # 2. 전송 상태 결정 및 파일 로깅
-    status_str = "SUCCESS"
-    if ok1 and ok2: status_str = "SUCCESS_BOTH"
-    elif ok1: status_str = "SUCCESS_EMAIL"
-    elif ok2: status_str = "SUCCESS_TELEGRAM"
-    else: status_str = "FAILED_ALL"
-
-    log(f"[notify] {status_str} level={level} title={title}")
-
-    # 3. DB 로깅 (가장 중요한 업그레이드 부분)
-    _log_to_db(level, title, body, status_str)
+def drain(max_seconds: float = None) -> int:
+    """
+    전송할 차례인 outbox 항목을 채널별로 동시에 전송하고, 처리한 항목 수를 반환합니다.
+    실패한 채널은 지수 백오프로 다시 예약되고, 시도 횟수를 다 쓰면 dead-letter가 됩니다.
+    전송 시간은 채널별 소켓 타임아웃(NOTIFY_EMAIL_TIMEOUT/NOTIFY_TELEGRAM_TIMEOUT)으로 제한되며,
+    시작된 전송은 끝날 때까지 기다린 뒤 결과를 반영합니다. (실행 중인 전송을 실패로 처리해 중복 전송하지 않음)
+    """
+    deadline = None if max_seconds is None else time.monotonic() + max_seconds
+    processed = 0
+    while deadline is None or time.monotonic() < deadline:
+        # 스레드 수만큼만 점유하여 모든 항목이 바로 전송을 시작하도록 함
+        items = outbox.claim_due(limit=NOTIFY_WORKERS)
+        if not items:
+            break
+        started = time.monotonic()
+        futures = [(item, _submit(item)) for item in items]
+        released = 0
+        for item, future in futures:
+            limit = CHANNEL_TIMEOUT.get(item["channel"], NOTIFY_EMAIL_TIMEOUT)
+            try:
+                future.result(timeout=max(0.0, limit - (time.monotonic() - started)))
+            except FutureTimeoutError:
+                if future.cancel():
+                    # 스레드 풀이 다른 전송으로 바빠 시작하지 못한 항목: 시도 횟수를 쓰지 않고 되돌림
+                    outbox.release(item["message_id"], item["channel"])
+                    released += 1
+                    continue
+            except Exception:
+                pass # 결과는 아래에서 반영
+            _settle_result(item, future)
+        processed += len(items) - released
+        if released:
+            break # 스레드 풀이 비면 워커가 다시 가져감
+    return processed
+
+
+# --- (6. 백그라운드 전송 워커) ---
+
+_worker = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+_stopping = threading.Event()
+
+def _worker_loop():
+    while not _stopping.is_set():
+        try:
+            drained = drain()
+            timeout = outbox.next_due_in(NOTIFY_OUTBOX_POLL_SECONDS)
+            if drained == 0 and timeout == 0:
+                timeout = NOTIFY_RATE_LIMIT_RECHECK_SECONDS # 분당 전송 한도에 걸려 대기 중
+        except Exception as e:
+            log(f"[outbox] worker error: {e}")
+            timeout = NOTIFY_OUTBOX_POLL_SECONDS
+        _wake.wait(timeout)
+        _wake.clear()
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _stopping.clear()
+            _worker = threading.Thread(target=_worker_loop, name="notify-outbox", daemon=True)
+            _worker.start()
+    _wake.set()
+
+@atexit.register
+def _drain_on_exit():
+    """ 짧게 실행되는 에이전트가 끝날 때 남은 알림을 전송합니다. (못 보낸 항목은 다음 실행 때 전송) """
+    if _worker is None:
+        return
+    _stopping.set(); _wake.set()
+    _worker.join(timeout=NOTIFY_OUTBOX_EXIT_DRAIN_SECONDS)
+    try:
+        drain(max_seconds=NOTIFY_OUTBOX_EXIT_DRAIN_SECONDS)
+    except Exception as e:
+        log(f"[outbox] exit drain error: {e}")
 
-    return ok1 or ok2
+def notify(title: str, body: str, level: str = "info"):
+    """
+    주요 알림 함수. 알림을 outbox에 넣고 바로 반환합니다. (대기열에 들어가면 True)
+    이메일/텔레그램 전송, 재시도와 DB 기록은 백그라운드 워커가 처리합니다.
+    같은 (제목, 레벨)의 반복 알림은 NOTIFY_DEDUP_WINDOW_SECONDS 동안 요약 1건으로 합쳐지고,
+    error 알림은 info/update보다 먼저 전송됩니다.
+    """
+    channels = _channels_configured()
+    try:
+        message_id, merged = outbox.enqueue(level, title, body, channels)
+    except Exception as e:
+        log(f"[outbox] enqueue failed, alert lost: {e} title={title}")
+        return False
+    if merged:
+        # 같은 (제목, 레벨)의 전송 대기 중인 알림에 합쳐짐 (요약 메시지로 한 번만 전송)
+        log(f"[notify] coalesced level={level} title={title} into message={message_id}")
+        return True
+    if not any(channels.values()):
+        # 보낼 채널이 없으면 바로 실패로 기록
+        _finish({"level": level, "title": title, "body": body, "created_at": time.time()},
+                outbox.complete_if_final(message_id) or {})
+        return True
+    _ensure_worker()
+    return True
+
+async def notify_async(title: str, body: str, level: str = "info"):
+    """
+    notify()의 async 버전. 대기열 쓰기도 이벤트 루프 밖에서 실행합니다. (FastAPI 등 async 코드용)
+    """
+    return await asyncio.wrap_future(_executor.submit(notify, title, body, level))
 
 def notify_status(status: str, details: list[str] | None = None):
     # ... (기존 notify_status 로직 유지) ...
@@ -203,8 +397,31 @@ def notify_status(status: str, details: list[str] | None = None):
 
     return notify(title, body_details, level=level)
 
+def _run_cli(args) -> bool:
+    """ outbox 관리 명령을 실행합니다. 실행한 명령이 있으면 True. """
+    if args.stats:
+        print(json.dumps(outbox.get_stats(), ensure_ascii=False, indent=2))
+    if args.dead:
+        for d in outbox.dead_letters():
+            print(f"#{d['message_id']} [{d['channel']}] {d['level']} {d['title']} "
+                  f"attempts={d['attempts']} error={d['last_error']}")
+    if args.requeue_dead:
+        print(f"Requeued {outbox.requeue_dead()} dead-letter deliveries.")
+    if args.drain or args.requeue_dead:
+        print(f"Processed {drain(max_seconds=args.max_seconds)} deliveries. Purged {outbox.purge()} old messages.")
+    return args.stats or args.dead or args.requeue_dead or args.drain
+
 if __name__ == "__main__":
-    # 이 스크립트를 직접 실행하면 테스트 메시지를 보냅니다.
+    ap = argparse.ArgumentParser(description="EternaLegacy notifications")
+    ap.add_argument("--drain", action="store_true", help="Send due outbox messages, then purge old ones")
+    ap.add_argument("--max-seconds", type=float, default=None, help="Time budget for --drain")
+    ap.add_argument("--stats", action="store_true", help="Print outbox depth/age")
+    ap.add_argument("--dead", action="store_true", help="List dead-letter deliveries")
+    ap.add_argument("--requeue-dead", action="store_true", help="Retry dead-letter deliveries")
+    if _run_cli(ap.parse_args()):
+        sys.exit(0)
+
+    # 옵션 없이 실행하면 테스트 메시지를 보냅니다.
     print("Sending EternaLegacy test notifications...")
 
     if not (os.environ.get("TELEGRAM_BOT_TOKEN") or os.environ.get("SMTP_USER")):
@@ -0,0 +1,362 @@
+# notify/outbox.py
+import os
+import re
+import time
+import random
+import sqlite3
+import pathlib
+import threading
+from dotenv import load_dotenv
+
+# --- (1. 설정) ---
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+load_dotenv(PROJECT_ROOT / ".env")
+
+# 알림 전송 대기열(outbox). 메인 DB가 아닌 로컬 SQLite 파일에 저장하므로
+# DB 장애 중에 발생한 알림도 보존됩니다. (같은 호스트의 여러 프로세스가 함께 사용)
+OUTBOX_PATH = pathlib.Path(os.environ.get("NOTIFY_OUTBOX_PATH", PROJECT_ROOT / "data" / "notify_outbox.db"))
+NOTIFY_RETRY_BASE_SECONDS = float(os.environ.get("NOTIFY_RETRY_BASE_SECONDS", 30))    # 첫 재시도 대기 (이후 2배씩)
+NOTIFY_RETRY_MAX_SECONDS = float(os.environ.get("NOTIFY_RETRY_MAX_SECONDS", 3600))    # 재시도 대기 상한
+NOTIFY_LEASE_SECONDS = float(os.environ.get("NOTIFY_LEASE_SECONDS", 120))             # 전송 중 점유 시간 (프로세스 비정상 종료 대비)
+NOTIFY_OUTBOX_RETENTION_DAYS = float(os.environ.get("NOTIFY_OUTBOX_RETENTION_DAYS", 7)) # 완료된 메시지 보관 기간
+# 같은 (제목, 레벨) 알림을 하나로 합치는 시간 창(초). 창 안의 반복은 다음 창 시작 시 요약 1건으로 전송 (0이면 사용 안 함)
+NOTIFY_DEDUP_WINDOW_SECONDS = float(os.environ.get("NOTIFY_DEDUP_WINDOW_SECONDS", 3600))
+# 채널별 분당 최대 전송 수 (장애 중 발송량 상한, 텔레그램 속도 제한 대비). 우선순위가 높은 레인부터 사용
+NOTIFY_RATE_LIMIT_PER_MINUTE = int(os.environ.get("NOTIFY_RATE_LIMIT_PER_MINUTE", 20))
+NOTIFY_DIGEST_MAX_BODY = 4000 # 요약 메시지 본문 최대 길이
+
+# 우선순위 레인 (숫자가 작을수록 먼저 전송)
+PRIORITY = {"error": 0, "warn": 1}
+DEFAULT_PRIORITY = 2 # ok / info / update
+
+# 채널별 최대 시도 횟수. 초과하면 'dead'(dead-letter)로 옮기고 더 이상 시도하지 않습니다.
+MAX_ATTEMPTS = {
+    "email": int(os.environ.get("NOTIFY_EMAIL_MAX_ATTEMPTS", 8)),
+    "telegram": int(os.environ.get("NOTIFY_TELEGRAM_MAX_ATTEMPTS", 8)),
+}
+
+# 채널 전송 상태: pending(대기) -> sending(전송 중) -> sent(완료) / dead(포기) / skipped(채널 미설정)
+FINAL_STATES = ("sent", "dead", "skipped")
+
+# 스키마 버전별 DDL 목록 (PRAGMA user_version). 새 버전은 항상 끝에 추가합니다.
+_SCHEMA = [
+    # 1: 메시지 / 채널별 전송 상태
+    [
+        """CREATE TABLE IF NOT EXISTS outbox_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            level TEXT NOT NULL,
+            title TEXT NOT NULL,
+            body TEXT NOT NULL,
+            completed_at REAL
+        )""",
+        """CREATE TABLE IF NOT EXISTS outbox_deliveries (
+            message_id INTEGER NOT NULL REFERENCES outbox_messages (id) ON DELETE CASCADE,
+            channel TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            lease_until REAL,
+            last_error TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (message_id, channel)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_deliveries_due ON outbox_deliveries (status, next_attempt_at)",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_messages_completed ON outbox_messages (completed_at)",
+    ],
+    # 2: 중복 알림 병합(dedup/digest)과 우선순위 레인
+    [
+        "ALTER TABLE outbox_messages ADD COLUMN dedup_key TEXT",
+        "ALTER TABLE outbox_messages ADD COLUMN scheduled_at REAL",
+        "ALTER TABLE outbox_messages ADD COLUMN repeat_count INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE outbox_messages ADD COLUMN last_seen_at REAL",
+        "ALTER TABLE outbox_deliveries ADD COLUMN priority INTEGER NOT NULL DEFAULT 2",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_messages_dedup ON outbox_messages (dedup_key, id)",
+        "DROP INDEX IF EXISTS idx_outbox_deliveries_due",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_deliveries_lane ON outbox_deliveries (status, priority, next_attempt_at)",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_deliveries_recent ON outbox_deliveries (channel, updated_at)",
+    ],
+]
+
+
+# --- (2. 연결) ---
+
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    """ 스레드별 outbox 연결 (WAL 모드: 여러 프로세스가 동시에 읽고 쓰기) """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    OUTBOX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(OUTBOX_PATH), timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < len(_SCHEMA):
+        _upgrade(conn)
+    _local.conn = conn
+    return conn
+
+def _upgrade(conn: sqlite3.Connection):
+    """ 스키마를 최신 버전으로 올립니다. (쓰기 잠금 안에서 버전을 다시 확인하므로 프로세스 간 경쟁에 안전) """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for v, statements in enumerate(_SCHEMA[version:], start=version + 1):
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {v}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _backoff(attempts: int) -> float:
+    """ 지수 백오프 (+-20% 지터로 동시 재시도 분산) """
+    delay = min(NOTIFY_RETRY_MAX_SECONDS, NOTIFY_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# --- (3. 대기열 조작) ---
+
+_DIGEST_SEPARATOR = "\n---\n"
+_OMITTED_RE = re.compile(r"^… 외 (\d+)건 생략$") # 요약 본문 마지막 줄: 최대 길이 초과로 덧붙이지 못한 본문 수
+
+def _merge_body(current: str, body: str) -> str:
+    """
+    요약 메시지 본문에 서로 다른 본문만 덧붙입니다.
+    최대 길이를 넘는 본문은 덧붙이지 않고 마지막 줄의 '… 외 N건 생략' 수만 늘립니다.
+    """
+    parts = current.split(_DIGEST_SEPARATOR)
+    omitted = 0
+    match = _OMITTED_RE.match(parts[-1]) if len(parts) > 1 else None
+    if match:
+        omitted = int(match.group(1))
+        parts = parts[:-1]
+    if body in parts:
+        return current
+    trailer = lambda n: f"{_DIGEST_SEPARATOR}… 외 {n}건 생략" if n else ""
+    merged = _DIGEST_SEPARATOR.join(parts + [body])
+    if len(merged) + len(trailer(omitted)) <= NOTIFY_DIGEST_MAX_BODY:
+        return merged + trailer(omitted)
+    return _DIGEST_SEPARATOR.join(parts) + trailer(omitted + 1)
+
+def enqueue(level: str, title: str, body: str, channels: dict, dedup_window: float = None) -> tuple[int, bool]:
+    """
+    메시지를 대기열에 추가하고 (메시지 ID, 병합 여부)를 반환합니다.
+    channels: {채널 이름: 설정 여부} — 설정되지 않은 채널은 바로 'skipped'로 기록합니다.
+    같은 (제목, 레벨)의 알림은 dedup_window 안에서 하나로 합쳐집니다.
+    - 아직 전송되지 않은 같은 알림이 있으면 반복 횟수만 늘림
+    - 이미 전송되었으면 '이전 전송 + 창' 시각에 보낼 요약 메시지를 새로 만듦
+    """
+    now = time.time()
+    window = NOTIFY_DEDUP_WINDOW_SECONDS if dedup_window is None else dedup_window
+    dedup_key = f"{level}\x1f{title}"
+    priority = PRIORITY.get(level, DEFAULT_PRIORITY)
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        scheduled_at = now
+        if window > 0:
+            latest = conn.execute(
+                "SELECT id, body, scheduled_at, "
+                # 어느 채널로도 아직 시도하지 않은 메시지에만 병합
+                "(EXISTS (SELECT 1 FROM outbox_deliveries d WHERE d.message_id = m.id AND d.status = 'pending') "
+                " AND NOT EXISTS (SELECT 1 FROM outbox_deliveries d WHERE d.message_id = m.id "
+                "                 AND (d.attempts > 0 OR d.status NOT IN ('pending', 'skipped')))) AS unsent "
+                "FROM outbox_messages m WHERE dedup_key = ? ORDER BY id DESC LIMIT 1",
+                (dedup_key,)).fetchone()
+            if latest is not None and latest["unsent"]:
+                conn.execute(
+                    "UPDATE outbox_messages SET repeat_count = repeat_count + 1, last_seen_at = ?, body = ? WHERE id = ?",
+                    (now, _merge_body(latest["body"], body), latest["id"]))
+                conn.execute("COMMIT")
+                return latest["id"], True
+            if latest is not None and (latest["scheduled_at"] or 0) + window > now:
+                scheduled_at = latest["scheduled_at"] + window # 요약 메시지는 다음 창 시작 시 전송
+
+        message_id = conn.execute(
+            "INSERT INTO outbox_messages (created_at, level, title, body, dedup_key, scheduled_at, last_seen_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (now, level, title, body, dedup_key, scheduled_at, now)).lastrowid
+        conn.executemany(
+            "INSERT INTO outbox_deliveries (message_id, channel, status, priority, next_attempt_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(message_id, ch, "pending" if enabled else "skipped", priority, scheduled_at, now)
+             for ch, enabled in channels.items()])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return message_id, False
+
+def _rate_budget(conn, now: float) -> dict:
+    """ 채널별로 지난 1분 동안 남은 전송 가능 수 """
+    used = {r[0]: r[1] for r in conn.execute(
+        "SELECT channel, COUNT(*) FROM outbox_deliveries "
+        "WHERE updated_at >= ? AND (status IN ('sending', 'sent', 'dead') OR attempts > 0) GROUP BY channel",
+        (now - 60,))}
+    return {ch: NOTIFY_RATE_LIMIT_PER_MINUTE - n for ch, n in used.items()}
+
+def claim_due(limit: int = 20) -> list[dict]:
+    """
+    전송할 차례인 채널 전송을 우선순위 레인 순서로 점유(lease)하고 반환합니다.
+    - 채널별 분당 전송 한도를 넘는 항목은 남겨 두었다가 다음에 가져옵니다.
+    - 임대 시간이 지난 'sending' 항목(전송 중 종료된 프로세스)도 다시 가져옵니다.
+    """
+    now = time.time()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        budget = _rate_budget(conn, now)
+        candidates = conn.execute("""
+            SELECT d.message_id, d.channel, d.attempts, d.priority, m.level, m.title, m.body,
+                   m.created_at, m.repeat_count, m.last_seen_at
+            FROM outbox_deliveries d JOIN outbox_messages m ON m.id = d.message_id
+            WHERE (d.status = 'pending' AND d.next_attempt_at <= ?)
+               OR (d.status = 'sending' AND d.lease_until < ?)
+            ORDER BY d.priority, d.next_attempt_at
+            LIMIT ?
+        """, (now, now, limit * 4)).fetchall()
+        rows = []
+        for r in candidates:
+            remaining = budget.get(r["channel"], NOTIFY_RATE_LIMIT_PER_MINUTE)
+            if remaining <= 0:
+                continue
+            budget[r["channel"]] = remaining - 1
+            rows.append(r)
+            if len(rows) >= limit:
+                break
+        conn.executemany(
+            "UPDATE outbox_deliveries SET status = 'sending', lease_until = ?, updated_at = ? "
+            "WHERE message_id = ? AND channel = ?",
+            [(now + NOTIFY_LEASE_SECONDS, now, r["message_id"], r["channel"]) for r in rows])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return [dict(r) for r in rows]
+
+def mark_sent(message_id: int, channel: str):
+    now = time.time()
+    _connect().execute(
+        "UPDATE outbox_deliveries SET status = 'sent', attempts = attempts + 1, lease_until = NULL, "
+        "last_error = NULL, updated_at = ? WHERE message_id = ? AND channel = ?",
+        (now, message_id, channel))
+
+def release(message_id: int, channel: str):
+    """ 전송을 시작하지 못한 점유를 시도 횟수 변경 없이 대기열로 되돌립니다. """
+    _connect().execute(
+        "UPDATE outbox_deliveries SET status = 'pending', lease_until = NULL "
+        "WHERE message_id = ? AND channel = ? AND status = 'sending'",
+        (message_id, channel))
+
+def mark_failed(message_id: int, channel: str, attempts: int, error: str) -> str:
+    """ 실패를 기록하고 새 상태('pending' 재시도 예약 또는 'dead')를 반환합니다. """
+    now = time.time()
+    attempts += 1
+    status = "dead" if attempts >= MAX_ATTEMPTS.get(channel, 1) else "pending"
+    next_attempt_at = now + _backoff(attempts) if status == "pending" else now
+    _connect().execute(
+        "UPDATE outbox_deliveries SET status = ?, attempts = ?, next_attempt_at = ?, lease_until = NULL, "
+        "last_error = ?, updated_at = ? WHERE message_id = ? AND channel = ?",
+        (status, attempts, next_attempt_at, (error or "")[:500], now, message_id, channel))
+    return status
+
+def complete_if_final(message_id: int):
+    """
+    모든 채널이 최종 상태이면 메시지를 완료 처리하고 {채널: 상태}를 반환합니다. (아니면 None)
+    여러 워커가 동시에 호출해도 완료 처리는 한 번만 성공합니다.
+    """
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        states = {r["channel"]: r["status"] for r in conn.execute(
+            "SELECT channel, status FROM outbox_deliveries WHERE message_id = ?", (message_id,))}
+        if not all(s in FINAL_STATES for s in states.values()):
+            conn.execute("COMMIT")
+            return None
+        updated = conn.execute(
+            "UPDATE outbox_messages SET completed_at = ? WHERE id = ? AND completed_at IS NULL",
+            (time.time(), message_id)).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return states if updated else None
+
+def next_due_in(default: float) -> float:
+    """ 다음 재시도까지 남은 시간(초). 대기 중인 항목이 없으면 default. """
+    row = _connect().execute(
+        "SELECT MIN(CASE status WHEN 'pending' THEN next_attempt_at ELSE lease_until END) "
+        "FROM outbox_deliveries WHERE status IN ('pending', 'sending')").fetchone()
+    if row[0] is None:
+        return default
+    return max(0.0, min(default, row[0] - time.time()))
+
+def purge(retention_days: float = None) -> int:
+    """ 보관 기간이 지난 완료 메시지를 삭제합니다. (dead-letter가 있는 메시지는 남김) """
+    retention_days = NOTIFY_OUTBOX_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = time.time() - retention_days * 86400
+    return _connect().execute("""
+        DELETE FROM outbox_messages WHERE completed_at < ?
+          AND NOT EXISTS (SELECT 1 FROM outbox_deliveries d WHERE d.message_id = outbox_messages.id AND d.status = 'dead')
+    """, (cutoff,)).rowcount
+
+def dead_letters(limit: int = 50) -> list[dict]:
+    rows = _connect().execute("""
+        SELECT d.message_id, d.channel, d.attempts, d.last_error, d.updated_at, m.level, m.title, m.created_at
+        FROM outbox_deliveries d JOIN outbox_messages m ON m.id = d.message_id
+        WHERE d.status = 'dead' ORDER BY d.updated_at DESC LIMIT ?
+    """, (limit,)).fetchall()
+    return [dict(r) for r in rows]
+
+def requeue_dead() -> int:
+    """ dead-letter 항목을 시도 횟수를 초기화해 다시 대기열에 넣습니다. (채널 복구 후 수동 실행) """
+    now = time.time()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        count = conn.execute(
+            "UPDATE outbox_deliveries SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ? "
+            "WHERE status = 'dead'", (now, now)).rowcount
+        conn.execute(
+            "UPDATE outbox_messages SET completed_at = NULL WHERE id IN "
+            "(SELECT message_id FROM outbox_deliveries WHERE status = 'pending')")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
+
+def get_stats() -> dict:
+    """ 대기열 깊이와 가장 오래 기다린 항목의 나이 (채널별) """
+    now = time.time()
+    stats = {"depth": 0, "oldest_pending_age_seconds": 0.0, "dead": 0, "channels": {}, "lanes": {}}
+    rows = _connect().execute("""
+        SELECT d.channel, d.status, COUNT(*) AS n, MIN(m.created_at) AS oldest
+        FROM outbox_deliveries d JOIN outbox_messages m ON m.id = d.message_id
+        WHERE d.status IN ('pending', 'sending', 'dead')
+        GROUP BY d.channel, d.status
+    """).fetchall()
+    for r in rows:
+        ch = stats["channels"].setdefault(r["channel"], {"pending": 0, "sending": 0, "dead": 0,
+                                                         "oldest_pending_age_seconds": 0.0})
+        ch[r["status"]] = r["n"]
+        if r["status"] == "dead":
+            stats["dead"] += r["n"]
+            continue
+        stats["depth"] += r["n"]
+        age = round(now - r["oldest"], 1)
+        ch["oldest_pending_age_seconds"] = max(ch["oldest_pending_age_seconds"], age)
+        stats["oldest_pending_age_seconds"] = max(stats["oldest_pending_age_seconds"], age)
+    # 레인별 대기 건수와, 병합되어 따로 보내지 않은 반복 알림 수
+    conn = _connect()
+    for r in conn.execute("SELECT priority, COUNT(*) FROM outbox_deliveries "
+                          "WHERE status IN ('pending', 'sending') GROUP BY priority"):
+        stats["lanes"][str(r[0])] = r[1]
+    stats["coalesced_pending"] = conn.execute(
+        "SELECT COALESCE(SUM(repeat_count - 1), 0) FROM outbox_messages WHERE completed_at IS NULL").fetchone()[0]
+    return stats
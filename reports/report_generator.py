@@ -12,6 +12,8 @@ try:
     from backend.database_agent import get_db
     # (✨ 추가) report_data_io 임포트
     from reports.report_data_io import write_report_data
+    # 로그 꼬리 읽기 (파일 끝에서부터 탐색)
+    from common.log_tail import tail_text
 except ImportError:
     print("Error: necessary modules not found. Faking functions.")
     def notify(title, body, level="error"): print(f"[FAKE NOTIFY - {level.upper()}] {title}: {body}")
@@ -22,14 +24,14 @@ except ImportError:
             def __exit__(self, exc_type, exc_val, exc_tb): pass
         return DummyConn()
     def write_report_data(data): return pathlib.Path("/tmp/fake_report.json")
+    def tail_text(path, n_chars): return path.read_text(encoding="utf-8", errors="ignore")[-n_chars:]
 
 def grab_log_tail(path_name, n_chars=5000):
     """로그 파일의 마지막 N 글자를 가져옵니다."""
     p = LOGS_DIR / path_name
     if p.exists():
         try:
-            full_text = p.read_text(encoding="utf-8", errors="ignore")
-            return full_text[-n_chars:]
+            return tail_text(p, n_chars) # 파일 끝부분만 읽음
         except Exception as e:
             return f"Error reading {path_name}: {e}"
     return "(log not found)"
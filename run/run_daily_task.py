@@ -18,7 +18,8 @@ except ImportError:
         print(f"[FAKE NOTIFY - {level.upper()}] {title}: {body}")
 
 # --- (✨ 새로 추가) runner_util에서 공통 함수 임포트 ---
-from run.runner_util import run_script
+from run.runner_util import get_step_stats
+from run.task_graph import Step, TaskGraph
 # --- (여기까지 새로 추가) ---
 
 
@@ -31,55 +32,61 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def main():
-    """1일 주기로 '보고서 생성' -> '자동 업데이트'를 순차 실행합니다."""
+def _log_output(script_name, output):
+    """ 실패 로깅 상세 처리 """
+    if hasattr(output, 'stdout') and hasattr(output, 'stderr'):
+        logging.error(f"Return Code: {getattr(output, 'returncode', 'timeout')}")
+        logging.error(f"Stdout: {output.stdout}")
+        logging.error(f"Stderr: {output.stderr}")
+    else:
+        logging.error(f"Critical error: {output}")
 
-    logging.info("=== Starting EternaLegacy Daily Task Cycle ===")
+def _on_success(step, output):
+    logging.info(f"Output from {step.command[0]}:\n{output}")
+    logging.info(f"--- Finished: {step.command[0]} ---")
 
-    # 1. 보고서 생성 (reports/report_agent.py)
-    script_name = 'reports/report_agent.py'
-    success, output = run_script([script_name])
+def _report_failed(step, output):
+    script_name = step.command[0]
+    logging.warning(f"{script_name} failed. Continuing daily cycle...")
+    _log_output(script_name, output)
+    # 보고서 실패는 치명적이지 않으므로 알림만 보내고 계속 진행
+    notify("⚠️ EternaLegacy 일일 작업 경고",
+           f"{script_name} (보고서 생성) 실행에 실패했습니다. logs/daily_task.log 파일을 확인하세요.",
+           level="warn")
 
-    if not success:
-        # 실패 로깅 상세 처리
-        logging.warning(f"{script_name} failed. Continuing daily cycle...")
-        if hasattr(output, 'stdout') and hasattr(output, 'stderr'):
-            logging.error(f"Return Code: {output.returncode}")
-            logging.error(f"Stdout: {output.stdout}")
-            logging.error(f"Stderr: {output.stderr}")
-        else:
-            logging.error(f"Critical error: {output}")
+def _update_failed(step, output):
+    script_name = step.command[0]
+    logging.error(f"{script_name} failed. Daily cycle finished with errors.")
+    _log_output(script_name, output)
+    notify("❌ EternaLegacy 일일 작업 실패",
+           f"{script_name} (자동 업데이트) 실행에 실패했습니다. logs/daily_task.log 파일을 확인하세요.",
+           level="error")
 
-        # 보고서 실패는 치명적이지 않으므로 알림만 보내고 계속 진행
-        notify("⚠️ EternaLegacy 일일 작업 경고",
-               f"{script_name} (보고서 생성) 실행에 실패했습니다. logs/daily_task.log 파일을 확인하세요.",
-               level="warn")
-    else:
-        logging.info(f"Output from {script_name}:\n{output}")
-        logging.info(f"--- Finished: {script_name} ---")
+def build_graph() -> TaskGraph:
+    """
+    일일 작업 그래프: report(보고서 생성) -> update(자동 업데이트)
+    자동 업데이트는 프로젝트 파일을 교체하므로, 다른 단계가 실행 중일 때 시작하지 않도록 보고서 뒤에 둡니다.
+    (보고서 실패와 관계없이 실행)
+    """
+    return TaskGraph([
+        Step("report", command=['reports/report_generator.py'],
+             on_success=_on_success, on_failure=_report_failed),
+        Step("update", command=['updater/self_update_agent.py'], deps=("report",),
+             on_success=_on_success, on_failure=_update_failed),
+    ])
 
-    # 2. 자동 업데이트 확인 (updater/self_update.py)
-    script_name = 'updater/self_update.py'
-    success, output = run_script([script_name])
+def main():
+    """1일 주기로 '보고서 생성' -> '자동 업데이트'를 실행합니다."""
 
-    if not success:
-        # 실패 로깅 상세 처리
-        logging.error(f"{script_name} failed. Daily cycle finished with errors.")
-        if hasattr(output, 'stdout') and hasattr(output, 'stderr'):
-            logging.error(f"Return Code: {output.returncode}")
-            logging.error(f"Stdout: {output.stdout}")
-            logging.error(f"Stderr: {output.stderr}")
-        else:
-            logging.error(f"Critical error: {output}")
+    logging.info("=== Starting EternaLegacy Daily Task Cycle ===")
 
-        notify("❌ EternaLegacy 일일 작업 실패",
-               f"{script_name} (자동 업데이트) 실행에 실패했습니다. logs/daily_task.log 파일을 확인하세요.",
-               level="error")
-        return # 2단계 실패
-    else:
-        logging.info(f"Output from {script_name}:\n{output}")
-        logging.info(f"--- Finished: {script_name} ---")
+    graph = build_graph()
+    results = graph.run()
 
+    logging.info(f"Step timings: {get_step_stats()}")
+    logging.info(f"Cycle timing: {graph.timing_report()}")
+    if results["update"].status != "ok":
+        return # 자동 업데이트 실패
     logging.info("=== EternaLegacy Daily Task Cycle Completed Successfully ===")
 
 if __name__ == "__main__":
@@ -12,13 +12,16 @@ load_dotenv(PROJECT_ROOT / ".env")
 
 sys.path.append(str(PROJECT_ROOT))
 try:
-    from notify.notify_agent import notify
+    from notify.notify_agent import notify, drain as drain_notifications
+    from notify import outbox as notify_outbox
 except ImportError:
     # FAKE NOTIFY
     def notify(title, body, level="error"):
         print(f"[FAKE NOTIFY - {level.upper()}] {title}: {body}")
+    drain_notifications = notify_outbox = None
 
-from run.runner_util import run_script
+from run.runner_util import get_step_stats
+from run.task_graph import Step, TaskGraph
 
 # 로깅 설정
 LOGS_DIR = PROJECT_ROOT / "logs"
@@ -29,55 +32,95 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# 릴리스 스케줄러 데몬 사용 여부 (.env)
+RELEASE_SCHEDULER_DAEMON = os.environ.get("RELEASE_SCHEDULER_DAEMON", "false").lower() == "true"
+# AI 진단 단계의 최대 시간(초). Gemini 호출은 GEMINI_TIMEOUT_SECONDS 안에 끝나므로(upgrade_advisor_agent._generate)
+# 이 값은 그 밖의 지연에 대한 안전장치이며, RUNNER_MODE=inprocess이면 AI 진단도 프로세스 내에서 실행됨
+ADVISOR_STEP_TIMEOUT_SECONDS = float(os.environ.get("ADVISOR_STEP_TIMEOUT_SECONDS", 120))
+# 동시에 실행할 단계 수 / 릴리스 검사·수신자 전달 단계의 재시도 횟수
+HOURLY_MAX_CONCURRENCY = int(os.environ.get("HOURLY_MAX_CONCURRENCY", 3))
+HOURLY_STEP_RETRIES = int(os.environ.get("HOURLY_STEP_RETRIES", 1))
+# 알림 대기열 재전송에 쓸 최대 시간(초)
+NOTIFY_DRAIN_MAX_SECONDS = float(os.environ.get("NOTIFY_DRAIN_MAX_SECONDS", 60))
+# 수신자 전달 재시도에 쓸 최대 시간(초)
+DELIVERY_MAX_SECONDS = float(os.environ.get("DELIVERY_MAX_SECONDS", 600))
+
 def _log_failure(script_name, output):
     """실패 시 로그 상세 정보를 기록하는 헬퍼 함수"""
     logging.error(f"!!! FAILED: {script_name} !!!")
     if hasattr(output, 'stdout') and hasattr(output, 'stderr'):
-        logging.error(f"Return Code: {output.returncode}")
+        # TimeoutExpired(시간 초과)에는 returncode가 없음
+        logging.error(f"Return Code: {getattr(output, 'returncode', 'timeout')}")
         logging.error(f"Stdout: {output.stdout}")
         logging.error(f"Stderr: {output.stderr}")
     else:
         logging.error(f"Critical error: {output}")
 
-def main():
+def _script_step(name, command, label, deps=(), timeout=None, retries=0, bounded=False):
+    """ 스크립트 실행 단계 (실패 시 로그 + 알림) """
+    def on_failure(step, output):
+        _log_failure(command[0], output)
+        notify("❌ EternaLegacy 시간별 작업 실패", f"{command[0]} ({label}) 실행 실패", level="error")
+    def on_success(step, output):
+        logging.info(f"--- Finished: {command[0]} ---")
+    return Step(name, command=command, deps=deps, timeout=timeout, retries=retries, bounded=bounded,
+                on_success=on_success, on_failure=on_failure)
+
+def _notification_maintenance():
+    """ 알림 대기열 정리 (재시도 차례가 된 알림 전송, 오래된 완료 항목 삭제) """
+    drained = drain_notifications(max_seconds=NOTIFY_DRAIN_MAX_SECONDS)
+    purged = notify_outbox.purge()
+    stats = notify_outbox.get_stats()
+    logging.info(f"--- Notification outbox: drained={drained} purged={purged} stats={stats} ---")
+    if stats["dead"]:
+        logging.warning(f"Notification outbox has {stats['dead']} dead-letter deliveries "
+                        f"(python notify/notify_agent.py --dead)")
+    return True, stats
+
+def build_graph() -> TaskGraph:
     """
-    1시간 주기로 'AI 진단' -> '업그레이드 승인' -> '릴리스 검사'를 순차 실행합니다.
+    시간별 작업 그래프:
+      advisor(AI 진단) -> approver(업그레이드 승인)
+      release(릴리스 검사) -> delivery(수신자 전달)
+      notify_maintenance(알림 대기열 정리): 모든 단계 이후 (각 단계가 남긴 알림까지 전송)
+    두 사슬은 서로 독립이므로 병렬로 실행됩니다.
     """
-
-    logging.info("=== Starting EternaLegacy Hourly Task Cycle ===")
-
-    # 1. AI 진단 (업그레이드 제안)
-    script_ai = 'ai_connector/upgrade_advisor_agent.py'
-    success, output = run_script([script_ai])
-    if not success:
-        _log_failure(script_ai, output)
-        notify("❌ EternaLegacy 시간별 작업 실패", f"{script_ai} (AI 진단) 실행 실패", level="error")
+    steps = [
+        _script_step("advisor", ['ai_connector/upgrade_advisor_agent.py'], "AI 진단",
+                     timeout=ADVISOR_STEP_TIMEOUT_SECONDS, bounded=True),
+        # 승인 단계는 AI 진단이 outbox에 남긴 요청을 읽음
+        _script_step("approver", ['approvals/upgrade_policy_agent.py', '--auto'], "업그레이드 승인",
+                     deps=("advisor",)),
+    ]
+    # 릴리스 스케줄러 데몬(release_checker_agent.py --daemon)이 실행 중이면 중복 실행하지 않음
+    if RELEASE_SCHEDULER_DAEMON:
+        logging.info("--- Skipped: approvals/release_checker_agent.py (release scheduler daemon enabled) ---")
+        delivery_deps = ()
     else:
-        logging.info(f"--- Finished: {script_ai} ---")
-
+        steps.append(_script_step("release", ['approvals/release_checker_agent.py'], "릴리스 검사",
+                                  retries=HOURLY_STEP_RETRIES))
+        delivery_deps = ("release",)
+    # 릴리스 검사가 끝난 뒤 (같은 수신자를 두 곳에서 동시에 전송하지 않도록)
+    steps.append(_script_step("delivery", ['notify/delivery_engine.py', '--max-seconds', str(DELIVERY_MAX_SECONDS)],
+                              "수신자 전달", deps=delivery_deps, retries=HOURLY_STEP_RETRIES))
+    if drain_notifications is not None:
+        steps.append(Step("notify_maintenance", fn=_notification_maintenance,
+                          deps=tuple(s.name for s in steps),
+                          on_failure=lambda step, e: logging.error(f"Notification outbox maintenance failed: {e}")))
+    return TaskGraph(steps, max_concurrency=HOURLY_MAX_CONCURRENCY)
 
-    # 2. 업그레이드 승인 (AI 진단 결과 승인)
-    script_approver = 'approvals/upgrade_policy_agent.py'
-    success, output = run_script([script_approver, '--auto'])
-
-    if not success:
-        _log_failure(script_approver, output)
-        notify("❌ EternaLegacy 시간별 작업 실패", f"{script_approver} (업그레이드 승인) 실행 실패", level="error")
-    else:
-        logging.info(f"--- Finished: {script_approver} ---")
-
-
-    # 3. 릴리스 검사 (✨ 유언장 자동 릴리스 로직 추가)
-    script_release = 'approvals/release_checker_agent.py'
-    success, output = run_script([script_release])
+def main():
+    """
+    1시간 주기 작업을 의존 관계에 따라 실행합니다. ('AI 진단 -> 업그레이드 승인'과 '릴리스 검사 -> 수신자 전달'은 병렬)
+    """
 
-    if not success:
-        _log_failure(script_release, output)
-        notify("❌ EternaLegacy 시간별 작업 실패", f"{script_release} (릴리스 검사) 실행 실패", level="error")
-    else:
-        logging.info(f"--- Finished: {script_release} ---")
+    logging.info("=== Starting EternaLegacy Hourly Task Cycle ===")
 
+    graph = build_graph()
+    graph.run()
 
+    logging.info(f"Step timings: {get_step_stats()}")
+    logging.info(f"Cycle timing: {graph.timing_report()}")
     logging.info("=== EternaLegacy Hourly Task Cycle Completed Successfully ===")
 
 if __name__ == "__main__":
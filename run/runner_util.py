@@ -4,34 +4,204 @@ import logging
 import sys
 import pathlib
 import os
+import io
+import time
+import signal
+import tempfile
+import resource
+import importlib
+import threading
+import traceback
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 
-def run_script(command: list) -> tuple[bool, object]:
+# 에이전트 실행 방식 (.env)
+# - subprocess: 단계마다 새 파이썬 프로세스 (완전 격리, 기본값)
+# - inprocess: 현재 프로세스에서 에이전트 모듈을 한 번 import하고 진입 함수를 직접 호출
+#   (google-genai/psycopg2/requests 등의 import와 DB 풀 생성을 단계마다 반복하지 않음)
+RUNNER_MODE = os.environ.get("RUNNER_MODE", "subprocess").lower()
+
+# 프로세스 내 실행 진입점: 스크립트 -> (모듈, 함수, 명령행 인자 목록을 받는지)
+ENTRY_POINTS = {
+    "ai_connector/upgrade_advisor_agent.py": ("ai_connector.upgrade_advisor_agent", "main", False),
+    "approvals/upgrade_policy_agent.py": ("approvals.upgrade_policy_agent", "run_cli", True),
+    "approvals/release_checker_agent.py": ("approvals.release_checker_agent", "run_cli", True),
+    "notify/delivery_engine.py": ("notify.delivery_engine", "run_cli", True),
+    "reports/report_generator.py": ("reports.report_generator", "main", False),
+    "updater/self_update_agent.py": ("updater.self_update_agent", "run_cli", True),
+}
+
+# 단계별 실행 기록 (실행 시간, 최대 RSS)
+# rss_scope: step(서브 프로세스 - 그 단계 자식 프로세스의 최대 RSS) / process(프로세스 내 - 실행기 프로세스 전체의 최대 RSS)
+STEP_STATS = []
+# 서브 프로세스 종료 확인 주기(초)
+_SUBPROCESS_POLL_SECONDS = 0.05
+
+
+class StepFailure(Exception):
+    """ 프로세스 내 실행 실패. CalledProcessError처럼 returncode/stdout/stderr를 가집니다. """
+
+    def __init__(self, script_name, returncode, stdout, stderr):
+        super().__init__(f"{script_name} failed (returncode={returncode})")
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+# --- (1. 스레드별 출력 캡처) ---
+
+class _ThreadOutput(io.TextIOBase):
     """
-    (공통 함수) 외부 스크립트(예: 에이전트)를 서브 프로세스로 실행하고
-    성공 여부 및 출력을 반환합니다.
+    캡처 중인 스레드의 출력은 버퍼로, 나머지는 원래 스트림으로 보냅니다. (단계를 병렬로 실행해도 출력이 섞이지 않음)
+    캡처는 단계 스레드에만 적용되므로, 에이전트가 띄운 스레드(notify 전송 풀, 이력 flusher, heartbeat 등)의
+    print는 캡처되지 않고 실행기의 stdout/stderr로 나갑니다. 에이전트 로그는 각 모듈의 로거가 자기 파일에 기록합니다.
     """
-    script_name = command[0]
 
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, s):
+        buf = getattr(self.local, "buffer", None)
+        return (buf or self.stream).write(s)
+
+    def flush(self):
+        if getattr(self.local, "buffer", None) is None:
+            self.stream.flush()
+
+_capture_lock = threading.Lock()
+
+def _install_capture():
+    with _capture_lock:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = _ThreadOutput(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadOutput):
+            sys.stderr = _ThreadOutput(sys.stderr)
+
+
+def _rss_kb(ru_maxrss) -> int:
+    """ ru_maxrss를 KB로 변환합니다. (Linux는 KB, macOS는 바이트 단위로 반환됨) """
+    return ru_maxrss // 1024 if sys.platform == "darwin" else ru_maxrss
+
+def _record(script_name, mode, ok, started, peak_rss_kb, rss_scope):
+    stat = {
+        "script": script_name,
+        "mode": mode,
+        "ok": ok,
+        "seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_kb": peak_rss_kb,
+        "rss_scope": rss_scope,
+    }
+    STEP_STATS.append(stat)
+    logging.info(f"Step {script_name} [{mode}] ok={ok} {stat['seconds']}s "
+                 f"peak_rss={stat['peak_rss_kb']}KB ({rss_scope})")
+
+
+# --- (2. 실행) ---
+
+def _run_subprocess(command: list, timeout: float = None) -> tuple[bool, object, int]:
+    """
+    스크립트를 자식 프로세스로 실행하고 (성공 여부, 출력 또는 오류, 자식의 최대 RSS(KB))를 반환합니다.
+    자식은 os.wait4로 직접 회수해 그 프로세스 하나의 rusage를 얻습니다.
+    (RUSAGE_CHILDREN은 지금까지 종료된 모든 자식 중 최대값이라 단계별 값이 아님)
+    """
+    script_name = command[0]
     try:
         script_full_path = PROJECT_ROOT / script_name
         # (중요) sys.executable을 사용해야 현재 가상 환경의 파이썬으로 실행됨
         full_command = [sys.executable, str(script_full_path)] + command[1:]
 
-        result = subprocess.run(
-            full_command,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            cwd=PROJECT_ROOT  # 실행 위치를 프로젝트 루트로 고정
-        )
+        # 출력은 임시 파일로 받음 (파이프는 가득 차면 자식이 멈추고, communicate()는 자식을 먼저 회수해 버림)
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+            proc = subprocess.Popen(full_command, stdout=out, stderr=err,
+                                    cwd=PROJECT_ROOT)  # 실행 위치를 프로젝트 루트로 고정
+            deadline = None if timeout is None else time.monotonic() + timeout
+            timed_out = False
+            while True:
+                pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+                if pid:
+                    break
+                if not timed_out and deadline is not None and time.monotonic() >= deadline:
+                    # 아직 회수하지 않았으므로 pid가 재사용되지 않음 (proc.kill()은 내부에서 회수를 시도하므로 쓰지 않음)
+                    os.kill(proc.pid, signal.SIGKILL)
+                    timed_out = True
+                time.sleep(_SUBPROCESS_POLL_SECONDS)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            out.seek(0)
+            err.seek(0)
+            stdout = out.read().decode("utf-8", errors="replace")
+            stderr = err.read().decode("utf-8", errors="replace")
+        peak_rss_kb = _rss_kb(usage.ru_maxrss)
+
+        if timed_out:
+            # 치명적인 오류(시간 초과): False와 오류 객체 반환
+            return False, subprocess.TimeoutExpired(full_command, timeout, output=stdout, stderr=stderr), peak_rss_kb
+        if proc.returncode != 0:
+            # 스크립트 실행 중 오류 발생 시: False와 오류 객체 반환
+            return False, subprocess.CalledProcessError(proc.returncode, full_command, output=stdout, stderr=stderr), peak_rss_kb
         # 성공 시: True와 표준 출력(stdout) 반환
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        # 스크립트 실행 중 오류 발생 시: False와 오류 객체 반환
-        return False, e
+        return True, stdout, peak_rss_kb
     except Exception as e:
         # 치명적인 오류(파일 없음 등): False와 오류 객체 반환
-        return False, e
+        return False, e, 0
+
+def _run_inprocess(command: list, timeout: float = None) -> tuple[bool, object]:
+    """
+    에이전트의 진입 함수를 별도 스레드에서 호출합니다. 예외/SystemExit는 실패로 처리하고,
+    timeout을 넘기면 기다리지 않고 실패를 반환합니다. (스레드는 강제 종료할 수 없어 백그라운드에 남음)
+    따라서 시간 초과 후 같은 작업이 다시 실행되거나 뒤따르는 단계가 있으면 서브 프로세스 모드를 사용해야 합니다.
+    (run/task_graph.py가 그런 단계를 서브 프로세스로 실행)
+    """
+    script_name, args = command[0], command[1:]
+    module_name, func_name, takes_argv = ENTRY_POINTS[script_name]
+    _install_capture()
+    result = {}
+
+    def target():
+        out, err = io.StringIO(), io.StringIO()
+        sys.stdout.local.buffer, sys.stderr.local.buffer = out, err
+        try:
+            fn = getattr(importlib.import_module(module_name), func_name)
+            code = fn(args) if takes_argv else fn()
+        except SystemExit as e:
+            code = e.code
+        except BaseException:
+            traceback.print_exc(file=err)
+            code = 1
+        finally:
+            sys.stdout.local.buffer = sys.stderr.local.buffer = None
+        result.update(code=code if isinstance(code, int) else (0 if code is None else 1),
+                      stdout=out.getvalue(), stderr=err.getvalue())
+
+    worker = threading.Thread(target=target, name=f"step:{script_name}", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        return False, StepFailure(script_name, "timeout", "", f"step exceeded {timeout}s timeout")
+    if result["code"] != 0:
+        return False, StepFailure(script_name, result["code"], result["stdout"], result["stderr"])
+    return True, result["stdout"]
+
+def run_script(command: list, timeout: float = None, mode: str = None) -> tuple[bool, object]:
+    """
+    (공통 함수) 외부 스크립트(예: 에이전트)를 실행하고 성공 여부 및 출력을 반환합니다.
+    timeout(초)을 넘기면 실패로 처리합니다. mode를 주지 않으면 RUNNER_MODE를 따르며,
+    진입점이 등록되지 않은 스크립트는 항상 서브 프로세스로 실행합니다.
+    """
+    script_name = command[0]
+    mode = (mode or RUNNER_MODE).lower()
+    if mode != "inprocess" or script_name not in ENTRY_POINTS:
+        mode = "subprocess"
+
+    started = time.perf_counter()
+    if mode == "inprocess":
+        ok, output = _run_inprocess(command, timeout)
+        # 같은 프로세스에서 실행되므로 단계별 최대값을 구할 수 없음 -> 실행기 프로세스 전체의 최대값으로 표시
+        _record(script_name, mode, ok, started, _rss_kb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss), "process")
+    else:
+        ok, output, peak_rss_kb = _run_subprocess(command, timeout)
+        _record(script_name, mode, ok, started, peak_rss_kb, "step")
+    return ok, output
+
+def get_step_stats() -> list:
+    return list(STEP_STATS)
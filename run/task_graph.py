@@ -0,0 +1,177 @@
+# run/task_graph.py
+import time
+import logging
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from run.runner_util import run_script
+
+# 주기 작업(시간별/일일)의 단계와 의존 관계를 선언하고, 의존 관계가 없는 단계는 병렬로 실행합니다.
+# - 의존 단계가 모두 끝난 단계부터 동시 실행 수(max_concurrency) 안에서 시작
+# - 단계별 시간 제한/재시도, 실행이 끝나면 단계별 지연 시간과 임계 경로(가장 오래 걸린 의존 사슬)를 기록
+
+
+@dataclass
+class Step:
+    """
+    작업 단계. command(run_script 인자) 또는 fn(인자 없는 함수, (성공 여부, 출력) 반환) 중 하나를 지정합니다.
+    deps의 단계가 모두 끝난 뒤에 실행되며, require_success=True이면 의존 단계가 하나라도 실패할 때 건너뜁니다.
+    """
+    name: str
+    command: list = None
+    fn: object = None
+    deps: tuple = ()
+    timeout: float = None        # command 단계의 시도 1회 최대 시간(초) (의존 단계/재시도가 있으면 항상 서브 프로세스로 실행)
+    bounded: bool = False        # 단계가 스스로 시간 제한을 지킴 (timeout은 안전장치일 뿐이므로 RUNNER_MODE대로 실행)
+    retries: int = 0             # 실패 시 추가 시도 횟수
+    retry_delay: float = 5.0     # 재시도 대기(초), 이후 2배씩
+    require_success: bool = False
+    on_success: object = None    # (step, output) -> None
+    on_failure: object = None    # (step, output) -> None
+
+
+@dataclass
+class StepResult:
+    name: str
+    status: str = "pending"      # ok / failed / skipped
+    attempts: int = 0
+    started_at: float = None     # 실행 시작 기준 경과 시간(초)
+    finished_at: float = None
+    output: object = field(default=None, repr=False)
+
+    @property
+    def seconds(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return round(self.finished_at - self.started_at, 3)
+
+
+class TaskGraph:
+
+    def __init__(self, steps: list, max_concurrency: int = 4):
+        self.steps = {s.name: s for s in steps}
+        self.max_concurrency = max(1, max_concurrency)
+        for s in steps:
+            for dep in s.deps:
+                if dep not in self.steps:
+                    raise ValueError(f"step '{s.name}' depends on unknown step '{dep}'")
+        self._check_cycles()
+        self._has_dependents = {dep for s in steps for dep in s.deps}
+
+    def _check_cycles(self):
+        state = {} # name -> 1(방문 중) / 2(완료)
+        def visit(name, path):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 1
+            for dep in self.steps[name].deps:
+                visit(dep, path + [name])
+            state[name] = 2
+        for name in self.steps:
+            visit(name, [])
+
+    # -- 단계 실행 --
+    def _attempt(self, step: Step):
+        if step.fn is not None:
+            try:
+                return step.fn()
+            except Exception as e:
+                return False, e
+        # 프로세스 내 실행은 시간 초과 시 스레드를 멈출 수 없어, 뒤따르는 단계/재시도가 같은 작업과 겹칠 수 있음
+        # -> 시간 제한이 있고 뒤따르는 실행이 있는 단계는 시간 초과 시 종료할 수 있는 서브 프로세스로 실행
+        #    (bounded 단계는 자체 deadline 안에 끝나므로 제외)
+        mode = None
+        if step.timeout is not None and not step.bounded and (step.retries or step.name in self._has_dependents):
+            mode = "subprocess"
+        return run_script(step.command, timeout=step.timeout, mode=mode)
+
+    def _run_step(self, step: Step, result: StepResult, t0: float) -> StepResult:
+        result.started_at = time.perf_counter() - t0
+        delay = step.retry_delay
+        while True:
+            result.attempts += 1
+            ok, output = self._attempt(step)
+            if ok or result.attempts > step.retries:
+                break
+            logging.warning(f"Step {step.name} failed (attempt {result.attempts}/{step.retries + 1}), retrying in {delay:g}s")
+            time.sleep(delay)
+            delay *= 2
+        result.finished_at = time.perf_counter() - t0
+        result.status, result.output = ("ok" if ok else "failed"), output
+        callback = step.on_success if ok else step.on_failure
+        if callback is not None:
+            try:
+                callback(step, output)
+            except Exception as e:
+                logging.error(f"Step {step.name} callback failed: {e}")
+        return result
+
+    # -- 전체 실행 --
+    def run(self) -> dict:
+        """ 모든 단계를 실행하고 {단계 이름: StepResult}를 반환합니다. """
+        t0 = time.perf_counter()
+        results = {name: StepResult(name) for name in self.steps}
+        remaining = dict(self.steps)
+        running = {} # future -> name
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="task") as pool:
+            while remaining or running:
+                # 의존 단계가 모두 끝난 단계를 시작 (실패한 의존 단계가 있고 require_success면 건너뜀)
+                for name, step in list(remaining.items()):
+                    dep_results = [results[d] for d in step.deps]
+                    if any(r.status == "pending" for r in dep_results):
+                        continue
+                    del remaining[name]
+                    if step.require_success and any(r.status != "ok" for r in dep_results):
+                        results[name].status = "skipped"
+                        logging.info(f"--- Skipped: {name} (dependency did not succeed) ---")
+                        continue
+                    if len(running) >= self.max_concurrency:
+                        remaining[name] = step # 자리가 나면 다음 루프에서 시작
+                        continue
+                    running[pool.submit(self._run_step, step, results[name], t0)] = name
+                if not running:
+                    continue # 건너뛴 단계 때문에 새로 시작할 수 있는 단계가 생김
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        results[name].status, results[name].output = "failed", e
+                        results[name].finished_at = time.perf_counter() - t0
+
+        self.total_seconds = round(time.perf_counter() - t0, 3)
+        self.results = results
+        return results
+
+    def critical_path(self) -> list:
+        """ 마지막에 끝난 단계에서 시작해, 가장 늦게 끝난 의존 단계를 따라 거슬러 올라간 경로 """
+        finished = [r for r in self.results.values() if r.finished_at is not None]
+        if not finished:
+            return []
+        current = max(finished, key=lambda r: r.finished_at)
+        path = [current.name]
+        while True:
+            deps = [self.results[d] for d in self.steps[current.name].deps if self.results[d].finished_at is not None]
+            if not deps:
+                break
+            current = max(deps, key=lambda r: r.finished_at)
+            path.append(current.name)
+        return list(reversed(path))
+
+    def timing_report(self) -> dict:
+        """ 실행 시간 요약 (전체, 임계 경로, 단계별 시작/지연) """
+        path = self.critical_path()
+        return {
+            "total_seconds": self.total_seconds,
+            "critical_path": path,
+            "critical_path_seconds": round(sum(self.results[n].seconds for n in path), 3),
+            "steps": {
+                r.name: {"status": r.status, "attempts": r.attempts,
+                         "start": None if r.started_at is None else round(r.started_at, 3), "seconds": r.seconds}
+                for r in self.results.values()
+            },
+        }
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+import pathlib
+
+# 프로젝트 루트를 import 경로에 추가 (backend, notify 등 패키지를 직접 임포트)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,50 @@
+# tests/test_circuit_breaker.py
+import time
+import pytest
+
+from ai_connector import circuit_breaker
+from ai_connector.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.fixture
+def breaker(tmp_path, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "BREAKER_DIR", tmp_path)
+    return CircuitBreaker("test", failure_threshold=1, cooldown_seconds=60)
+
+
+def _open_since(breaker, seconds_ago):
+    breaker.record_failure("boom")
+    breaker.state["opened_at"] = time.time() - seconds_ago
+    breaker._save()
+
+
+def test_only_one_probe_while_half_open(breaker):
+    _open_since(breaker, 120)
+    assert breaker.allow()
+    assert breaker.state["state"] == HALF_OPEN
+    # 다른 실행(같은 상태 파일)은 진행 중인 시험 호출을 기다림
+    other = CircuitBreaker("test", failure_threshold=1, cooldown_seconds=60)
+    assert not other.allow()
+    assert other.retry_in() > 0
+
+
+def test_stale_half_open_expires_to_new_probe(breaker):
+    _open_since(breaker, 120)
+    assert breaker.allow()
+    # 시험 호출 프로세스가 결과 없이 종료된 상황
+    breaker.state["probe_started_at"] = time.time() - 120
+    breaker._save()
+    other = CircuitBreaker("test", failure_threshold=1, cooldown_seconds=60)
+    assert other.allow()
+    assert other.state["state"] == HALF_OPEN
+    assert other.state["failures"] == 2
+    other.record_success()
+    assert CircuitBreaker("test", 1, 60).state["state"] == CLOSED
+
+
+def test_failed_probe_reopens(breaker):
+    _open_since(breaker, 120)
+    assert breaker.allow()
+    breaker.record_failure("still down")
+    assert breaker.state["state"] == OPEN
+    assert not breaker.allow()
@@ -0,0 +1,30 @@
+# tests/test_notifications_api.py
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import database_agent, main
+from backend.dependencies import User
+
+
+def _as_user(email):
+    return lambda: User(email=email, created_at="2026-01-01T00:00:00Z")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(database_agent, "OPERATOR_EMAILS", frozenset({"ops@example.com"}))
+    monkeypatch.setattr(main, "get_notification_page", lambda *a: {"items": [], "next_before_id": None})
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def test_regular_user_cannot_list_notifications(client):
+    main.app.dependency_overrides[database_agent.get_current_user_dependency] = _as_user("user@example.com")
+    assert client.get("/api/v1/notifications").status_code == 403
+
+
+def test_operator_can_list_notifications(client):
+    main.app.dependency_overrides[database_agent.get_current_user_dependency] = _as_user("Ops@example.com")
+    resp = client.get("/api/v1/notifications")
+    assert resp.status_code == 200
+    assert resp.json() == {"items": [], "next_before_id": None}
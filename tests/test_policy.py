@@ -0,0 +1,20 @@
+# tests/test_policy.py
+import pytest
+
+from backend.policy import policy_columns, evaluate_release, POLICY_TYPE_INVALID
+
+
+@pytest.mark.parametrize("interval", ['"abc"', "null", "0", "-3"])
+def test_bad_heartbeat_interval_falls_back_to_30_days(interval):
+    raw = ('{"type":"deadman","last_heartbeat_utc":"2020-01-01T00:00:00Z",'
+           f'"heartbeat_interval_days":{interval}}}')
+    cols = policy_columns(raw)
+    assert cols["policy_type"] == "deadman"
+    assert cols["heartbeat_interval_seconds"] == 30 * 86400
+    assert evaluate_release(cols, 1700000000)["release"]
+
+
+def test_unrecoverable_policy_is_marked_invalid():
+    cols = policy_columns('{"type":"time_lock"}')
+    assert cols["policy_type"] == POLICY_TYPE_INVALID
+    assert cols["next_release_check_at"] is None
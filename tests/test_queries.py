@@ -0,0 +1,51 @@
+# tests/test_queries.py
+import pytest
+
+from backend import queries
+from backend.queries import CompiledStatement, STATEMENTS
+
+
+class _Conn:
+    def __init__(self):
+        self.prepared_statements = set()
+
+
+class _Cursor:
+    """ psycopg2처럼 파라미터가 있을 때만 '%' 포맷팅을 적용하는 가짜 커서 """
+
+    def __init__(self):
+        self.connection = _Conn()
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        if params is not None:
+            sql % tuple(params) # psycopg2와 같은 규칙: 리터럴 '%'는 '%%'여야 함
+        self.executed.append((sql, params))
+
+
+SHARD_PARAMS = (1700000000, 4, 1, 100)
+
+
+@pytest.mark.parametrize("target", ["sqlite", "postgres"])
+def test_shard_statement_compiles(target):
+    stmt = CompiledStatement("wills_release_due_shard", STATEMENTS["wills_release_due_shard"][target], target)
+    assert stmt.n_params == len(SHARD_PARAMS)
+
+
+@pytest.mark.parametrize("prepared", [True, False])
+def test_shard_statement_executes_on_postgres(monkeypatch, prepared):
+    monkeypatch.setattr(queries, "DB_PREPARED_STATEMENTS", prepared)
+    stmt = CompiledStatement("wills_release_due_shard", STATEMENTS["wills_release_due_shard"]["postgres"], "postgres")
+    cur = _Cursor()
+    cur.execute(queries._prepared_sql(cur, stmt), SHARD_PARAMS)
+    if prepared:
+        assert cur.executed[0] == (stmt.prepare_sql, None)
+        assert cur.executed[-1][0] == stmt.execute_sql
+    else:
+        assert cur.executed == [(stmt.sql, SHARD_PARAMS)]
+
+
+def test_literal_percent_is_escaped_for_postgres():
+    stmt = CompiledStatement("t", "SELECT a % ? FROM t WHERE b = ?", "postgres")
+    assert stmt.sql == "SELECT a %% %s FROM t WHERE b = %s"
+    assert stmt.prepare_sql == "PREPARE q_t AS SELECT a % $1 FROM t WHERE b = $2"
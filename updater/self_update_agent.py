@@ -21,18 +21,32 @@ except ImportError:
 # 로그 경로 설정
 LOGS_DIR = PROJECT_ROOT / "logs"
 LOG_FILE = LOGS_DIR / "update_audit.log"
-logging.basicConfig(level=logging.INFO, filename=LOG_FILE, format='%(asctime)s %(levelname)s %(message)s')
+LOGS_DIR.mkdir(parents=True, exist_ok=True)
+logger = logging.getLogger("self_update")
+
+def _setup_logging():
+    """
+    에이전트 전용 로그 파일 핸들러를 붙입니다. (명령행 진입점에서 호출, 여러 번 호출해도 한 번만)
+    루트 로거(basicConfig)를 쓰지 않으므로 run/runner_util의 프로세스 내 실행에서도 이 파일에 기록됩니다.
+    """
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False # 실행기(hourly/daily_task.log)에 중복 기록하지 않음
 
 
 def check_for_updates():
     """
     업데이트를 확인하고, 새로운 버전이 있으면 다운로드 및 적용합니다.
     """
-    logging.info("Checking for updates...")
+    logger.info("Checking for updates...")
     try:
         url = os.environ.get("MANIFEST_URL", "").strip()
         if not url:
-            logging.info("MANIFEST_URL is not configured in .env. Skipping update check.")
+            logger.info("MANIFEST_URL is not configured in .env. Skipping update check.")
             return
 
         last_ver_file = LOGS_DIR / "last_update_version.txt"
@@ -44,7 +58,7 @@ def check_for_updates():
         ver = m.get("version")
 
         if ver and ver != last_ver:
-            logging.info(f"New version detected: {ver} (previous: {last_ver})")
+            logger.info(f"New version detected: {ver} (previous: {last_ver})")
             notify("🔄 EternaLegacy 새 버전 감지", f"버전: {ver}\n변경 사항: {json.dumps(m.get('changelog', 'N/A'), ensure_ascii=False)}", level="update")
 
             # (✨ 업그레이드) 파일 적용 로직을 헬퍼 함수에 위임
@@ -52,14 +66,20 @@ def check_for_updates():
 
             last_ver_file.write_text(ver, encoding="utf-8")
 
-            logging.info(f"Update to {ver} applied successfully.")
+            logger.info(f"Update to {ver} applied successfully.")
             notify("✅ EternaLegacy 업데이트 완료", f"v{ver}으로 성공적으로 업데이트되었습니다.", level="ok")
         else:
-            logging.info(f"Already up-to-date (version: {last_ver}).")
+            logger.info(f"Already up-to-date (version: {last_ver}).")
 
     except Exception as e:
-        logging.exception(f"Update check failed: {e}")
+        logger.exception(f"Update check failed: {e}")
         notify("❌ EternaLegacy 업데이트 확인 실패", str(e)[:1500], level="error")
 
-if __name__ == "__main__":
+def run_cli(argv=None) -> int:
+    """ 명령행 진입점. (run/runner_util의 프로세스 내 실행 진입점) """
+    _setup_logging()
     check_for_updates()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_cli())